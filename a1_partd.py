@@ -1,7 +1,85 @@
 # copy over your a1_partd.py file here
 import copy
+from array import array
+from functools import lru_cache
 from a1_partc import Queue
 
+# Number of board shapes whose topology is kept; the least recently used one is evicted
+TOPOLOGY_CACHE_SIZE = 8
+
+def neighbor_count(i, j, max_row, max_col):
+    """
+    Returns the number of neighbors (and so the overflow capacity) of cell (i, j).
+
+    Corner cells have 2 neighbors, edge cells have 3 and internal cells have 4.
+    """
+    if (i == 0 or i == max_row - 1) and (j == 0 or j == max_col - 1):
+        return 2  # Corner cells
+    elif i == 0 or i == max_row - 1 or j == 0 or j == max_col - 1:
+        return 3  # Edge cells
+    return 4  # Internal cells
+
+class Topology:
+    """
+    Precomputed per-shape tables shared by the overflow engine and the move generators.
+
+    Attributes:
+    rows (int): The number of rows of the board.
+    cols (int): The number of columns of the board.
+    cells (list of tuples): Every (row, col) of the board in row-major order; the position
+                            of a cell in this list is its flat index.
+    capacity (list of lists): capacity[i][j] is the overflow capacity of cell (i, j).
+    neighbors (list of lists): neighbors[i][j] is a tuple of the (row, col) neighbors of (i, j).
+    flat_capacity (list of int): The capacity of every cell by flat index.
+    flat_neighbors (list of tuples): The flat indices of the neighbors of every cell by flat index.
+    transforms (list of tuples): The symmetries of the board as permutations of the flat
+                                 indices (transform[k] is where cell k goes), the identity
+                                 first: the two mirrors and the half turn, and on a square
+                                 board the two diagonal mirrors and the quarter turns too.
+    """
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.cells = [(i, j) for i in range(rows) for j in range(cols)]
+        self.capacity = [[neighbor_count(i, j, rows, cols) for j in range(cols)] for i in range(rows)]
+        self.neighbors = [[tuple((x, y) for (x, y) in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]
+                                 if 0 <= x < rows and 0 <= y < cols)
+                           for j in range(cols)] for i in range(rows)]
+        self.flat_capacity = [self.capacity[i][j] for (i, j) in self.cells]
+        self.flat_neighbors = [tuple(x * cols + y for (x, y) in self.neighbors[i][j])
+                               for (i, j) in self.cells]
+        maps = [lambda i, j: (i, j),
+                lambda i, j: (i, cols - 1 - j),
+                lambda i, j: (rows - 1 - i, j),
+                lambda i, j: (rows - 1 - i, cols - 1 - j)]
+        if rows == cols:
+            maps += [lambda i, j: (j, i),
+                     lambda i, j: (cols - 1 - j, rows - 1 - i),
+                     lambda i, j: (j, rows - 1 - i),
+                     lambda i, j: (cols - 1 - j, i)]
+        self.transforms = []
+        for transform in maps:
+            perm = tuple(x * cols + y for (x, y) in (transform(i, j) for (i, j) in self.cells))
+            if perm not in self.transforms:  # a single row or column is its own mirror
+                self.transforms.append(perm)
+
+@lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def get_topology(rows, cols):
+    """
+    Returns the shared Topology of a rows x cols board.
+
+    Topologies are built once per shape and cached; when more than TOPOLOGY_CACHE_SIZE
+    shapes are in use the least recently used one is evicted.
+    """
+    return Topology(rows, cols)
+
+def grid_topology(grid):
+    """
+    Returns the shared Topology of the shape of grid.
+    """
+    return get_topology(len(grid), len(grid[0]))
+
 def get_overflow_list(grid):
     """
     Identifies cells in the grid that are overflowing.
@@ -15,62 +93,262 @@ def get_overflow_list(grid):
     It returns a list of tuples representing the coordinates (i, j) of the overflowing cells.
     If no cells are overflowing, it returns None.
     """    
-    max_row, max_col = len(grid), len(grid[0])
+    capacity = grid_topology(grid).capacity
     overflow_list = []
 
-    for i in range(max_row):
-        for j in range(max_col):
-            # Determine number of neighbors based on the position of the cell
-            if (i == 0 or i == max_row - 1) and (j == 0 or j == max_col - 1):
-                neighbors = 2  # Corner cells
-            elif i == 0 or i == max_row - 1 or j == 0 or j == max_col - 1:
-                neighbors = 3  # Edge cells
-            else:
-                neighbors = 4  # Internal cells
-            
-            if abs(grid[i][j]) >= neighbors:
+    for i, row in enumerate(grid):
+        for j, cell in enumerate(row):
+            if abs(cell) >= capacity[i][j]:
                 overflow_list.append((i, j))    
                 
     return overflow_list if overflow_list else None
 
-def overflow(grid, a_queue, grid_count=0):
+class OverflowResult:
+    """
+    Describes how an overflow process ended.
+
+    Attributes:
+    waves (int): The number of waves that were applied to the grid.
+    cells_touched (int): The number of cell updates over all waves (a cell changed by
+                         several waves counts once per wave).
+    sign (int): The sign of the overflowing player (1 or -1), or 0 if nothing overflowed.
+    settled (bool): True if no further wave can occur, False if the process was cut off
+                    by its wave budget.
+    """
+
+    def __init__(self, waves=0, cells_touched=0, sign=0, settled=True):
+        self.waves = waves
+        self.cells_touched = cells_touched
+        self.sign = sign
+        self.settled = settled
+
+    def __repr__(self):
+        return (f"OverflowResult(waves={self.waves}, cells_touched={self.cells_touched}, "
+                f"sign={self.sign}, settled={self.settled})")
+
+def _overflow_waves(grid, result, max_waves=None, journal=None, overflow_list=None, signs=None):
+    """
+    Core of the overflow engine: a generator that applies one wave to the grid per step.
+
+    Only the first wave scans the whole grid. A cell that was not touched by a wave keeps
+    its value, so it cannot start overflowing; every later wave therefore only re-checks
+    the worklist of cells touched by the previous wave (the overflowing cells and their
+    neighbors). The counts of positive and negative cells are kept up to date as cells
+    change, so the "all same sign" test does not rescan the grid either. The worklist is
+    a plain list, deduplicated with one mark per cell allocated once per run, so a wave
+    retains nothing but the list of the cells it touched.
+
+    grid: A 2D grid where each cell contains an integer. It is updated in place.
+    result: An OverflowResult that is filled in as the waves are applied.
+    max_waves: The maximum number of waves to apply, or None for no limit.
+    journal: An optional list; every wave appends one (row, col, old_value) entry for each
+             cell it touches, holding the value the cell had before that wave.
+    overflow_list: The overflowing cells in row-major order, when the caller already knows
+                   them; otherwise the first wave scans the grid for them.
+    signs: The (positive, negative) cell counts of the grid, when the caller already knows
+           them; otherwise they are counted.
+
+    It yields the list of (row, col) cells touched by each wave, each cell once, after the
+    wave was applied.
+    """
+    if overflow_list is None:
+        overflow_list = get_overflow_list(grid)
+    if not overflow_list:
+        return
+
+    topology = grid_topology(grid)
+    capacity, neighbors, cols = topology.capacity, topology.neighbors, topology.cols
+    positive, negative = signs if signs is not None else count_signs(grid)
+    if positive == 0 or negative == 0:
+        return
+
+    # Every cell touched by a wave takes this sign, so it never changes after the first wave
+    first_x, first_y = overflow_list[0]
+    overflowing_sign = grid[first_x][first_y] // abs(grid[first_x][first_y])
+    result.sign = overflowing_sign
+    # marked[k] is 1 while the cell of flat index k is in the wave being applied
+    marked = bytearray(topology.rows * cols)
+
+    while overflow_list and positive and negative:
+        if max_waves is not None and result.waves >= max_waves:
+            result.settled = False
+            return
+
+        touched = list(overflow_list)
+
+        # Overflowing cells distribute their value to neighbors and become 0
+        for (x, y) in overflow_list:
+            marked[x * cols + y] = 1
+            if journal is not None:
+                journal.append((x, y, grid[x][y]))
+            if grid[x][y] > 0:
+                positive -= 1
+            else:
+                negative -= 1
+            grid[x][y] = 0
+
+        for (x, y) in overflow_list:
+            for (i, j) in neighbors[x][y]:
+                if not marked[i * cols + j]:
+                    marked[i * cols + j] = 1
+                    touched.append((i, j))
+                    if journal is not None:
+                        journal.append((i, j, grid[i][j]))
+                if grid[i][j] > 0:
+                    positive -= 1
+                elif grid[i][j] < 0:
+                    negative -= 1
+                grid[i][j] = (abs(grid[i][j]) + 1) * overflowing_sign
+                if overflowing_sign > 0:
+                    positive += 1
+                else:
+                    negative += 1
+
+        for (i, j) in touched:
+            marked[i * cols + j] = 0
+        result.waves += 1
+        result.cells_touched += len(touched)
+        yield touched
+
+        # Only cells touched by this wave can overflow in the next one
+        overflow_list = [(i, j) for (i, j) in touched if abs(grid[i][j]) >= capacity[i][j]]
+
+def overflow_waves(grid, max_waves=None, journal=None):
+    """
+    Runs the overflow process lazily, one wave per step.
+
+    Nothing is computed up front: each step applies the next wave to the grid in place and
+    yields its changes, so a caller can show a wave as soon as it exists and only ever
+    holds one of them. When the process ends the generator returns an OverflowResult
+    (available as StopIteration.value, or from "yield from").
+
+    grid: A 2D grid where each cell contains an integer.
+    max_waves: The maximum number of waves to apply, or None for no limit.
+    journal: An optional list receiving the (row, col, old_value) of every touched cell.
+
+    It yields a list of (row, col, new_value) changes in row-major order for every wave.
+    """
+    result = OverflowResult()
+    for touched in _overflow_waves(grid, result, max_waves, journal):
+        yield [(i, j, grid[i][j]) for (i, j) in sorted(touched)]
+    return result
+
+def run_overflow(grid, a_queue=None, max_waves=None, deltas=False, journal=None,
+                 overflow_list=None, signs=None):
+    """
+    Runs the overflow process to the end (see overflow_waves) and describes how it ended.
+
+    grid: A 2D grid where each cell contains an integer.
+    a_queue: A queue to store each state of the grid during the overflow process, or None
+             to skip recording and only leave the grid in its settled state.
+    max_waves: The maximum number of waves to apply, or None for no limit. When the budget
+               runs out the grid is left in its intermediate state.
+    deltas: If True, each wave that changes few cells (see is_dense_wave) is recorded as a
+            list of (row, col, new_value) changes in row-major order instead of a full copy
+            of the grid (see apply_delta); a wave changing more is still copied, which
+            takes less memory.
+    journal: An optional list; every wave appends the (row, col, old_value) of each cell it
+             touches, so the changes can be accounted for or undone afterwards.
+    overflow_list: The overflowing cells in row-major order, if already known.
+    signs: The (positive, negative) cell counts of the grid, if already known.
+
+    It returns an OverflowResult.
+    """
+    result = OverflowResult()
+    for touched in _overflow_waves(grid, result, max_waves, journal, overflow_list, signs):
+        # Add the new grid state to the queue
+        if a_queue is not None:
+            if deltas and not is_dense_wave(len(grid), len(grid[0]), len(touched)):
+                a_queue.enqueue([(i, j, grid[i][j]) for (i, j) in sorted(touched)])
+            else:
+                a_queue.enqueue(copy_grid(grid))
+    return result
+
+def overflow(grid, a_queue, grid_count=0, deltas=False):
     """
     Handles the overflow process and updates the grid accordingly.
     
     This function perform an overflow process. 
-    The function recursively updates the grid and adds the new grids to the queue until 
-    no further overflow can occur.
+    The function updates the grid wave by wave (see run_overflow) and adds the new grids
+    to the queue until no further overflow can occur.
     
     grid: A 2D grid where each cell contains an integer.
-    a_queue: A queue to store each state of the grid during the overflow process.
+    a_queue: A queue to store each state of the grid during the overflow process, or None
+             to only mutate the grid in place to its settled state.
     grid_count: A counter to track the number of grid states processed.
+    deltas: If True, waves changing few cells are queued as lists of (row, col, new_value)
+            changes (see run_overflow).
     
     It returns the total number of grid states processed during the overflow process.
     """    
-    overflow_list = get_overflow_list(grid)
-    
-    if overflow_list and not is_all_same_sign(grid):
-        overflowing_sign = grid[overflow_list[0][0]][overflow_list[0][1]] // abs(grid[overflow_list[0][0]][overflow_list[0][1]])
+    return grid_count + run_overflow(grid, a_queue, deltas=deltas).waves
 
-        # Overflowing cells distribute their value to neighbors and become 0
-        for (x, y) in overflow_list:
-            grid[x][y] = 0
-        
-        for (x, y) in overflow_list:
-            for (i, j) in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
-                if (i in range(len(grid)) and j in range(len(grid[0]))):
-                    grid[i][j] = (abs(grid[i][j]) + 1) * overflowing_sign
-        
-        # Add the new grid state to the queue
-        a_queue.enqueue(copy_grid(grid))
-        grid_count += 1
-
-        # Continue the overflow process if there are still overflowing cells
-        if get_overflow_list(grid):
-            grid_count += overflow(grid, a_queue)
-        
-    return grid_count
+def is_dense_wave(rows, cols, changed):
+    """
+    Determines if a wave is cheaper to record as a full copy of the grid than as changes.
+
+    A change is a (row, col, new_value) tuple plus its slot in the list, about 72 bytes,
+    while a copy costs a list per row and a slot per cell, about 64 bytes per row and 8
+    per cell. On a 5x6 board a wave changing 8 cells or more is dense, on a 40x40 board
+    one changing 214 or more.
+
+    rows: The number of rows of the grid.
+    cols: The number of columns of the grid.
+    changed: The number of cells the wave changed.
+
+    It returns True if the copy takes less memory, and False otherwise.
+    """
+    return 9 * changed > rows * (cols + 8)
+
+def apply_delta(grid, delta):
+    """
+    Applies one recorded wave to the grid in place.
+
+    grid: A 2D grid where each cell contains an integer.
+    delta: A wave as recorded by overflow(deltas=True): a list of (row, col, new_value)
+           changes, or a full copy of the grid for a dense wave.
+    """
+    if delta and isinstance(delta[0], list):
+        for i, row in enumerate(delta):
+            grid[i][:] = row
+        return
+    for (i, j, value) in delta:
+        grid[i][j] = value
+
+def rebuild_snapshots(grid, deltas):
+    """
+    Rebuilds the full grid after every recorded wave.
+
+    grid: The grid as it was before the first wave. It is not modified.
+    deltas: An iterable of recorded waves (see apply_delta) in the order they were recorded.
+
+    It returns a list with one full copy of the grid per wave.
+    """
+    current = copy_grid(grid)
+    snapshots = []
+    for delta in deltas:
+        apply_delta(current, delta)
+        snapshots.append(copy_grid(current))
+    return snapshots
                     
+def count_signs(grid):
+    """
+    Counts the positive and negative cells of the grid.
+
+    grid: A 2D grid where each cell contains an integer.
+
+    It returns a tuple (positive, negative) with the number of cells of each sign.
+    """
+    positive = 0
+    negative = 0
+    for row in grid:
+        for cell in row:
+            if cell > 0:
+                positive += 1
+            elif cell < 0:
+                negative += 1
+    return positive, negative
+
 def copy_grid(grid):
         current_grid = []
         height = len(grid)
@@ -78,6 +356,37 @@ def copy_grid(grid):
             current_grid.append(grid[i].copy())
         return current_grid
 
+def pack_grid(grid, typecode='h'):
+    """
+    Packs the grid into a compact bytes string.
+
+    Every cell is stored as a signed 16-bit value in row-major order; the shape is not
+    stored, so unpacking needs the number of columns.
+
+    grid: A 2D grid where each cell contains an integer.
+    typecode: The array typecode of a cell, 'b' stores signed 8-bit values instead.
+
+    It returns the packed bytes.
+    """
+    cells = array(typecode)
+    for row in grid:
+        cells.fromlist(list(row))
+    return cells.tobytes()
+
+def unpack_grid(data, cols, typecode='h'):
+    """
+    Rebuilds a grid packed by pack_grid.
+
+    data: The packed bytes.
+    cols: The number of columns of the grid.
+    typecode: The typecode the grid was packed with.
+
+    It returns the grid as a list of lists.
+    """
+    cells = array(typecode)
+    cells.frombytes(data)
+    return [cells[i:i + cols].tolist() for i in range(0, len(cells), cols)]
+
 def is_all_same_sign(grid):
     """
     Determines if all non-zero elements in the grid have the same sign.
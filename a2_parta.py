@@ -1,6 +1,22 @@
 #Main Author(s): KRUTIN BHARATBHAI POLRA
 #Main Reviewer(s): DHARAM MEHULBHAI GHEVARIYA
 
+from collections import OrderedDict
+from functools import lru_cache
+from a1_partd import get_topology, pack_grid, TOPOLOGY_CACHE_SIZE
+
+# Seed of the Zobrist keys, so positions hash the same way in every run
+ZOBRIST_SEED = 0x9E3779B97F4A7C15
+
+# Cell values whose Zobrist keys are precomputed (-ZOBRIST_RANGE to ZOBRIST_RANGE);
+# settled boards never get near it, larger values are hashed on demand
+ZOBRIST_RANGE = 15
+
+# Bound flags of transposition table entries
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
 class HashTable:
     """
     A hash table implementation using linear probing for collision resolution.
@@ -159,3 +175,424 @@ class HashTable:
             int: The current size of the hash table.
         """
         return self.size
+
+
+class MoveCache:
+    """
+    A bounded cache of the results of playing a move on a position.
+
+    Entries are keyed by (position, move, player), where the position is the compact
+    key returned by position_key. When the cache is full the least recently used entry
+    is evicted.
+
+    Attributes:
+        cap (int): The maximum number of entries kept.
+        hits (int): The number of lookups that found an entry.
+        misses (int): The number of lookups that did not.
+    """
+
+    def __init__(self, cap=200000):
+        """
+        Initialize an empty cache.
+
+        Args:
+            cap (int): The maximum number of entries kept. Must be positive. Default is 200000.
+        """
+        self.cap = cap
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def position_key(board):
+        """
+        Build the compact hashable key of a board.
+
+        Args:
+            board (list of lists): The board.
+
+        Returns:
+            tuple: The number of columns and the packed cells of the board.
+        """
+        return (len(board[0]), pack_grid(board))
+
+    def search(self, key, move, player):
+        """
+        Look up the result of player playing move on the position key.
+
+        Args:
+            key (tuple): The position_key of the board the move is played on.
+            move (tuple): The move (row, col).
+            player (int): The player making the move.
+
+        Returns:
+            any: The cached result, or None if there is no entry. It must not be modified.
+        """
+        entry = self.entries.get((key, move, player))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end((key, move, player))
+        return entry
+
+    def insert(self, key, move, player, result):
+        """
+        Store the result of player playing move on the position key.
+
+        Evicts the least recently used entry if the cache is full.
+        """
+        self.entries[(key, move, player)] = result
+        self.entries.move_to_end((key, move, player))
+        if len(self.entries) > self.cap:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        """
+        Get the fraction of lookups that were hits.
+
+        Returns:
+            float: The hit rate, 0.0 before the first lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def capacity(self):
+        """
+        Get the maximum number of entries of the cache.
+
+        Returns:
+            int: The capacity of the cache.
+        """
+        return self.cap
+
+    def __len__(self):
+        """
+        Get the current number of entries in the cache.
+
+        Returns:
+            int: The number of cached results.
+        """
+        return len(self.entries)
+
+
+def _mix64(value):
+    """
+    Scramble an integer into a 64-bit key (the splitmix64 finalizer).
+    """
+    value = (value + ZOBRIST_SEED) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+class ZobristKeys:
+    """
+    The Zobrist keys of one board shape.
+
+    The hash of a board is the XOR of the keys of its cells, where the key of an
+    empty cell is 0. Changing a cell from old to new updates the hash with
+    hash ^ key(index, old) ^ key(index, new).
+
+    The symmetric hash of a board packs the hashes of its images under every
+    transform (a symmetry of the board, the colours swapped or not) into one int, 64
+    bits per transform, so that one pass over the cells computes all of them.
+    Symmetric positions then share the smallest of their hashes (see canonical).
+
+    Attributes:
+        cells (int): The number of cells of the shape.
+        table (list): table[index][value + ZOBRIST_RANGE] is the key of a cell holding value.
+        side (dict): The key mixed in for each player (1 or -1) to move.
+        maximizer (int): The key mixed in for positions where the searching player moves.
+        negamax (int): The key mixed in for positions scored by the negamax search.
+        transforms (list of tuples): The (permutation, colour) of every transform, the
+            identity first: cell k goes to cell permutation[k], its value multiplied by colour.
+        inverse (list of tuples): The inverse permutation of every transform.
+        symmetric_table (list): symmetric_table[index][value + ZOBRIST_RANGE] is the
+            symmetric key of a cell holding value.
+    """
+
+    def __init__(self, rows, cols):
+        """
+        Generate the keys of a rows x cols board.
+
+        Args:
+            rows (int): The number of rows.
+            cols (int): The number of columns.
+        """
+        self.cells = rows * cols
+        self.table = [[self._generate(index, value) for value in range(-ZOBRIST_RANGE, ZOBRIST_RANGE + 1)]
+                      for index in range(self.cells)]
+        self.side = {1: _mix64(-1), -1: _mix64(-2)}
+        self.maximizer = _mix64(-3)
+        self.negamax = _mix64(-4)
+        topology = get_topology(rows, cols)
+        self._cells = topology.cells
+        self._cols = cols
+        self.transforms = [(perm, colour) for perm in topology.transforms for colour in (1, -1)]
+        self.inverse = []
+        for perm, _ in self.transforms:
+            inverse = [0] * self.cells
+            for index, image in enumerate(perm):
+                inverse[image] = index
+            self.inverse.append(tuple(inverse))
+        self.symmetric_table = [[self._generate_symmetric(index, value)
+                                 for value in range(-ZOBRIST_RANGE, ZOBRIST_RANGE + 1)]
+                                for index in range(self.cells)]
+
+    @staticmethod
+    def _generate(index, value):
+        """
+        Get the key of cell index holding value.
+        """
+        if value == 0:
+            return 0
+        return _mix64((index << 16) | (value & 0xFFFF))
+
+    def _generate_symmetric(self, index, value):
+        """
+        Get the symmetric key of cell index holding value.
+        """
+        result = 0
+        for t, (perm, colour) in enumerate(self.transforms):
+            result |= self.key(perm[index], colour * value) << (64 * t)
+        return result
+
+    def key(self, index, value):
+        """
+        Get the key of cell index holding value.
+
+        Args:
+            index (int): The row-major index of the cell.
+            value (int): The value of the cell.
+
+        Returns:
+            int: The 64-bit key.
+        """
+        if -ZOBRIST_RANGE <= value <= ZOBRIST_RANGE:
+            return self.table[index][value + ZOBRIST_RANGE]
+        return self._generate(index, value)
+
+    def hash_grid(self, grid):
+        """
+        Compute the hash of a board from scratch.
+
+        Args:
+            grid (list of lists): The board.
+
+        Returns:
+            int: The XOR of the keys of every cell.
+        """
+        result = 0
+        index = 0
+        for row in grid:
+            for value in row:
+                if value:
+                    result ^= self.key(index, value)
+                index += 1
+        return result
+
+    def symmetric_key(self, index, value):
+        """
+        Get the symmetric key of cell index holding value: the key of its image under
+        every transform, 64 bits each.
+        """
+        if -ZOBRIST_RANGE <= value <= ZOBRIST_RANGE:
+            return self.symmetric_table[index][value + ZOBRIST_RANGE]
+        return self._generate_symmetric(index, value)
+
+    def hash_symmetric(self, grid):
+        """
+        Compute the symmetric hash of a board from scratch.
+
+        Args:
+            grid (list of lists): The board.
+
+        Returns:
+            int: The XOR of the symmetric keys of every cell. Its 64 bits of transform t
+            are the hash of the board mapped by that transform.
+        """
+        result = 0
+        index = 0
+        for row in grid:
+            for value in row:
+                if value:
+                    result ^= self.symmetric_key(index, value)
+                index += 1
+        return result
+
+    def canonical(self, symmetric, player):
+        """
+        Get the key shared by every image of a position.
+
+        Args:
+            symmetric (int): The symmetric hash of the board (see hash_symmetric).
+            player (int): The player to move (1 or -1).
+
+        Returns:
+            tuple: The smallest hash of an image with the key of its player to move
+            mixed in, and the transform t giving it. Moves are stored under the key
+            mapped with map_move(t, ...) and read back with unmap_move(t, ...).
+        """
+        best = None
+        best_transform = 0
+        side = self.side
+        for t, (_, colour) in enumerate(self.transforms):
+            key = ((symmetric >> (64 * t)) & 0xFFFFFFFFFFFFFFFF) ^ side[player * colour]
+            if best is None or key < best:
+                best = key
+                best_transform = t
+        return best, best_transform
+
+    def map_move(self, t, move):
+        """
+        Get the image of move (row, col) under transform t, or None if move is None.
+        """
+        if move is None:
+            return None
+        return self._cells[self.transforms[t][0][move[0] * self._cols + move[1]]]
+
+    def unmap_move(self, t, move):
+        """
+        Get the move whose image under transform t is move, or None if move is None.
+        """
+        if move is None:
+            return None
+        return self._cells[self.inverse[t][move[0] * self._cols + move[1]]]
+
+
+@lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def zobrist_keys(rows, cols):
+    """
+    Get the shared ZobristKeys of a rows x cols board.
+    """
+    return ZobristKeys(rows, cols)
+
+
+class TranspositionTable:
+    """
+    A fixed-size table of search results keyed by Zobrist hash.
+
+    Each slot holds one entry, a tuple (key, depth, flag, score, move, generation):
+    the score of the position searched depth plies deep, whether it is EXACT, a
+    LOWER bound or an UPPER bound, the best move found and the search it was stored
+    in. The table never grows, so its memory is bounded by cap entries.
+
+    An entry in a taken slot is replaced when it belongs to the same position, was
+    stored by an earlier search (see new_search), or was searched no deeper than the
+    new one. Otherwise the new result is dropped.
+
+    Attributes:
+        cap (int): The number of slots, a power of two.
+        slots (list): The entries, or None for empty slots.
+        size (int): The number of slots in use.
+        generation (int): The number of the current search.
+        hits (int): The number of lookups that found their position.
+        misses (int): The number of lookups that did not.
+    """
+
+    def __init__(self, cap=1 << 18):
+        """
+        Initialize an empty table.
+
+        Args:
+            cap (int): The number of slots, rounded down to a power of two. Default is 262144.
+        """
+        self.cap = 1 << (max(cap, 1).bit_length() - 1)
+        self.slots = [None] * self.cap
+        self.size = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        """
+        Start a new search: the entries stored so far become replaceable.
+        """
+        self.generation += 1
+
+    def search(self, key):
+        """
+        Look up the entry of a position.
+
+        Args:
+            key (int): The Zobrist key of the position.
+
+        Returns:
+            tuple: The entry (key, depth, flag, score, move, generation), or None.
+        """
+        entry = self.slots[key & (self.cap - 1)]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def insert(self, key, depth, flag, score, move):
+        """
+        Store a search result, following the replacement policy.
+
+        Args:
+            key (int): The Zobrist key of the position.
+            depth (int): The number of plies searched below the position.
+            flag (int): EXACT, LOWER or UPPER.
+            score (int): The score, or the bound on it.
+            move (tuple): The best move found, or None.
+
+        Returns:
+            bool: True if the result was stored, False if the slot kept its entry.
+        """
+        index = key & (self.cap - 1)
+        entry = self.slots[index]
+        if entry is None:
+            self.size += 1
+        elif entry[0] != key and entry[5] == self.generation and entry[1] > depth:
+            return False
+        self.slots[index] = (key, depth, flag, score, move, self.generation)
+        return True
+
+    def hit_rate(self):
+        """
+        Get the fraction of lookups that found their position.
+
+        Returns:
+            float: The hit rate, 0.0 before the first lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters.
+        """
+        self.slots = [None] * self.cap
+        self.size = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def capacity(self):
+        """
+        Get the number of slots of the table.
+
+        Returns:
+            int: The capacity of the table.
+        """
+        return self.cap
+
+    def __len__(self):
+        """
+        Get the number of slots in use.
+
+        Returns:
+            int: The number of stored entries.
+        """
+        return self.size
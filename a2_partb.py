@@ -1,9 +1,34 @@
 # Main Author: Dharam Mehulbhai Ghevariya, Krutin Bharatbhai Polra
 # Main Reviewer: Dharam Mehulbhai Ghevariya, Krutin Bharatbhai Polra
 
-from a1_partc import Queue
 import copy
-from a1_partd import overflow
+import time
+from array import array
+from a1_partd import overflow, get_topology, grid_topology, pack_grid, unpack_grid
+from a2_parta import MoveCache, EXACT, LOWER, UPPER
+from move_ordering import SearchStats
+from symmetry import unique_moves
+from tracked_board import TrackedBoard
+import vectorized
+
+# Overflow implementations GameTree can apply moves with
+OVERFLOW_BACKENDS = {
+    'list': overflow,
+    'numpy': vectorized.overflow_grid,
+}
+
+# Ways GameTree can search: 'full' builds the whole tree before running minimax,
+# 'lazy' builds children inside the alpha-beta recursion so pruned branches are never built,
+# 'parallel' runs the lazy search of every root move in a parallel.RootSplitPool,
+# 'negamax' is a principal variation search scoring every board for the side to move
+SEARCH_MODES = ('full', 'lazy', 'parallel', 'negamax')
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside alphabeta when the deadline of the search has passed.
+    """
+
 
 # This function duplicates and returns the board. You may find this useful
 def copy_board(board):
@@ -28,6 +53,8 @@ def evaluate_board(board, player):
     """
     Evaluates the board state and calculates a score for the given player.
 
+    A TrackedBoard is scored from its counters in O(1).
+
     Parameters:
     board (list of lists): The current state of the board.
     player (int): The ID of the player (1 for Player 1, -1 for Player 2).
@@ -37,6 +64,8 @@ def evaluate_board(board, player):
          - A high positive score indicates a favorable state for the player.
          - A negative score indicates a disadvantageous state.
     """
+    if isinstance(board, TrackedBoard):
+        return board.evaluate(player)
     winningPoint = 100
     losingPoint = -100
     drawPoint = 0
@@ -65,6 +94,236 @@ def evaluate_board(board, player):
     return score
 
 
+def negamax_score(board, player):
+    """
+    Scores the board for player so that the score of the opponent is its negation.
+
+    Parameters:
+    board (list of lists or TrackedBoard): The current state of the board.
+    player (int): The ID of the player (1 for Player 1, -1 for Player 2).
+
+    Returns:
+    int: evaluate_board for player minus evaluate_board for the opponent, from -200 to 200.
+    """
+    return evaluate_board(board, player) - evaluate_board(board, -player)
+
+
+def evaluate_boards(boards, player):
+    """
+    Scores a batch of boards, giving exactly the scores of evaluate_board.
+
+    A NumPy stack of boards is scored in one call (vectorized.batch_evaluate), and so
+    is a list of boards when numpy is installed. TrackedBoards are already scored from
+    their counters, so a list of them is scored one by one.
+
+    Parameters:
+    boards (list or array): The boards (list of lists or TrackedBoard), or a NumPy
+                            array of shape (count, rows, cols).
+    player (int): The ID of the player (1 for Player 1, -1 for Player 2).
+
+    Returns:
+    list of int: The score of every board, in order.
+    """
+    if isinstance(boards, list):
+        if not vectorized.HAVE_NUMPY or not boards or isinstance(boards[0], TrackedBoard):
+            return [evaluate_board(board, player) for board in boards]
+        boards = vectorized.np.array(boards, dtype=vectorized.BOARD_DTYPE)
+    return vectorized.batch_evaluate(boards, player)
+
+
+class NodeStore:
+    """
+    The nodes of a GameTree, kept in flat arrays indexed by node number.
+
+    The board of node k is cells k * size to (k + 1) * size - 1 of grids, in row-major
+    order. The children of a node are stored next to each other, as nodes first[k] to
+    first[k] + counts[k] - 1, so a node holds no list and no object of its own, and
+    dropping the store frees the whole tree at once.
+
+    Attributes:
+    rows (int): The number of rows of the boards.
+    cols (int): The number of columns of the boards.
+    size (int): The number of cells of a board.
+    cells (list of tuples): The (row, col) of every flat index, shared with the topology.
+    grids (array): The cells of every board, as signed bytes ('b'), or as signed 16-bit
+                   values ('h') once a cell did not fit in a byte.
+    moves (array): The flat index of the move that led to every node, -1 for the root.
+    scores (array): The score of every node, NO_SCORE until it is scored.
+    first (array): The number of the first child of every node.
+    counts (array): The number of children of every node.
+    """
+
+    # Score of a node that was not scored yet (scores are from -100 to 100)
+    NO_SCORE = -0x8000
+
+    def __init__(self, rows, cols, typecode='b'):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.cells = get_topology(rows, cols).cells
+        self.grids = array(typecode)
+        self.moves = array('i')
+        self.scores = array('h')
+        self.first = array('i')
+        self.counts = array('i')
+
+    def __len__(self):
+        return len(self.moves)
+
+    def _widen(self):
+        # Switches grids to 16-bit cells, which every board the game reaches fits in
+        if self.grids.typecode != 'b':
+            raise OverflowError("a cell does not fit in a 16-bit node store")
+        self.grids = array('h', self.grids)
+
+    def pack(self, board):
+        """
+        Packs a board the way the store keeps it.
+
+        Parameters:
+        board (list of lists or TrackedBoard): The board.
+
+        Returns:
+        bytes: The cells of the board, or None if a cell does not fit in the store.
+        """
+        grid = board.grid if isinstance(board, TrackedBoard) else board
+        try:
+            return pack_grid(grid, self.grids.typecode)
+        except OverflowError:
+            return None
+
+    def _cells(self, board):
+        # The cells of board in the typecode of grids, widening it if they do not fit
+        grid = board.grid if isinstance(board, TrackedBoard) else board
+        cells = array(self.grids.typecode)
+        try:
+            for row in grid:
+                cells.fromlist(row)
+        except OverflowError:
+            self._widen()
+            return self._cells(grid)
+        return cells
+
+    def append(self, board, move=-1):
+        """
+        Adds a node without children.
+
+        Parameters:
+        board (list of lists or TrackedBoard): The board of the node.
+        move (int): The flat index of the move that led to the node, -1 for a root.
+
+        Returns:
+        int: The number of the node.
+        """
+        cells = self._cells(board)
+        self.grids.extend(cells)
+        self.moves.append(move)
+        self.scores.append(self.NO_SCORE)
+        self.first.append(0)
+        self.counts.append(0)
+        return len(self.moves) - 1
+
+    def add_children(self, index, count):
+        """
+        Makes room for the children of a node, to be filled in with set.
+
+        Parameters:
+        index (int): The number of the node.
+        count (int): The number of children.
+
+        Returns:
+        int: The number of the first child.
+        """
+        first = len(self.moves)
+        self.grids.extend(array(self.grids.typecode, [0]) * (count * self.size))
+        self.moves.extend(array('i', [-1]) * count)
+        self.scores.extend(array('h', [self.NO_SCORE]) * count)
+        self.first.extend(array('i', [0]) * count)
+        self.counts.extend(array('i', [0]) * count)
+        self.first[index] = first
+        self.counts[index] = count
+        return first
+
+    def set(self, index, board, move):
+        """
+        Fills in a node made by add_children.
+
+        Parameters:
+        index (int): The number of the node.
+        board (list of lists or TrackedBoard): The board of the node.
+        move (int): The flat index of the move that led to the node.
+        """
+        cells = self._cells(board)
+        self.grids[index * self.size:(index + 1) * self.size] = cells
+        self.moves[index] = move
+
+    def add_boards(self, index, boards, moves, scores):
+        """
+        Adds the scored leaves under a node from a NumPy stack of boards.
+
+        Parameters:
+        index (int): The number of the node, which must have no children yet.
+        boards (array): The boards, of shape (count, rows, cols).
+        moves (list of int): The flat index of the move of every board.
+        scores (list of int): The score of every board.
+        """
+        count = len(moves)
+        try:
+            data = vectorized.pack_boards(boards, self.grids.typecode)
+        except OverflowError:
+            self._widen()
+            data = vectorized.pack_boards(boards, self.grids.typecode)
+        first = len(self.moves)
+        self.grids.frombytes(data)
+        self.moves.extend(moves)
+        self.scores.extend(scores)
+        self.first.extend(array('i', [0]) * count)
+        self.counts.extend(array('i', [0]) * count)
+        self.first[index] = first
+        self.counts[index] = count
+
+    def grid(self, index):
+        """
+        Returns the board of a node as a new list of lists.
+        """
+        cells = self.grids[index * self.size:(index + 1) * self.size]
+        return [cells[i:i + self.cols].tolist() for i in range(0, self.size, self.cols)]
+
+    def packed(self, index):
+        """
+        Returns the board of a node packed like pack.
+        """
+        return self.grids[index * self.size:(index + 1) * self.size].tobytes()
+
+    def subtree(self, index):
+        """
+        Returns a new store holding the subtree of a node, with that node as its root.
+
+        Parameters:
+        index (int): The number of the node.
+
+        Returns:
+        NodeStore: The copy of the subtree, numbered breadth first.
+        """
+        store = NodeStore(self.rows, self.cols, self.grids.typecode)
+        # order[k] is the node of this store that becomes node k of the new one
+        order = [index]
+        first = []
+        for node in order:
+            first.append(len(order))
+            count = self.counts[node]
+            order.extend(range(self.first[node], self.first[node] + count))
+        size = self.size
+        for node in order:
+            store.grids.extend(self.grids[node * size:(node + 1) * size])
+        store.moves = array('i', (self.moves[node] for node in order))
+        store.moves[0] = -1
+        store.scores = array('h', (self.scores[node] for node in order))
+        store.first = array('i', first)
+        store.counts = array('i', (self.counts[node] for node in order))
+        return store
+
+
 class GameTree:
     """
     Represents a game tree for determining the best moves in the game using the minimax algorithm.
@@ -73,33 +332,93 @@ class GameTree:
     player (int): The ID of the player (1 for Player 1, -1 for Player 2).
     board (list of lists): The current state of the board.
     root (Node): The root node of the game tree.
+    store (NodeStore): The nodes of the tree (only the root outside the full search mode).
     tree_height (int): The maximum depth of the game tree.
+    backend (str): The overflow implementation used by apply_moves ('list' or 'numpy').
+    cache (MoveCache): The cache of settled move results consulted by apply_moves, or None.
+    search (str): How get_move searches the tree ('full' or 'lazy').
+    table (TranspositionTable): The transposition table of the lazy search, or None.
+    ordering (MoveOrdering): The move ordering of the lazy search, or None.
+    pool (RootSplitPool): The worker processes of the parallel search, or None.
+    symmetry (bool): True if symmetric positions share their table entries and symmetric
+                     root moves are searched once (see symmetry).
+    stats (SearchStats): The cut-off counters of the lazy search.
+    nodes (int): The number of boards built below the root so far.
+    completed_height (int): The deepest search completed by the last timed get_move.
+    last_move (tuple): The move returned by the last get_move, or None.
+    pv (list of tuples): The principal variation of the last search, starting with last_move
+                         (only its first move in the full search mode).
     """
 
     class Node:
         """
         Represents a node in the game tree.
 
+        A Node is a view of one node of a NodeStore, which keeps the board, move, score
+        and children of every node in flat arrays; views are made as the tree is walked
+        and hold nothing but the place of the node. The root also keeps its board
+        unpacked as a TrackedBoard: every search starts from it and makes and unmakes
+        its moves on it, so it is the only board with counters.
+
         Attributes:
-        board (list of lists): The state of the board at this node.
+        store (NodeStore): The store holding the node.
+        index (int): The number of the node in the store.
         depth (int): The depth of this node in the tree.
         player (int): The player whose turn it is at this node.
-        move (tuple): The move that led to this node (row, col).
-        children (list of Node): The child nodes of this node.
-        score (int): The evaluation score of this node.
-        tree_height (int): The maximum depth of the game tree.
+        board (list of lists or TrackedBoard): The state of the board at this node.
+        packed (bytes): The board as the store keeps it, or None for an unpacked board.
+        move (tuple): The move that led to this node (row, col), None for the root.
+        children (list of Node): The child nodes of this node, an empty tuple for a leaf.
+        score (int): The evaluation score of this node, None until it is scored.
         """
 
-        def __init__(self, board, depth, player, move=None, tree_height=4):
-            self.board = board
+        __slots__ = ('store', 'index', 'depth', 'player', '_board')
+
+        def __init__(self, store, index, depth, player, board=None):
+            self.store = store
+            self.index = index
             self.depth = depth
             self.player = player
-            self.move = move
-            self.children = []
-            self.score = None
-            self.tree_height = tree_height
+            self._board = board
+
+        @property
+        def board(self):
+            if self._board is not None:
+                return self._board
+            return self.store.grid(self.index)
+
+        @property
+        def packed(self):
+            if self._board is not None:
+                return None
+            return self.store.packed(self.index)
 
-    def __init__(self, board, player, tree_height=4):
+        @property
+        def move(self):
+            move = self.store.moves[self.index]
+            return self.store.cells[move] if move >= 0 else None
+
+        @property
+        def children(self):
+            store = self.store
+            count = store.counts[self.index]
+            if not count:
+                return ()
+            first = store.first[self.index]
+            return [GameTree.Node(store, child, self.depth + 1, -self.player)
+                    for child in range(first, first + count)]
+
+        @property
+        def score(self):
+            score = self.store.scores[self.index]
+            return None if score == NodeStore.NO_SCORE else score
+
+        @score.setter
+        def score(self, score):
+            self.store.scores[self.index] = NodeStore.NO_SCORE if score is None else score
+
+    def __init__(self, board, player, tree_height=4, backend='list', cache=None, search='full',
+                 table=None, ordering=None, pool=None, tablebase=None, symmetry=False):
         """
         Initializes the game tree with a root node.
 
@@ -107,35 +426,132 @@ class GameTree:
         board (list of lists): The initial state of the board.
         player (int): The ID of the player (1 for Player 1, -1 for Player 2).
         tree_height (int): The maximum depth of the game tree.
+        backend (str): 'list' for the reference overflow of a1_partd, 'numpy' for the
+                       vectorized one (requires numpy).
+        cache (MoveCache): An optional cache of move results, which can be shared by
+                           successive trees.
+        search (str): 'full' to build the whole tree up front, 'lazy' to build it during
+                      the search (the root then has no children). Both pick the same move.
+                      'parallel' is the lazy search spread over pool, 'negamax' the
+                      principal variation search (see negamax).
+        table (TranspositionTable): An optional transposition table for the lazy search,
+                                    which can be shared by successive trees of the same player.
+        ordering (MoveOrdering): An optional move ordering for the lazy search. Without it
+                                 moves are searched in row-major order, the hash move first.
+        pool (RootSplitPool): The worker processes of the parallel search, which keep
+                              their own table and ordering (the ordering of the tree
+                              then only orders the root moves).
+        tablebase (Tablebase): An optional solved table the negamax search probes for
+                               exact scores. It is ignored if its board shape differs.
+        symmetry (bool): True to search only one of the root moves a symmetry of the
+                         board maps onto each other, and to key the table by the
+                         canonical key of every board (symmetric boards then share an
+                         entry; the workers of the parallel search keep their own
+                         tables and do not). The move picked scores the same as without it.
         """
+        if backend not in OVERFLOW_BACKENDS:
+            raise ValueError(f"unknown overflow backend: {backend!r}")
+        if search not in SEARCH_MODES:
+            raise ValueError(f"unknown search mode: {search!r}")
+        if table is not None and search not in ('lazy', 'negamax'):
+            raise ValueError("a transposition table needs the lazy or negamax search")
+        if ordering is not None and search == 'full':
+            raise ValueError("a move ordering needs one of the searches without a stored tree")
+        if (pool is not None) != (search == 'parallel'):
+            raise ValueError("the parallel search needs a pool, and only it uses one")
+        if tablebase is not None and search != 'negamax':
+            raise ValueError("a tablebase needs the negamax search")
+        if backend == 'numpy':
+            vectorized.require_numpy()
         self.player = player
         self.board = copy_board(board)
-        self.root = self.Node(board, 0, player)
+        # The searches make and unmake their moves on the root board, whose counters
+        # score and test the boards they reach
+        self.store = NodeStore(len(board), len(board[0]))
+        self.root = self.Node(self.store, self.store.append(board), 0, player, TrackedBoard(board))
         self.tree_height = tree_height
+        self.backend = backend
+        self.cache = cache
+        self.search = search
+        self.table = table
+        self.ordering = ordering
+        self.pool = pool
+        if tablebase is not None and (tablebase.rows, tablebase.cols) != (len(board), len(board[0])):
+            tablebase = None
+        self.tablebase = tablebase
+        self.symmetry = symmetry
+        self.stats = SearchStats()
+        self.nodes = 0
+        self.deadline = None
+        self.reached_horizon = False
+        self.completed_height = 0
+        self.last_move = None
+        self.pv = []
 
         # Build the tree from the root node
-        self.build_tree(self.root)
+        if search == 'full':
+            self.build_tree(self.root)
 
-    def build_tree(self, node):
+    def build_tree(self, node, board=None):
         """
         Recursively builds the game tree from the given node.
 
+        The nodes are added to the store of the tree (see NodeStore), and every leaf is
+        scored as it is built. With the list backend and no cache the tree is built
+        depth first on the board of the node, every move made and unmade on it (see
+        _make_child), so only that board carries counters. With the numpy backend the
+        leaves under a node are settled, scored (evaluate_boards) and packed together.
+
         Parameters:
         node (Node): The current node to expand.
+        board (TrackedBoard): The board of the node, unpacked from it if None. It is
+                              left as it was.
 
         Returns:
         None
         """
-        if node.depth == self.tree_height or self.is_terminal(node.board):
-            node.score = evaluate_board(node.board, node.player)
+        if board is None:
+            board = node.board
+            if not isinstance(board, TrackedBoard):
+                board = TrackedBoard(board)
+        if node.depth == self.tree_height or self.is_terminal(board):
+            node.score = evaluate_board(board, node.player)
             return
 
         opponent = -node.player
-        for move in self.get_possible_moves(node.board, node.player):
-            new_board = self.apply_moves(node.board, move, node.player)
-            child_node = self.Node(new_board, node.depth + 1, opponent, move, self.tree_height)
-            self.build_tree(child_node)
-            node.children.append(child_node)
+        moves = self.get_possible_moves(board, node.player)
+        if not moves:
+            node.score = evaluate_board(board, node.player)
+            return
+        if self.symmetry and node.depth == 0:
+            moves = unique_moves(board, moves)
+        store = node.store
+        cols = len(board[0])
+        flat_moves = [row * cols + col for (row, col) in moves]
+        self.nodes += len(moves)
+        if self.backend == 'numpy' and node.depth + 1 == self.tree_height:
+            # every child is a leaf: settle, score and pack them all at once
+            grid = board.grid if isinstance(board, TrackedBoard) else board
+            boards = vectorized.expand_children(grid, moves, node.player)
+            store.add_boards(node.index, boards, flat_moves, evaluate_boards(boards, opponent))
+            return
+
+        first = store.add_children(node.index, len(moves))
+        if self.cache is None and self.backend == 'list':
+            new_boards = None
+        else:
+            new_boards = self.expand_children(board, moves, node.player)
+        for k, move in enumerate(moves):
+            if new_boards is None:
+                new_board = self._make_child(board, move, node.player)
+            else:
+                new_board = new_boards[k]
+            store.set(first + k, new_board, flat_moves[k])
+            try:
+                self.build_tree(self.Node(store, first + k, node.depth + 1, opponent), new_board)
+            finally:
+                if new_boards is None:
+                    self._undo_child(board, new_board)
 
     def minimax(self, node, alpha=float('-inf'), beta=float('inf')):
         """
@@ -149,41 +565,332 @@ class GameTree:
         Returns:
         int: The evaluation score of the node.
         """
-        if not node.children:
-            node.score = evaluate_board(node.board, node.player)
-            return node.score
+        return self._minimax(node.store, node.index, node.depth, node.player, alpha, beta)
+
+    def _minimax(self, store, index, depth, player, alpha, beta):
+        # minimax on node index of store, without making a Node for every node visited
+        count = store.counts[index]
+        if not count:
+            score = store.scores[index]
+            if score == NodeStore.NO_SCORE:
+                score = evaluate_board(store.grid(index), player)
+                store.scores[index] = score
+            return score
 
-        if node.depth % 2 == 0:  # Maximizer's turn
+        first = store.first[index]
+        if depth % 2 == 0:  # Maximizer's turn
             value = float('-inf')
-            for child in node.children:
-                value = max(value, self.minimax(child, alpha, beta))
+            for child in range(first, first + count):
+                value = max(value, self._minimax(store, child, depth + 1, -player, alpha, beta))
                 alpha = max(alpha, value)
                 if alpha >= beta:
                     break  # Beta cut-off
-            node.score = value
-            return value
         else:  # Minimizer's turn
             value = float('inf')
-            for child in node.children:
-                value = min(value, self.minimax(child, alpha, beta))
+            for child in range(first, first + count):
+                value = min(value, self._minimax(store, child, depth + 1, -player, alpha, beta))
                 beta = min(beta, value)
                 if beta <= alpha:
                     break  # Alpha cut-off
-            node.score = value
-            return value
+        store.scores[index] = value
+        return value
+
+    def alphabeta(self, board, depth, player, alpha=float('-inf'), beta=float('inf'),
+                  height=None, pv=None, line=None):
+        """
+        Scores a board like minimax scores its node, building the children as it goes.
+
+        Children are made one at a time with apply_moves, so the moves after a cut-off
+        are never applied. The leaves are scored exactly as in the full tree.
+
+        With a transposition table, a board already searched to the same number of plies
+        is answered (or its window narrowed) from the table. Entries of other depths are
+        not used, so the scores stay those of the fixed-height tree, but their best move
+        is searched first (after the one of pv). The other moves follow the move ordering
+        of the tree, or row-major order.
+
+        Parameters:
+        board (TrackedBoard): The board to score.
+        depth (int): The depth of the board in the tree.
+        player (int): The player whose turn it is on the board.
+        alpha (float): The best value the maximizer can guarantee.
+        beta (float): The best value the minimizer can guarantee.
+        height (int): The depth of the leaves, tree_height if None.
+        pv (tuple): Moves to search first, one per depth from this board down, or None.
+        line (list): If given, it receives the best line of moves found from this board.
+
+        Returns:
+        int: The minimax score of the board, or a bound on it outside (alpha, beta).
+        """
+        if height is None:
+            height = self.tree_height
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.is_terminal(board):
+            return evaluate_board(board, player)
+        if depth == height:
+            self.reached_horizon = True
+            return evaluate_board(board, player)
+        moves = self.get_possible_moves(board, player)
+        if not moves:
+            return evaluate_board(board, player)
+        hash_move = pv[0] if pv and pv[0] in moves else None
+
+        table = self.table
+        if table is not None:
+            # The score of a board depends on the player to move, on whether they
+            # maximize and on the plies left, so all three are part of the lookup. With
+            # symmetry the entry is shared by the symmetric boards, its move mapped.
+            keys = board.keys
+            if self.symmetry:
+                key, transform = board.canonical_key(player)
+            else:
+                key, transform = board.zobrist ^ keys.side[player], 0
+            key ^= keys.maximizer if depth % 2 == 0 else 0
+            plies = height - depth
+            entry = table.search(key)
+            if entry is not None and hash_move is None:
+                # the best move of an earlier search of this board, at any depth
+                stored = keys.unmap_move(transform, entry[4]) if transform else entry[4]
+                if stored in moves:
+                    hash_move = stored
+            if entry is not None and entry[1] == plies:
+                flag, score = entry[2], entry[3]
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+            original_alpha, original_beta = alpha, beta
+
+        if self.ordering is not None:
+            # leaves are scored for the player to move at the root only if height is even
+            moves = self.ordering.order(board, moves, player, depth, hash_move, height % 2 == 0)
+        elif hash_move is not None:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+
+        stats = self.stats
+        stats.interior += 1
+        opponent = -player
+        maximizing = depth % 2 == 0
+        value = float('-inf') if maximizing else float('inf')
+        best_move = None
+        child_line = None
+        for k, move in enumerate(moves):
+            self.nodes += 1
+            stats.children += 1
+            child = self._make_child(board, move, player)
+            child_pv = pv[1:] if pv and move == pv[0] else None
+            if line is not None:
+                child_line = []
+            try:
+                score = self.alphabeta(child, depth + 1, opponent, alpha, beta, height, child_pv, child_line)
+            finally:
+                self._undo_child(board, child)
+            if (score > value) if maximizing else (score < value):
+                value = score
+                best_move = move
+                if line is not None:
+                    line[:] = [move] + child_line
+            if maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                stats.cutoffs += 1
+                if k == 0:
+                    stats.first_cutoffs += 1
+                if self.ordering is not None:
+                    self.ordering.record_cutoff(move, player, depth, height - depth)
+                break  # Cut-off
+
+        if table is not None:
+            if value <= original_alpha:
+                flag = UPPER
+            elif value >= original_beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            if transform:
+                best_move = keys.map_move(transform, best_move)
+            table.insert(key, plies, flag, value, best_move)
+        return value
+
+    def negamax(self, board, depth, player, alpha=float('-inf'), beta=float('inf'),
+                height=None, pv=None, line=None):
+        """
+        Scores a board for the player to move with a principal variation search.
+
+        Unlike minimax and alphabeta, which score every leaf for the player moving on it
+        but maximize or minimize by depth, every board is scored with negamax_score for
+        the player to move on it, and a child's score is the negation of the parent's.
+        The first move is searched with the full window and the others with a null
+        window, searched again only when they turn out better than the best move so far.
+        The table, ordering and time budget work as in alphabeta. With a tablebase, a
+        board it holds gets its exact score (see tablebase.Tablebase.score) instead of
+        being searched or evaluated.
+
+        Parameters:
+        board (TrackedBoard): The board to score.
+        depth (int): The depth of the board in the tree.
+        player (int): The player whose turn it is on the board.
+        alpha (float): The score player can already guarantee.
+        beta (float): The score the opponent can already hold player to.
+        height (int): The depth of the leaves, tree_height if None.
+        pv (tuple): Moves to search first, one per depth from this board down, or None.
+        line (list): If given, it receives the best line of moves found from this board.
+
+        Returns:
+        int: The score of the board for player, or a bound on it outside (alpha, beta).
+        """
+        if height is None:
+            height = self.tree_height
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.tablebase is not None:
+            score = self.tablebase.score(board, player)
+            if score is not None:
+                return score
+        if self.is_terminal(board):
+            return negamax_score(board, player)
+        if depth == height:
+            self.reached_horizon = True
+            return negamax_score(board, player)
+        moves = self.get_possible_moves(board, player)
+        if not moves:
+            return negamax_score(board, player)
+        hash_move = pv[0] if pv and pv[0] in moves else None
+
+        table = self.table
+        if table is not None:
+            keys = board.keys
+            if self.symmetry:
+                key, transform = board.canonical_key(player)
+            else:
+                key, transform = board.zobrist ^ keys.side[player], 0
+            key ^= keys.negamax
+            plies = height - depth
+            entry = table.search(key)
+            if entry is not None and hash_move is None:
+                stored = keys.unmap_move(transform, entry[4]) if transform else entry[4]
+                if stored in moves:
+                    hash_move = stored
+            if entry is not None and entry[1] == plies:
+                flag, score = entry[2], entry[3]
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+            original_alpha, original_beta = alpha, beta
+
+        if self.ordering is not None:
+            moves = self.ordering.order(board, moves, player, depth, hash_move)
+        elif hash_move is not None:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+
+        stats = self.stats
+        stats.interior += 1
+        opponent = -player
+        value = float('-inf')
+        best_move = None
+        child_line = None
+        for k, move in enumerate(moves):
+            self.nodes += 1
+            stats.children += 1
+            child = self._make_child(board, move, player)
+            child_pv = pv[1:] if pv and move == pv[0] else None
+            if line is not None:
+                child_line = []
+            try:
+                if k == 0:
+                    score = -self.negamax(child, depth + 1, opponent, -beta, -alpha, height, child_pv,
+                                          child_line)
+                else:
+                    # prove the move is no better than alpha with a null window first
+                    score = -self.negamax(child, depth + 1, opponent, -alpha - 1, -alpha, height, child_pv,
+                                          child_line)
+                    if alpha < score < beta:
+                        if line is not None:
+                            child_line = []
+                        score = -self.negamax(child, depth + 1, opponent, -beta, -alpha, height, child_pv,
+                                              child_line)
+            finally:
+                self._undo_child(board, child)
+            if score > value:
+                value = score
+                best_move = move
+                if line is not None:
+                    line[:] = [move] + child_line
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                stats.cutoffs += 1
+                if k == 0:
+                    stats.first_cutoffs += 1
+                if self.ordering is not None:
+                    self.ordering.record_cutoff(move, player, depth, height - depth)
+                break  # Cut-off
+
+        if table is not None:
+            if value <= original_alpha:
+                flag = UPPER
+            elif value >= original_beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            if transform:
+                best_move = keys.map_move(transform, best_move)
+            table.insert(key, plies, flag, value, best_move)
+        return value
 
     def apply_moves(self, board, move, player):
         """
         Applies a move to the board and handles overflows.
 
+        If the tree has a cache, it is consulted first and the settled result is stored in it.
+
         Parameters:
-        board (list of lists): The current state of the board.
+        board (list of lists or TrackedBoard): The current state of the board.
         move (tuple): The move to apply (row, col).
         player (int): The player making the move.
 
         Returns:
-        list of lists: The new state of the board after the move is applied.
+        list of lists or TrackedBoard: The new state of the board after the move is applied,
+        of the same type as board.
         """
+        if self.cache is not None:
+            return self._cached_children(board, [move], player)[0]
+        return self._apply_move(board, move, player)
+
+    def _make_child(self, board, move, player):
+        # The board after player plays move, for a depth-first search to descend into.
+        # Without a cache and with the list backend, the move is made on board itself
+        # (TrackedBoard.make_move) and _undo_child takes it back, instead of copying it.
+        if self.cache is None and self.backend == 'list' and isinstance(board, TrackedBoard):
+            board.make_move(move, player)
+            return board
+        return self.apply_moves(board, move, player)
+
+    def _undo_child(self, board, child):
+        # Reverts _make_child(board, ...), which returned child
+        if child is board:
+            board.unmake_move()
+
+    def _apply_move(self, board, move, player):
+        # apply_moves without the cache
+        if isinstance(board, TrackedBoard):
+            new_board = board.copy()
+            new_board.apply_move(move, player, self.backend)
+            return new_board
+
         new_board = copy_board(board)
         x, y = move
 
@@ -191,15 +898,93 @@ class GameTree:
         if new_board[x][y] == 0 or (new_board[x][y] > 0 and player == 1) or (new_board[x][y] < 0 and player == -1):
             new_board[x][y] += player
 
-        # Create a queue for the overflow process
-        overflow_queue = Queue()
-        overflow_queue.enqueue(new_board)
-
-        # Apply the overflow process
-        overflow(new_board, overflow_queue)
+        # Apply the overflow process; only the settled board is needed, so the
+        # intermediate waves are not recorded
+        OVERFLOW_BACKENDS[self.backend](new_board, None)
 
         return new_board
 
+    def expand_children(self, board, moves, player):
+        """
+        Applies every move to the board, like calling apply_moves once per move.
+
+        With the numpy backend all the children are stacked into one array and settled
+        together by vectorized.expand_children. If the tree has a cache, only the moves
+        missing from it are computed.
+
+        Parameters:
+        board (list of lists or TrackedBoard): The current state of the board.
+        moves (list of tuples): The moves to apply (row, col).
+        player (int): The player making the moves.
+
+        Returns:
+        list: The new board of every move, in order, of the same type as board.
+        """
+        if self.cache is not None:
+            return self._cached_children(board, moves, player)
+        return self._expand_children(board, moves, player)
+
+    def _expand_children(self, board, moves, player):
+        # expand_children without the cache
+        if self.backend != 'numpy' or not moves:
+            return [self._apply_move(board, move, player) for move in moves]
+
+        grid = board.grid if isinstance(board, TrackedBoard) else board
+        boards = vectorized.expand_children(grid, moves, player)
+        if not isinstance(board, TrackedBoard):
+            return boards.tolist()
+        p1_cells, p2_cells, p1_gems, p2_gems = vectorized.batch_counts(boards)
+        children = []
+        for k, grid in enumerate(boards.tolist()):
+            # a settled board with both players on it has no full cell left
+            quiet = p1_cells[k] > 0 and p2_cells[k] > 0
+            children.append(TrackedBoard.from_counts(grid, {1: p1_cells[k], -1: p2_cells[k]},
+                                                     {1: p1_gems[k], -1: p2_gems[k]}, quiet))
+        return children
+
+    def _cached_children(self, board, moves, player):
+        # expand_children through the cache. Only moves that start an overflow are
+        # looked up: settling any other move is just a copy and one gem, cheaper than
+        # a lookup. Entries hold the packed settled board and its counters, and every
+        # hit is unpacked into a fresh board of the caller's type.
+        tracked = board if isinstance(board, TrackedBoard) else TrackedBoard(board)
+        capacity = grid_topology(tracked.grid).capacity
+        key = None
+        children = []
+        missing = []
+        uncached = set()
+        for move in moves:
+            row, col = move
+            value = tracked.grid[row][col]
+            if tracked.quiet and (abs(value) + 1 < capacity[row][col] or value * player < 0):
+                missing.append(len(children))
+                children.append(None)
+                continue
+            if key is None:
+                key = MoveCache.position_key(tracked.grid)
+            entry = self.cache.search(key, move, player)
+            if entry is None:
+                uncached.add(len(children))
+                missing.append(len(children))
+                children.append(None)
+            elif isinstance(board, TrackedBoard):
+                packed, p1_cells, p2_cells, p1_gems, p2_gems, quiet, zobrist = entry
+                children.append(TrackedBoard.from_counts(unpack_grid(packed, tracked.cols),
+                                                         {1: p1_cells, -1: p2_cells},
+                                                         {1: p1_gems, -1: p2_gems}, quiet, zobrist))
+            else:
+                children.append(unpack_grid(entry[0], tracked.cols))
+
+        if missing:
+            computed = self._expand_children(tracked, [moves[k] for k in missing], player)
+            for k, child in zip(missing, computed):
+                if k in uncached:
+                    self.cache.insert(key, moves[k], player,
+                                      (pack_grid(child.grid), child.cells[1], child.cells[-1],
+                                       child.gems[1], child.gems[-1], child.quiet, child.zobrist))
+                children[k] = child if isinstance(board, TrackedBoard) else child.grid
+        return children
+
     def get_possible_moves(self, board, player):
         """
         Returns all possible moves for the given player on the current board.
@@ -212,10 +997,9 @@ class GameTree:
         list of tuples: List of valid moves (row, col).
         """
         moves = []
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                if board[i][j] == 0 or (board[i][j] > 0 and player == 1) or (board[i][j] < 0 and player == -1):
-                    moves.append((i, j))
+        for (i, j) in grid_topology(board).cells:
+            if board[i][j] == 0 or (board[i][j] > 0 and player == 1) or (board[i][j] < 0 and player == -1):
+                moves.append((i, j))
         return moves
 
     def is_terminal(self, board):
@@ -223,40 +1007,308 @@ class GameTree:
         Checks if the board state is terminal (game over).
 
         Parameters:
-        board (list of lists): The current state of the board.
+        board (list of lists or TrackedBoard): The current state of the board.
 
         Returns:
         bool: True if the game is over, False otherwise.
         """
+        if isinstance(board, TrackedBoard):
+            return board.is_terminal()
         return all(cell > 0 for row in board for cell in row) or all(cell < 0 for row in board for cell in row)
 
-    def get_move(self):
+    def get_move(self, time_budget_ms=None):
         """
         Determines the best move for the current player using the minimax algorithm.
 
+        The full, lazy and parallel searches return the first move with the best minimax
+        score. The negamax search scores every board for the player to move on it instead
+        (see negamax), so it can pick a different move. The lazy search only needs to
+        know whether a move beats the best one so far, so every move after the first is
+        searched with the best score as its alpha bound.
+
+        With a time budget the tree height is ignored and the board is searched with
+        iterative deepening: one ply deeper at a time, each depth trying the principal
+        variation of the previous one first. When time runs out the move of the last
+        completed depth is returned (depth 1 always completes). Deepening also stops once
+        every line reaches the end of the game.
+
+        Parameters:
+        time_budget_ms (float): The time the search may take in milliseconds, or None to
+                                search tree_height plies.
+
         Returns:
         tuple: The best move (row, col) for the current player.
         """
+        if self.ordering is not None:
+            self.ordering.new_search()
+        if time_budget_ms is not None:
+            best_move, self.pv = self._deepen(time_budget_ms)
+        elif self.search != 'full':
+            best_move, self.pv = None, []
+            if self.tree_height > 0 and not self.is_terminal(self.root.board):
+                if self.table is not None:
+                    self.table.new_search()
+                best_move, _, self.pv = self._search_root(self.tree_height, self.pv)
+        else:
+            best_score = float('-inf')
+            best_move = None
+            for child in self.root.children:
+                score = self.minimax(child)
+                if score > best_score:
+                    best_score = score
+                    best_move = child.move
+            self.pv = [best_move] if best_move is not None else []
+        self.last_move = best_move
+        return best_move
+
+    def get_move_and_line(self, time_budget_ms=None):
+        """
+        Determines the best move like get_move, along with the line expected to follow it.
+
+        Parameters:
+        time_budget_ms (float): The time the search may take in milliseconds, or None to
+                                search tree_height plies.
+
+        Returns:
+        tuple: The best move (row, col), and the principal variation (a list of moves,
+               alternating between the players, starting with the best move). In the
+               full search mode the line only holds the best move.
+        """
+        best_move = self.get_move(time_budget_ms)
+        return best_move, list(self.pv)
+
+    def reroot(self, board):
+        """
+        Moves the root of the tree to board, if board is a grandchild of the root (the
+        board after a move of the player and a reply of the opponent).
+
+        In the full search mode the subtree of the grandchild becomes the tree and its
+        leaves are extended to tree_height, instead of building it again. In the other
+        modes, which keep no tree, the rest of the principal variation is searched first
+        if the opponent replied as expected; the table and ordering stay warm either way.
+
+        Parameters:
+        board (list of lists): The board the player now has to move on.
+
+        Returns:
+        bool: True if the tree was moved to board, False if board is not a grandchild
+              (the tree is then unchanged).
+        """
+        if self.search == 'full':
+            packed = self.store.pack(board)
+            for child in self.root.children:
+                for grandchild in child.children:
+                    if grandchild.packed == packed:
+                        self._promote(grandchild, [child.move, grandchild.move])
+                        return True
+            return False
+
+        # the lazy searches keep no tree: replay the move played and every reply to it
+        if self.last_move is None:
+            return False
+        child = self.apply_moves(self.root.board, self.last_move, self.player)
+        for reply in self.get_possible_moves(child, -self.player):
+            grandchild = self.apply_moves(child, reply, -self.player)
+            if grandchild == board:
+                store = NodeStore(len(board), len(board[0]))
+                self._promote(self.Node(store, store.append(grandchild), 0, self.player, grandchild),
+                              [self.last_move, reply])
+                return True
+        return False
+
+    def _promote(self, node, moves):
+        # Makes node, reached from the root by moves, the new root. Its subtree is
+        # copied into a store of its own, so the rest of the old tree is freed.
+        self.pv = self.pv[2:] if self.pv[:2] == moves else []
+        self.last_move = None
+        board = node.board
+        if not isinstance(board, TrackedBoard):
+            board = TrackedBoard(board)  # the root keeps its board unpacked
+        self.board = copy_board(board)
+        self.store = node.store.subtree(node.index)
+        self.root = self.Node(self.store, 0, 0, self.player, board)
+        self.nodes = 0
+        if self.search == 'full':
+            self._regrow(self.root)
+
+    def _regrow(self, node):
+        # Builds the leaves of the promoted subtree out to tree_height again
+        children = node.children
+        if children:
+            for child in children:
+                self._regrow(child)
+        else:
+            self.build_tree(node)
+
+    def score_move(self, move, alpha=float('-inf'), height=None, pv=None, line=None):
+        """
+        Scores one move of the root player with alphabeta.
+
+        Parameters:
+        move (tuple): The move (row, col) to play on the root board.
+        alpha (float): Scores at or below alpha do not need to be exact.
+        height (int): The depth of the leaves, tree_height if None.
+        pv (tuple): Moves to search first below the move, or None.
+        line (list): If given, it receives the best line of moves found after the move.
+
+        Returns:
+        int: The minimax score of the move, or an upper bound on it at or below alpha.
+        """
+        self.nodes += 1
+        board = self.root.board
+        child = self._make_child(board, move, self.player)
+        try:
+            return self.alphabeta(child, 1, -self.player, alpha, float('inf'), height, pv, line)
+        finally:
+            self._undo_child(board, child)
+
+    def _search_root(self, height, pv=None):
+        # Searches the root height plies deep with alphabeta, trying the first move of pv
+        # first (then following the move ordering, if any), and returns (best move, its
+        # score, principal variation). Ties still go to the first best move in row-major
+        # order: a move before the best one so far is searched with alpha one below the
+        # best score, since an equal score beats it.
+        if self.search == 'parallel':
+            return self._parallel_root(height, pv)
+        if self.search == 'negamax':
+            return self._negamax_root(height, pv)
+        board = self.root.board
+        moves = self.get_possible_moves(board, self.player)
+        if self.symmetry:
+            moves = unique_moves(board, moves)
+        first = pv[0] if pv and pv[0] in moves else None
+        if self.ordering is not None:
+            order = self.ordering.order(board, moves, self.player, 0, first, height % 2 == 0)
+        else:
+            order = list(moves)
+            if first is not None:
+                order.remove(first)
+                order.insert(0, first)
+        index = {move: k for k, move in enumerate(moves)}
+
+        best_score = float('-inf')
+        best_move = None
+        best_line = []
+        for move in order:
+            if best_move is not None and index[move] < index[best_move]:
+                alpha = best_score - 1
+            else:
+                alpha = best_score
+            line = []
+            child_pv = pv[1:] if pv and move == pv[0] else None
+            # a score at or below alpha is only an upper bound, but cannot win either
+            score = self.score_move(move, alpha, height, child_pv, line)
+            if score > alpha:
+                best_score = score
+                best_move = move
+                best_line = [move] + line
+        return best_move, best_score, best_line
+
+    def _negamax_root(self, height, pv=None):
+        # _search_root for the negamax search mode. Ties go to the move searched first.
+        board = self.root.board
+        moves = self.get_possible_moves(board, self.player)
+        if self.symmetry:
+            moves = unique_moves(board, moves)
+        first = pv[0] if pv and pv[0] in moves else None
+        if self.ordering is not None:
+            moves = self.ordering.order(board, moves, self.player, 0, first)
+        elif first is not None:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        opponent = -self.player
         best_score = float('-inf')
         best_move = None
-        for child in self.root.children:
-            score = self.minimax(child)
+        best_line = []
+        for move in moves:
+            self.nodes += 1
+            child = self._make_child(board, move, self.player)
+            child_pv = pv[1:] if pv and move == pv[0] else None
+            line = []
+            try:
+                if best_move is None:
+                    score = -self.negamax(child, 1, opponent, float('-inf'), float('inf'), height, child_pv,
+                                          line)
+                else:
+                    score = -self.negamax(child, 1, opponent, -best_score - 1, -best_score, height, child_pv,
+                                          line)
+                    if score > best_score:
+                        line = []
+                        score = -self.negamax(child, 1, opponent, float('-inf'), -best_score, height,
+                                              child_pv, line)
+            finally:
+                self._undo_child(board, child)
             if score > best_score:
                 best_score = score
-                best_move = child.move
-        return best_move
+                best_move = move
+                best_line = [move] + line
+        return best_move, best_score, best_line
+
+    def _parallel_root(self, height, pv=None):
+        # _search_root for the parallel search mode. The pool reports which scores are
+        # exact; every move scoring the best score is among them.
+        board = self.root.board
+        moves = self.get_possible_moves(board, self.player)
+        if self.symmetry:
+            moves = unique_moves(board, moves)
+        first = pv[0] if pv and pv[0] in moves else None
+        if self.ordering is not None:
+            order = self.ordering.order(board, moves, self.player, 0, first, height % 2 == 0)
+        else:
+            order = list(moves)
+            if first is not None:
+                order.remove(first)
+                order.insert(0, first)
+        deadline = None
+        if self.deadline is not None:
+            deadline = time.time() + (self.deadline - time.perf_counter())
+        index = {move: k for k, move in enumerate(moves)}
+        results = self.pool.search(board.grid, self.player, height, order, index, pv, deadline)
+
+        best = None
+        for (move, score, alpha, line, nodes, reached_horizon) in results:
+            self.nodes += nodes
+            self.reached_horizon = self.reached_horizon or reached_horizon
+            if score > alpha and (best is None or score > best[1]
+                                  or (score == best[1] and index[move] < index[best[0]])):
+                best = (move, score, line)
+        return best
+
+    def _deepen(self, time_budget_ms):
+        # get_move with a time budget (iterative deepening), returns the move and its line
+        if self.is_terminal(self.root.board):
+            return None, []
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        best_move = None
+        pv = self.pv
+        height = 0
+        while True:
+            height += 1
+            self.deadline = deadline if best_move is not None else None
+            self.reached_horizon = False
+            if self.table is not None:
+                self.table.new_search()
+            try:
+                best_move, _, pv = self._search_root(height, pv)
+            except SearchTimeout:
+                break
+            finally:
+                self.deadline = None
+            self.completed_height = height
+            if not self.reached_horizon or time.perf_counter() >= deadline:
+                break
+        return best_move, pv
 
     def clear_tree(self):
         """
         Clears the game tree by deleting all nodes.
 
+        The nodes live in the flat arrays of the store, so dropping it frees the whole
+        tree at once, without walking it.
+
         Returns:
         None
         """
-        def delete_subtree(node):
-            for child in node.children:
-                delete_subtree(child)
-            node.children = []
-
-        delete_subtree(self.root)
         self.root = None
+        self.store = None
@@ -0,0 +1,720 @@
+#   Micro-benchmarks for the game engine.
+#   To use this, run: python benchmark.py [name ...]
+#   With no names every benchmark is run.
+
+import os
+import tempfile
+import random
+import sys
+import time
+import tracemalloc
+from a1_partc import Queue
+from a1_partd import overflow, copy_grid, get_overflow_list, is_all_same_sign
+from a2_parta import MoveCache, TranspositionTable
+from a2_partb import GameTree, evaluate_board
+from bitboard import BoardState
+from mcts import MCTSTree, _play, _random_bit
+from move_ordering import MoveOrdering, SearchStats
+from tablebase import solve, LOSS
+from opening_book import OpeningBook, build_book, write_book, start_board
+from parallel import RootSplitPool
+from player1 import PlayerOne
+from player2 import PlayerTwo
+from tracked_board import TrackedBoard
+import vectorized
+from test_a1_partd import reference_overflow, cascade_grid
+
+
+def best_of(func, repeat=5):
+    """
+    Runs func repeat times and returns the fastest wall-clock time in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_overflow():
+    """
+    Compares the frontier-driven overflow against the full-rescan reference
+    on long chain reactions.
+    """
+    print("overflow: long cascades (full rescan vs frontier)")
+    for rows, cols in [(5, 6), (10, 10), (20, 20), (40, 40)]:
+        grid = cascade_grid(rows, cols)
+        waves = overflow(copy_grid(grid), Queue())
+        old = best_of(lambda: reference_overflow(copy_grid(grid), Queue()))
+        new = best_of(lambda: overflow(copy_grid(grid), Queue()))
+        print(f"  {rows:>3}x{cols:<3} waves={waves:<4} rescan={old * 1000:8.2f}ms "
+              f"frontier={new * 1000:8.2f}ms speedup={old / new:5.1f}x")
+
+
+def bench_numpy():
+    """
+    Compares the list-based and NumPy overflow backends.
+    """
+    if not vectorized.HAVE_NUMPY:
+        print("numpy: skipped, numpy is not installed")
+        return
+    print("numpy: overflow backends (list vs numpy)")
+    for rows, cols in [(5, 6), (20, 20), (80, 80)]:
+        grid = cascade_grid(rows, cols)
+        old = best_of(lambda: overflow(copy_grid(grid), Queue()))
+        new = best_of(lambda: vectorized.overflow_grid(copy_grid(grid), Queue()))
+        print(f"  cascade {rows:>3}x{cols:<3} list={old * 1000:8.2f}ms "
+              f"numpy={new * 1000:8.2f}ms speedup={old / new:5.1f}x")
+    board = [[0] * 6 for _ in range(5)]
+    board[0][0] = 1
+    board[4][5] = -1
+    for backend in ('list', 'numpy'):
+        elapsed = best_of(lambda: GameTree(board, 1, 3, backend=backend).get_move(), 1)
+        print(f"  GameTree depth 3 backend={backend:<5} {elapsed * 1000:8.1f}ms")
+
+
+def bench_recording():
+    """
+    Measures what recording every overflow wave costs a search node.
+    """
+    def recorded_apply(board):
+        # apply_moves as it was before it stopped recording the waves
+        new_board = copy_grid(board)
+        new_board[0][0] += 1
+        overflow_queue = Queue()
+        overflow_queue.enqueue(new_board)
+        overflow(new_board, overflow_queue)
+        return new_board
+
+    def peak_memory(func):
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    print("recording: apply a move and settle it (recorded waves vs final state only)")
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    for rows, cols in [(5, 6), (10, 10)]:
+        board = cascade_grid(rows, cols)
+        board[0][0] = 1
+        old = best_of(lambda: recorded_apply(board))
+        new = best_of(lambda: tree.apply_moves(board, (0, 0), 1))
+        old_peak = peak_memory(lambda: recorded_apply(board))
+        new_peak = peak_memory(lambda: tree.apply_moves(board, (0, 0), 1))
+        print(f"  {rows:>3}x{cols:<3} recorded={old * 1000:7.3f}ms peak={old_peak:>7}B "
+              f"final-only={new * 1000:7.3f}ms peak={new_peak:>7}B")
+
+
+def bench_deltas():
+    """
+    Compares the memory held by a recorded cascade as full snapshots and as deltas.
+    """
+    def fuse_grid(rows, cols):
+        # an otherwise empty board with one burning row of gems: few cells per wave
+        grid = [[0] * cols for _ in range(rows)]
+        grid[0] = [2] * cols
+        grid[0][cols - 1] = -1
+        return grid
+
+    print("deltas: memory of a recorded cascade (snapshots vs deltas)")
+    cases = [('dense', cascade_grid, size) for size in [(5, 6), (20, 20), (40, 40)]]
+    cases += [('sparse', fuse_grid, size) for size in [(5, 6), (20, 20), (40, 40)]]
+    for kind, make_grid, (rows, cols) in cases:
+        grid = make_grid(rows, cols)
+        sizes = []
+        for deltas in (False, True):
+            a_queue = Queue()
+            waves = overflow(copy_grid(grid), a_queue, deltas=deltas)
+            # every wave is a list of rows or a list of (row, col, value) tuples;
+            # the small ints inside are shared, so only the containers count
+            size = 0
+            while not a_queue.is_empty():
+                wave = a_queue.dequeue()
+                size += sys.getsizeof(wave) + sum(sys.getsizeof(item) for item in wave)
+            sizes.append(size)
+        print(f"  {kind:<6} {rows:>3}x{cols:<3} waves={waves:<4} snapshots={sizes[0]:>9}B deltas={sizes[1]:>9}B")
+
+
+def midgame_boards(count, seed=1, rows=5, cols=6):
+    """
+    Returns boards reached by random play from the starting position of game.py.
+    """
+    rng = random.Random(seed)
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    boards = []
+    while len(boards) < count:
+        board = [[0] * cols for _ in range(rows)]
+        board[0][0] = 1
+        board[rows - 1][cols - 1] = -1
+        player = 1
+        for _ in range(rng.randint(6, 30)):
+            if tree.is_terminal(board) or is_all_same_sign(board):
+                break
+            board = tree.apply_moves(board, rng.choice(tree.get_possible_moves(board, player)), player)
+            player = -player
+        boards.append(board)
+    return boards
+
+
+def bench_leaves():
+    """
+    Compares scoring leaves one at a time with scoring them in one NumPy call.
+    """
+    if not vectorized.HAVE_NUMPY:
+        print("leaves: skipped, numpy is not installed")
+        return
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    grids = []
+    for board in midgame_boards(20, seed=25):
+        grids += tree.expand_children(board, tree.get_possible_moves(board, 1), 1)
+    tracked = [TrackedBoard(grid) for grid in grids]
+    boards = vectorized.np.array(grids, dtype=vectorized.BOARD_DTYPE)
+    lists = best_of(lambda: [evaluate_board(grid, 1) for grid in grids])
+    counters = best_of(lambda: [evaluate_board(board, 1) for board in tracked])
+    batch = best_of(lambda: vectorized.batch_evaluate(boards, 1))
+    print(f"leaves: {len(grids)} 5x6 leaves, per leaf: list={lists / len(grids) * 1e6:5.2f}us "
+          f"TrackedBoard={counters / len(grids) * 1e6:5.2f}us batch={batch / len(grids) * 1e6:5.2f}us")
+
+    boards = midgame_boards(5, seed=3)
+    for height in (2, 3):
+        times = [best_of(lambda: [GameTree(b, 1, height, backend=backend).get_move() for b in boards], 1)
+                 for backend in ('list', 'numpy')]
+        print(f"  full tree depth {height} get_move on 5 midgame boards: list={times[0] * 1000:7.1f}ms "
+              f"numpy (batched leaves)={times[1] * 1000:7.1f}ms")
+
+
+def bench_bitboard():
+    """
+    Compares the list of lists board with the bitboard BoardState on the basic
+    operations of the search, and on the random playouts of MCTSTree, the engine
+    that plays on BoardStates.
+    """
+    def list_playouts():
+        # 20 random moves from every board, as an MCTS playout on list boards would
+        rng = random.Random(1)
+        for board in boards:
+            player = 1
+            for _ in range(20):
+                board = tree.apply_moves(board, rng.choice(tree.get_possible_moves(board, player)), player)
+                if is_all_same_sign(board):
+                    break
+                player = -player
+
+    def bitboard_playouts():
+        # the same playouts on BoardStates, with the move code of mcts.py
+        rng = random.Random(1)
+        for state in states:
+            state = state.copy()
+            player = 1
+            for _ in range(20):
+                if _play(state, _random_bit(state.legal_mask(player), rng), player):
+                    break
+                player = -player
+
+    boards = midgame_boards(200)
+    states = [BoardState.from_grid(board) for board in boards]
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    moves = [tree.get_possible_moves(board, 1)[0] for board in boards]
+    cases = [
+        ('moves', lambda: [tree.get_possible_moves(b, 1) for b in boards],
+                  lambda: [s.get_possible_moves(1) for s in states]),
+        ('terminal', lambda: [tree.is_terminal(b) for b in boards],
+                     lambda: [s.is_terminal() for s in states]),
+        ('same sign', lambda: [is_all_same_sign(b) for b in boards],
+                      lambda: [s.is_all_same_sign() for s in states]),
+        ('capacity', lambda: [get_overflow_list(b) for b in boards],
+                     lambda: [s.at_capacity_mask() for s in states]),
+        ('evaluate', lambda: [evaluate_board(b, 1) for b in boards],
+                     lambda: [s.evaluate(1) for s in states]),
+        ('apply', lambda: [tree.apply_moves(b, m, 1) for b, m in zip(boards, moves)],
+                  lambda: [s.apply_move(m, 1) for s, m in zip(states, moves)]),
+        ('playout', list_playouts, bitboard_playouts),
+    ]
+    print(f"bitboard: {len(boards)} midgame 5x6 boards (list vs bitboard)")
+    for name, old_func, new_func in cases:
+        old = best_of(old_func)
+        new = best_of(new_func)
+        print(f"  {name:<10} list={old * 1000:7.3f}ms bitboard={new * 1000:7.3f}ms "
+              f"speedup={old / new:5.1f}x")
+
+
+def bench_expand():
+    """
+    Compares building trees one child at a time with the batched NumPy expansion.
+    """
+    if not vectorized.HAVE_NUMPY:
+        print("expand: skipped, numpy is not installed")
+        return
+    print("expand: children of one board (apply_moves per child vs batched)")
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    for rows, cols in [(5, 6), (9, 9), (15, 15)]:
+        boards = midgame_boards(20, seed=5, rows=rows, cols=cols)
+        moves = [tree.get_possible_moves(b, 1) for b in boards]
+        old = best_of(lambda: [[tree.apply_moves(b, m, 1) for m in ms] for b, ms in zip(boards, moves)])
+        new = best_of(lambda: [vectorized.expand_children(b, ms, 1) for b, ms in zip(boards, moves)])
+        print(f"  {rows:>2}x{cols:<2} list={old * 1000:8.2f}ms batched={new * 1000:8.2f}ms "
+              f"speedup={old / new:5.2f}x")
+
+    boards = midgame_boards(5, seed=3)
+    print("expand: GameTree construction (apply_moves per child vs batched children)")
+    for rows, cols, height in [(5, 6, 3), (9, 9, 2), (15, 15, 2)]:
+        if (rows, cols) != (5, 6):
+            boards = midgame_boards(3, seed=3, rows=rows, cols=cols)
+        times = []
+        for backend in ('list', 'numpy'):
+            times.append(best_of(lambda: [GameTree(b, 1, height, backend=backend) for b in boards], 1))
+        print(f"  {rows:>2}x{cols:<2} depth {height} list={times[0] * 1000:8.1f}ms "
+              f"batched={times[1] * 1000:8.1f}ms speedup={times[0] / times[1]:5.2f}x")
+
+
+def play_game(moves, height, caches=None, rows=5, cols=6):
+    """
+    Plays moves turns of two GameTree bots from an empty board and returns the moves made.
+    """
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    board = [[0] * cols for _ in range(rows)]
+    player = 1
+    played = []
+    for turn in range(moves):
+        cache = caches[player] if caches else None
+        move = GameTree(board, player, height, cache=cache).get_move()
+        played.append(move)
+        board = tree.apply_moves(board, move, player)
+        if turn > 1 and is_all_same_sign(board):
+            break
+        player = -player
+    return played
+
+
+def bench_cache():
+    """
+    Times a game between two bots with and without a move cache kept across turns.
+    """
+    print("cache: 5x6 game of 16 moves (no cache vs a MoveCache per bot)")
+    for height in (2, 3):
+        start = time.perf_counter()
+        expected = play_game(16, height)
+        old = time.perf_counter() - start
+        caches = {1: MoveCache(), -1: MoveCache()}
+        start = time.perf_counter()
+        played = play_game(16, height, caches)
+        new = time.perf_counter() - start
+        assert played == expected
+        hits = sum(c.hits for c in caches.values())
+        lookups = hits + sum(c.misses for c in caches.values())
+        entries = sum(len(c) for c in caches.values())
+        print(f"  depth {height} plain={old * 1000:8.1f}ms cached={new * 1000:8.1f}ms "
+              f"speedup={old / new:5.2f}x hit rate={hits / lookups:6.1%} entries={entries}")
+
+    print("cache: depth 3 trees of 5 midgame boards (no cache vs a warm cache)")
+    boards = midgame_boards(5, seed=3)
+    cache = MoveCache()
+    for board in boards:
+        GameTree(board, 1, 3, cache=cache)
+    old = best_of(lambda: [GameTree(b, 1, 3) for b in boards], 3)
+    new = best_of(lambda: [GameTree(b, 1, 3, cache=cache) for b in boards], 3)
+    print(f"  plain={old * 1000:8.1f}ms cached={new * 1000:8.1f}ms speedup={old / new:5.2f}x "
+          f"entries={len(cache)}")
+
+
+def bench_lazy():
+    """
+    Compares building the whole tree before minimax with building it during alpha-beta.
+    """
+    print("lazy: get_move on 5 midgame 5x6 boards (full tree vs lazy alpha-beta)")
+    boards = midgame_boards(5, seed=3)
+    for height in (3, 4):
+        full_nodes = sum(GameTree(b, 1, height).nodes for b in boards)
+        trees = [GameTree(b, 1, height, search='lazy') for b in boards]
+        for tree in trees:
+            tree.get_move()
+        lazy_nodes = sum(tree.nodes for tree in trees)
+        old = best_of(lambda: [GameTree(b, 1, height).get_move() for b in boards], 1)
+        new = best_of(lambda: [GameTree(b, 1, height, search='lazy').get_move() for b in boards], 1)
+        print(f"  depth {height} full={old * 1000:8.1f}ms ({full_nodes} boards) "
+              f"lazy={new * 1000:8.1f}ms ({lazy_nodes} boards) speedup={old / new:5.2f}x")
+
+
+def bench_table():
+    """
+    Measures the lazy alpha-beta search with and without a transposition table.
+    """
+    print("table: get_move on 5 midgame 5x6 boards (lazy search, no table vs table)")
+    boards = midgame_boards(5, seed=3)
+    for height in (3, 4):
+        results = []
+        for table in (None, TranspositionTable()):
+            trees = [GameTree(b, 1, height, search='lazy', table=table) for b in boards]
+            start = time.perf_counter()
+            for tree in trees:
+                tree.get_move()
+            results.append((time.perf_counter() - start, sum(tree.nodes for tree in trees)))
+        (old, old_nodes), (new, new_nodes) = results
+        print(f"  depth {height} plain={old * 1000:8.1f}ms ({old_nodes} boards) "
+              f"table={new * 1000:8.1f}ms ({new_nodes} boards) speedup={old / new:5.2f}x "
+              f"hit rate={table.hit_rate():6.1%} entries={len(table)}")
+
+
+def bench_deepen():
+    """
+    Shows how deep iterative deepening gets within a per-move time budget.
+    """
+    print("deepen: get_move(time_budget_ms) on 5 midgame 5x6 boards")
+    boards = midgame_boards(5, seed=3)
+    for budget in (100, 500, 1000):
+        heights = []
+        worst = 0
+        for board in boards:
+            tree = GameTree(board, 1, search='lazy', table=TranspositionTable(), ordering=MoveOrdering())
+            start = time.perf_counter()
+            tree.get_move(time_budget_ms=budget)
+            worst = max(worst, time.perf_counter() - start)
+            heights.append(tree.completed_height)
+        print(f"  budget {budget:>4}ms completed depths={heights} slowest move={worst * 1000:7.1f}ms")
+
+
+def bench_ordering():
+    """
+    Compares cut-off statistics of the lazy search under each move ordering heuristic.
+    """
+    boards = midgame_boards(5, seed=3)
+    configs = [
+        ('row-major', lambda: None, False),
+        ('tactical', lambda: MoveOrdering(killers=False, history=False), False),
+        ('+killers', lambda: MoveOrdering(history=False), False),
+        ('+history', lambda: MoveOrdering(), False),
+        ('+table', lambda: MoveOrdering(), True),
+    ]
+    for height in (3, 4):
+        print(f"ordering: depth {height} get_move on 5 midgame 5x6 boards")
+        for name, make, with_table in configs:
+            stats = SearchStats()
+            nodes = 0
+            start = time.perf_counter()
+            for board in boards:
+                table = TranspositionTable() if with_table else None
+                tree = GameTree(board, 1, height, search='lazy', table=table, ordering=make())
+                tree.get_move()
+                nodes += tree.nodes
+                for field in ('interior', 'children', 'cutoffs', 'first_cutoffs'):
+                    setattr(stats, field, getattr(stats, field) + getattr(tree.stats, field))
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<10} boards={nodes:<7} {elapsed * 1000:8.1f}ms branching={stats.branching_factor():5.2f} "
+                  f"cutoffs={stats.cutoff_rate():6.1%} first-move cutoffs={stats.first_cutoff_rate():6.1%}")
+
+
+def bench_nodes():
+    """
+    Measures the peak memory of building the full search tree with tracemalloc.
+    """
+    boards = [('open 5x6, depth 3', [[0] * 6 for _ in range(5)], 3)]
+    boards += [(f'midgame 5x6 #{k}, depth 4', board, 4) for k, board in enumerate(midgame_boards(2, seed=3))]
+    print("nodes: peak memory of a full GameTree")
+    for name, board, height in boards:
+        tracemalloc.start()
+        start = time.perf_counter()
+        tree = GameTree(board, 1, height)
+        elapsed = time.perf_counter() - start
+        nodes = tree.nodes
+        _, peak = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        tree.clear_tree()
+        cleared = time.perf_counter() - start
+        tracemalloc.stop()
+        print(f"  {name:<24} nodes={nodes:<7} peak={peak / 2 ** 20:7.1f}MiB ({peak / nodes:6.0f}B/node) "
+              f"build={elapsed * 1000:7.1f}ms clear={cleared * 1000:6.1f}ms")
+
+
+class CopyingTree(GameTree):
+    # GameTree searching copies of the board, as before make/unmake
+    def _make_child(self, board, move, player):
+        return self.apply_moves(board, move, player)
+
+
+def bench_unmake():
+    """
+    Compares searching one board with make/unmake against searching copies of it.
+    """
+    boards = midgame_boards(5, seed=3)
+    for search in ('lazy', 'negamax'):
+        print(f"unmake: depth 5 {search} get_move on 5 midgame 5x6 boards, with ordering")
+        for name, tree_class, cache in [('copies', CopyingTree, False), ('copies+cache', CopyingTree, True),
+                                        ('make/unmake', GameTree, False)]:
+            def run():
+                for board in boards:
+                    tree_class(board, 1, 5, search=search, cache=MoveCache() if cache else None,
+                               ordering=MoveOrdering()).get_move()
+            elapsed = best_of(run, 5)
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"  {name:<13} {elapsed * 1000:8.1f}ms peak={peak / 2 ** 20:6.2f}MiB")
+
+
+def bench_negamax():
+    """
+    Compares the negamax search with the lazy alpha-beta search, in boards searched on
+    midgame boards and in games played against each other.
+    """
+    boards = midgame_boards(5, seed=3)
+    for height in (3, 4):
+        print(f"negamax: depth {height} get_move on 5 midgame 5x6 boards, with ordering and table")
+        for search in ('lazy', 'negamax'):
+            stats = SearchStats()
+            nodes = 0
+            start = time.perf_counter()
+            for board in boards:
+                tree = GameTree(board, 1, height, search=search, table=TranspositionTable(),
+                                ordering=MoveOrdering())
+                tree.get_move()
+                nodes += tree.nodes
+                for field in ('interior', 'children', 'cutoffs', 'first_cutoffs'):
+                    setattr(stats, field, getattr(stats, field) + getattr(tree.stats, field))
+            elapsed = time.perf_counter() - start
+            print(f"  {search:<8} boards={nodes:<7} {elapsed * 1000:8.1f}ms "
+                  f"branching={stats.branching_factor():5.2f} cutoffs={stats.cutoff_rate():6.1%}")
+
+    # games from random two-move openings, each side playing both colours
+    height, games, max_turns = 3, 10, 150
+    rng = random.Random(5)
+    wins = {'lazy': 0, 'negamax': 0, 'unfinished': 0}
+    start = time.perf_counter()
+    for game in range(games):
+        searches = {1: 'negamax', -1: 'lazy'} if game % 2 == 0 else {1: 'lazy', -1: 'negamax'}
+        board = [[0] * 6 for _ in range(5)]
+        player = 1
+        tree = GameTree(board, 1, 0)
+        for turn in range(max_turns):
+            if turn < 2:
+                move = rng.choice(tree.get_possible_moves(board, player))
+            else:
+                move = GameTree(board, player, height, search=searches[player], table=TranspositionTable(1 << 12),
+                                ordering=MoveOrdering()).get_move()
+            board = tree.apply_moves(board, move, player)
+            if turn > 1 and is_all_same_sign(board):
+                wins[searches[player]] += 1
+                break
+            player = -player
+        else:
+            wins['unfinished'] += 1
+    elapsed = time.perf_counter() - start
+    print(f"negamax: {games} games at depth {height} against lazy: {wins} ({elapsed:.1f}s)")
+
+
+def bench_mcts():
+    """
+    Measures the playouts per second of MCTSTree and its win rate against the
+    GameTree bot, both given the same time per move.
+    """
+    boards = [('open 5x6', [[0] * 6 for _ in range(5)])]
+    boards += [(f'midgame 5x6 #{k}', board) for k, board in enumerate(midgame_boards(2, seed=3))]
+    boards += [('open 9x9', [[0] * 9 for _ in range(9)])]
+    print("mcts: playouts per second of 400 iterations of 8 playouts")
+    for name, board in boards:
+        tree = MCTSTree(board, 1, seed=1)
+        start = time.perf_counter()
+        tree.get_move()
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<16} {tree.playouts / elapsed:8.0f} playouts/s")
+
+    budget, games, max_turns = 100, 10, 200
+    rng = random.Random(7)
+    wins = {'mcts': 0, 'gametree': 0, 'unfinished': 0}
+    start = time.perf_counter()
+    for game in range(games):
+        engines = {1: 'mcts', -1: 'gametree'} if game % 2 == 0 else {1: 'gametree', -1: 'mcts'}
+        bots = {1: PlayerOne(time_budget_ms=budget, engine=engines[1]),
+                -1: PlayerTwo(time_budget_ms=budget, engine=engines[-1])}
+        board = [[0] * 6 for _ in range(5)]
+        tree = GameTree(board, 1, 0)
+        player = 1
+        for turn in range(max_turns):
+            # a random first move each, so the games differ
+            move = rng.choice(tree.get_possible_moves(board, player)) if turn < 2 else bots[player].get_play(board)
+            board = tree.apply_moves(board, move, player)
+            if turn > 1 and is_all_same_sign(board):
+                wins[engines[player]] += 1
+                break
+            player = -player
+        else:
+            wins['unfinished'] += 1
+    elapsed = time.perf_counter() - start
+    print(f"mcts: {games} games at {budget}ms per move against the GameTree bot: {wins} ({elapsed:.1f}s)")
+
+
+def bench_book():
+    """
+    Builds a small opening book and compares looking its positions up with searching them.
+    """
+    depth, height = 3, 5
+    start = time.perf_counter()
+    book = build_book(depth, height)
+    built = time.perf_counter() - start
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    board = start_board()
+    positions = [(board, 1)] + [(tree.apply_moves(board, move, 1), -1)
+                                for move in tree.get_possible_moves(board, 1)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'book.bin')
+        write_book(book, path, depth)
+        size = os.path.getsize(path)
+        opened = best_of(lambda: OpeningBook(path).close())
+        with OpeningBook(path) as opening_book:
+            lookup = best_of(lambda: [opening_book.lookup(b, p) for b, p in positions])
+    search = best_of(lambda: [GameTree(b, p, height, search='negamax', table=TranspositionTable(),
+                                       ordering=MoveOrdering()).get_move() for b, p in positions], 1)
+    print(f"book: {len(book)} positions, {depth} plies searched {height} deep, built in {built:.1f}s, "
+          f"{size} bytes")
+    print(f"  open={opened * 1e6:6.1f}us  per position: lookup={lookup / len(positions) * 1e6:6.1f}us "
+          f"search={search / len(positions) * 1000:7.1f}ms")
+
+
+def bench_tablebase():
+    """
+    Solves the 3x3 board and uses it as an oracle: how often does a search of each
+    height keep a won position won?
+    """
+    start = time.perf_counter()
+    table = solve(3, 3)
+    solved = time.perf_counter() - start
+    print(f"tablebase: solved {len(table)} positions of a 3x3 board in {solved:.1f}s "
+          f"({len(table.codes)} bytes)")
+
+    rng = random.Random(23)
+    won = []
+    for index, code in enumerate(table.codes):
+        if code and code % 2 == 0:
+            won.append(table.board(index))
+    positions = rng.sample(won, 300)
+    tree = GameTree([[1, 0], [0, -1]], 1, 0)
+    for height in (1, 2, 3, 4):
+        for name, tablebase in (('search', None), ('probed', table)):
+            kept = 0
+            start = time.perf_counter()
+            for board, player in positions:
+                move = GameTree(board, player, height, search='negamax', tablebase=tablebase).get_move()
+                result, _ = table.probe(tree.apply_moves(board, move, player), -player)
+                kept += result == LOSS
+            elapsed = time.perf_counter() - start
+            print(f"  height {height} {name:<7} keeps {kept / len(positions):6.1%} of 300 won positions won "
+                  f"({elapsed * 1000 / len(positions):6.2f}ms per move)")
+
+
+def bench_symmetry():
+    """
+    Counts the boards the negamax search visits with and without the symmetries of the
+    board (symmetric root moves searched once, table entries shared by symmetric boards).
+    """
+    mirrored = [[0] * 6 for _ in range(5)]
+    mirrored[0][0] = mirrored[0][5] = 1
+    mirrored[4][0] = mirrored[4][5] = -1
+    positions = [('start', [start_board()]), ('empty', [[[0] * 6 for _ in range(5)]]),
+                 ('mirrored', [mirrored]), ('5 midgame', midgame_boards(5, seed=24))]
+    for height in (4, 5):
+        print(f"symmetry: depth {height} negamax get_move on 5x6 boards, with ordering and table")
+        for name, boards in positions:
+            results = []
+            for symmetry in (False, True):
+                trees = []
+
+                def search():
+                    trees[:] = [GameTree(board, 1, height, search='negamax', table=TranspositionTable(),
+                                         ordering=MoveOrdering(), symmetry=symmetry) for board in boards]
+                    for tree in trees:
+                        tree.get_move()
+                elapsed = best_of(search, 3)
+                results.append((sum(tree.nodes for tree in trees), elapsed))
+            (old_nodes, old), (new_nodes, new) = results
+            print(f"  {name:<10} boards {old_nodes:>6} -> {new_nodes:>6} ({new_nodes / old_nodes - 1:+6.1%})  "
+                  f"{old * 1000:7.1f}ms -> {new * 1000:7.1f}ms")
+
+
+def bench_parallel():
+    """
+    Times the parallel root-split search with 1 to N workers against the serial search.
+    """
+    cpus = os.cpu_count() or 1
+    print(f"parallel: depth 4 get_move on 5 midgame 5x6 boards ({cpus} CPUs)")
+    boards = midgame_boards(5, seed=3)
+    table = TranspositionTable(1 << 16)
+    expected = []
+    start = time.perf_counter()
+    for board in boards:
+        table.clear()
+        expected.append(GameTree(board, 1, 4, search='lazy', table=table, ordering=MoveOrdering()).get_move())
+    serial = time.perf_counter() - start
+    print(f"  serial     {serial * 1000:8.1f}ms")
+    for workers in sorted({1, 2, 4, max(cpus, 1)}):
+        with RootSplitPool(workers) as pool:
+            GameTree(boards[0], 1, 1, search='parallel', pool=pool).get_move()  # start the workers
+            start = time.perf_counter()
+            moves = [GameTree(b, 1, 4, search='parallel', pool=pool, ordering=MoveOrdering()).get_move()
+                     for b in boards]
+            elapsed = time.perf_counter() - start
+        assert moves == expected
+        print(f"  {workers:>2} workers {elapsed * 1000:8.1f}ms speedup={serial / elapsed:5.2f}x")
+
+
+def bench_reroot():
+    """
+    Plays 5x6 games where each bot either builds a new tree every move or moves its
+    last tree on to the grandchild reached by the reply.
+    """
+    for search, height, moves in (('full', 3, 12), ('lazy', 4, 24)):
+        print(f"reroot: {moves}-move game, {search} search of depth {height}")
+        for reuse in (False, True):
+            tree = GameTree([[1, 0], [0, -1]], 1, 0)
+            board = [[0] * 6 for _ in range(5)]
+            player = 1
+            bots = {}
+            extras = {p: {} if search == 'full' else {'table': TranspositionTable(),
+                                                      'ordering': MoveOrdering()} for p in (1, -1)}
+            built = 0
+            start = time.perf_counter()
+            for turn in range(moves):
+                bot = bots.get(player)
+                if not reuse or bot is None or not bot.reroot(board):
+                    bot = bots[player] = GameTree(board, player, height, search=search, **extras[player])
+                move = bot.get_move()
+                built += bot.nodes
+                board = tree.apply_moves(board, move, player)
+                if turn > 1 and is_all_same_sign(board):
+                    break
+                player = -player
+            elapsed = time.perf_counter() - start
+            print(f"  {'reroot' if reuse else 'rebuild':<8} {elapsed * 1000:8.1f}ms "
+                  f"({elapsed * 1000 / moves:6.1f}ms per move, {built} boards)")
+
+
+BENCHMARKS = {
+    'overflow': bench_overflow,
+    'numpy': bench_numpy,
+    'recording': bench_recording,
+    'deltas': bench_deltas,
+    'leaves': bench_leaves,
+    'bitboard': bench_bitboard,
+    'expand': bench_expand,
+    'cache': bench_cache,
+    'lazy': bench_lazy,
+    'table': bench_table,
+    'deepen': bench_deepen,
+    'ordering': bench_ordering,
+    'negamax': bench_negamax,
+    'unmake': bench_unmake,
+    'nodes': bench_nodes,
+    'mcts': bench_mcts,
+    'book': bench_book,
+    'tablebase': bench_tablebase,
+    'symmetry': bench_symmetry,
+    'parallel': bench_parallel,
+    'reroot': bench_reroot,
+}
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(10000)
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
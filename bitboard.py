@@ -0,0 +1,295 @@
+# Bitboard representation of a game board for the Monte Carlo search (mcts.py).
+#
+# Cell (i, j) of a rows x cols board is bit i * cols + j of every mask, so the
+# lowest set bit of a mask is its first cell in row-major order. A board is:
+#   p1, p2   - owner masks of the cells holding positive / negative gems
+#   planes   - bit-planes of the gem counts: bit b of a cell's count is set in planes[b]
+# Move generation, the terminal and same-sign tests and the "at capacity" test are
+# then a handful of integer operations, and a whole overflow wave is a few shifts
+# and a bit-sliced add.
+#
+# GameTree does not use it: its nodes, caches, tables and make/unmake search work
+# on list of lists boards and TrackedBoards, whose counters already make its
+# terminal test and evaluation O(1). The random playouts of MCTS, which only need
+# to play moves and spot the end of the game, are where the bitboard pays off.
+
+from functools import lru_cache
+from a1_partd import get_topology, TOPOLOGY_CACHE_SIZE
+
+
+class _ShapeMasks:
+    """
+    The masks of one board shape, shared by every BoardState of that shape.
+
+    Attributes:
+    full (int): Every cell of the board.
+    not_first_col (int): Every cell except those of the first column.
+    not_last_col (int): Every cell except those of the last column.
+    capacity (dict): Maps each capacity (2, 3 or 4) to the mask of the cells that have it.
+    """
+
+    def __init__(self, rows, cols):
+        topology = get_topology(rows, cols)
+        self.full = (1 << (rows * cols)) - 1
+        first_col = sum(1 << (i * cols) for i in range(rows))
+        last_col = first_col << (cols - 1)
+        self.not_first_col = self.full & ~first_col
+        self.not_last_col = self.full & ~last_col
+        self.capacity = {}
+        for index, capacity in enumerate(topology.flat_capacity):
+            self.capacity[capacity] = self.capacity.get(capacity, 0) | (1 << index)
+
+
+@lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def shape_masks(rows, cols):
+    """
+    Returns the cached _ShapeMasks of a rows x cols board.
+    """
+    return _ShapeMasks(rows, cols)
+
+
+def _add_mask(planes, mask):
+    # Adds 1 to the count of every cell in mask (a bit-sliced ripple-carry add)
+    for b in range(len(planes)):
+        if not mask:
+            return
+        plane = planes[b]
+        planes[b] = plane ^ mask
+        mask &= plane
+    if mask:
+        planes.append(mask)
+
+
+class BoardState:
+    """
+    A board packed into Python ints (see the module comment for the layout).
+
+    Attributes:
+    rows (int): The number of rows of the board.
+    cols (int): The number of columns of the board.
+    p1 (int): The mask of the cells owned by player 1 (positive cells).
+    p2 (int): The mask of the cells owned by player 2 (negative cells).
+    planes (list of int): The bit-planes of the gem counts.
+    """
+
+    __slots__ = ('rows', 'cols', 'p1', 'p2', 'planes')
+
+    def __init__(self, rows, cols, p1=0, p2=0, planes=None):
+        self.rows = rows
+        self.cols = cols
+        self.p1 = p1
+        self.p2 = p2
+        self.planes = planes if planes is not None else []
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Packs a list of lists board into a BoardState.
+        """
+        rows, cols = len(grid), len(grid[0])
+        state = cls(rows, cols)
+        index = 0
+        for row in grid:
+            for cell in row:
+                if cell != 0:
+                    bit = 1 << index
+                    if cell > 0:
+                        state.p1 |= bit
+                    else:
+                        state.p2 |= bit
+                    count = abs(cell)
+                    b = 0
+                    while count:
+                        if count & 1:
+                            while len(state.planes) <= b:
+                                state.planes.append(0)
+                            state.planes[b] |= bit
+                        count >>= 1
+                        b += 1
+                index += 1
+        return state
+
+    def to_grid(self):
+        """
+        Unpacks the board into a list of lists.
+        """
+        grid = []
+        index = 0
+        for i in range(self.rows):
+            row = []
+            for j in range(self.cols):
+                row.append(self.get(i, j, index))
+                index += 1
+            grid.append(row)
+        return grid
+
+    def get(self, row, col, index=None):
+        """
+        Returns the signed value of cell (row, col).
+        """
+        if index is None:
+            index = row * self.cols + col
+        count = 0
+        for b, plane in enumerate(self.planes):
+            count |= ((plane >> index) & 1) << b
+        return -count if (self.p2 >> index) & 1 else count
+
+    def copy(self):
+        return BoardState(self.rows, self.cols, self.p1, self.p2, list(self.planes))
+
+    def key(self):
+        """
+        Returns a compact hashable key of the position.
+        """
+        return (self.rows, self.cols, self.p1, self.p2, tuple(self.planes))
+
+    def __eq__(self, other):
+        return isinstance(other, BoardState) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def legal_mask(self, player):
+        """
+        Returns the mask of the cells player may place a gem on (empty or their own).
+        """
+        masks = shape_masks(self.rows, self.cols)
+        return masks.full & ~(self.p2 if player == 1 else self.p1)
+
+    def get_possible_moves(self, player):
+        """
+        Returns the (row, col) moves of player in row-major order, like
+        GameTree.get_possible_moves.
+        """
+        cells = get_topology(self.rows, self.cols).cells
+        moves = []
+        mask = self.legal_mask(player)
+        while mask:
+            low = mask & -mask
+            moves.append(cells[low.bit_length() - 1])
+            mask ^= low
+        return moves
+
+    def is_terminal(self):
+        """
+        Returns True if every cell belongs to the same player, like GameTree.is_terminal.
+        """
+        full = shape_masks(self.rows, self.cols).full
+        return self.p1 == full or self.p2 == full
+
+    def is_all_same_sign(self):
+        """
+        Returns True if the non-empty cells do not belong to both players.
+        """
+        return not self.p1 or not self.p2
+
+    def at_capacity_mask(self):
+        """
+        Returns the mask of the cells whose count reached their capacity.
+        """
+        masks = shape_masks(self.rows, self.cols).capacity
+        planes = self.planes
+        high = 0
+        for plane in planes[2:]:
+            high |= plane
+        ge2 = high | (planes[1] if len(planes) > 1 else 0)
+        ge3 = high | ((planes[0] & planes[1]) if len(planes) > 1 else 0)
+        return ((masks.get(2, 0) & ge2) | (masks.get(3, 0) & ge3) | (masks.get(4, 0) & high))
+
+    def gems(self, player):
+        """
+        Returns the total number of gems of player.
+        """
+        owner = self.p1 if player == 1 else self.p2
+        return sum((plane & owner).bit_count() << b for b, plane in enumerate(self.planes))
+
+    def evaluate(self, player):
+        """
+        Returns the same score as a2_partb.evaluate_board for this board.
+        """
+        owner = self.p1 if player == 1 else self.p2
+        gem = 0
+        total = 0
+        for b, plane in enumerate(self.planes):
+            gem += (plane & owner).bit_count() << b
+            total += plane.bit_count() << b
+        if gem == total:
+            return 100
+        if gem == 0:
+            return -100
+        return (gem * 100) // total
+
+    def place(self, row, col, player):
+        """
+        Adds a gem of player to cell (row, col) if it is empty or theirs. The board is
+        not overflowed.
+        """
+        bit = 1 << (row * self.cols + col)
+        if player == 1:
+            if self.p2 & bit:
+                return
+            self.p1 |= bit
+        else:
+            if self.p1 & bit:
+                return
+            self.p2 |= bit
+        _add_mask(self.planes, bit)
+
+    def overflow(self, max_waves=None):
+        """
+        Runs the overflow process in place with the same rules as a1_partd.overflow.
+
+        max_waves: The maximum number of waves to apply, or None for no limit.
+
+        Returns:
+        int: The number of waves applied.
+        """
+        masks = shape_masks(self.rows, self.cols)
+        cols = self.cols
+        overflowing = self.at_capacity_mask()
+        if not overflowing or not self.p1 or not self.p2:
+            return 0
+
+        # The first overflowing cell in row-major order decides the sign of the cascade
+        positive = bool(self.p1 & (overflowing & -overflowing))
+        waves = 0
+        while overflowing and self.p1 and self.p2:
+            if max_waves is not None and waves >= max_waves:
+                break
+            keep = ~overflowing
+            self.p1 &= keep
+            self.p2 &= keep
+            planes = self.planes
+            for b in range(len(planes)):
+                planes[b] &= keep
+
+            down = (overflowing << cols) & masks.full
+            up = overflowing >> cols
+            right = (overflowing & masks.not_last_col) << 1
+            left = (overflowing & masks.not_first_col) >> 1
+            for incoming in (down, up, right, left):
+                _add_mask(planes, incoming)
+
+            hit = down | up | right | left
+            if positive:
+                self.p1 |= hit
+                self.p2 &= ~hit
+            else:
+                self.p2 |= hit
+                self.p1 &= ~hit
+            while planes and not planes[-1]:
+                planes.pop()
+
+            waves += 1
+            overflowing = self.at_capacity_mask()
+        return waves
+
+    def apply_move(self, move, player):
+        """
+        Returns the board after player places a gem at move and it overflows, like
+        GameTree.apply_moves. This board is not modified.
+        """
+        state = self.copy()
+        state.place(move[0], move[1], player)
+        state.overflow()
+        return state
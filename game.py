@@ -17,8 +17,9 @@ import math
 import copy  # Import copy to use deepcopy
 
 from a1_partc import Stack  # Import Stack for Undo functionality
-from a1_partd import overflow
-from a1_partc import Queue
+from a1_partd import overflow_waves
+from tracked_board import TrackedBoard
+import vectorized
 from player1 import PlayerOne
 from player2 import PlayerTwo
 
@@ -47,15 +48,22 @@ class Dropdown:
         return self.current_option
 
 class Board:
-    def __init__(self,width,height, p1_sprites, p2_sprites):
+    def __init__(self,width,height, p1_sprites, p2_sprites, backend='list'):
         self.width = width
         self.height = height
-        self.board = [[0 for _ in range(width)] for _ in range(height)]
+        self.backend = backend
+        grid = [[0 for _ in range(width)] for _ in range(height)]
         self.p1_sprites = p1_sprites
         self.p2_sprites = p2_sprites
-        self.board[0][0] = 1
-        self.board[self.height-1][self.width-1] = -1
+        grid[0][0] = 1
+        grid[self.height-1][self.width-1] = -1
+        # All changes go through the TrackedBoard so its counters stay up to date;
+        # self.board is its grid, for reading
+        self.state = TrackedBoard(grid)
+        self.board = self.state.grid
         self.turn = 0
+        self.waves = None
+        self.pending_wave = None
 
     def get_board(self):
         current_board = []
@@ -102,44 +110,53 @@ class Board:
 
     def add_piece(self, row, col, player):
         if self.valid_move(row, col, player):
-            self.board[row][col] += player
+            self.state.place(row, col, player)
             self.turn += 1
             return True
         return False
 
     def check_win(self):
         if(self.turn > 0):
-            num_p1 = 0
-            num_p2 = 0
-            for i in range(self.height):
-                for j in range(self.width):
-                    if(self.board[i][j] > 0):
-                        if num_p2 > 0:
-                            return 0
-                        num_p1 += 1
-                    elif(self.board[i][j] < 0):
-                        if num_p1 > 0:
-                            return 0
-                        num_p2 += 1
-            if(num_p1 == 0):
-                return -1
-            if(num_p2== 0):
-                return 1
+            return self.state.winner()
         return 0
 
-    def do_overflow(self,q):
-        oldboard = []
-        for i in range(self.height):
-            oldboard.append(self.board[i].copy())
-        numsteps = overflow(self.board, q)
-        if(numsteps != 0):
-            self.set(oldboard)
-        return numsteps
-    
+    def do_overflow(self):
+        """
+        Starts the overflow process of the last move.
+
+        The waves are computed lazily on a working copy of the board, one wave ahead of
+        the animation, and shown with next_wave().
+
+        Returns:
+        bool: True if at least one wave is waiting to be shown, False otherwise.
+        """
+        if self.backend == 'numpy':
+            self.waves = vectorized.overflow_waves(self.get_board())
+        else:
+            self.waves = overflow_waves(self.get_board())
+        self.pending_wave = next(self.waves, None)
+        return self.pending_wave is not None
+
+    def has_pending_wave(self):
+        return self.pending_wave is not None
+
+    def next_wave(self):
+        """
+        Shows the pending overflow wave and computes the one after it.
+        """
+        self.apply_delta(self.pending_wave)
+        self.pending_wave = next(self.waves, None)
+        if self.pending_wave is None:
+            self.waves = None
+
+    def apply_delta(self, delta):
+        self.state.apply_delta(delta)
+
     def set(self, newboard):
-        for row in range(self.height):
-            for col in range(self.width):
-                self.board[row][col] = newboard[row][col]
+        # The waves of an overflow still being shown were computed from the old board
+        self.waves = None
+        self.pending_wave = None
+        self.state.set(newboard)
 
     def draw(self, window, frame):
         for row in range(GRID_SIZE[0]):
@@ -196,6 +213,9 @@ X_OFFSET = 0
 Y_OFFSET = 100
 HIGHLIGHT_COLOR = (0, 255, 0)  # Green for valid moves
 FULL_DELAY = 5
+OVERFLOW_BACKEND = 'list'  # 'numpy' uses the vectorized overflow
+BOT_TIME_BUDGET_MS = 1000  # time each bot may think per move, None for a fixed depth
+BOT_ENGINE = 'gametree'  # 'gametree' for the minimax bots, 'mcts' for Monte Carlo tree search
 
 p1spritesheet = pygame.image.load('blue.png')
 p2spritesheet = pygame.image.load('pink.png')
@@ -228,14 +248,13 @@ undo_button = pygame.Rect(900, 300, 200, 50)  # Undo button position
 
 status=["",""]
 current_player = 0
-board = Board(GRID_SIZE[1], GRID_SIZE[0], p1_sprites, p2_sprites)
+board = Board(GRID_SIZE[1], GRID_SIZE[0], p1_sprites, p2_sprites, OVERFLOW_BACKEND)
 
 running = True
-overflow_boards = Queue()
 overflowing = False
-numsteps = 0
 has_winner = False
-bots = [PlayerOne(), PlayerTwo()]
+bots = [PlayerOne(time_budget_ms=BOT_TIME_BUDGET_MS, engine=BOT_ENGINE),
+        PlayerTwo(time_budget_ms=BOT_TIME_BUDGET_MS, engine=BOT_ENGINE)]
 grid_col = -1
 grid_row = -1
 choice = [None, None]
@@ -287,10 +306,9 @@ while running:
     if not has_winner:
         if overflowing:
             status[0] = "Overflowing"
-            if not overflow_boards.is_empty():
+            if board.has_pending_wave():
                 if repeat_step == FULL_DELAY:
-                    next = overflow_boards.dequeue()
-                    board.set(next)
+                    board.next_wave()
                     repeat_step = 0
                 else:
                     repeat_step += 1
@@ -312,8 +330,7 @@ while running:
             if make_move:
                 undo_stack.push(copy.deepcopy(board.get_board()))  # Save state before move
                 board.add_piece(grid_row, grid_col, player_id[current_player])
-                numsteps = board.do_overflow(overflow_boards)
-                if numsteps != 0:
+                if board.do_overflow():
                     overflowing = True
                     repeat_step = 0
                 else:
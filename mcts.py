@@ -0,0 +1,275 @@
+# Monte Carlo tree search (UCT) for the game, an alternative to GameTree.
+#
+# Every iteration walks down the tree picking the child with the best UCT value
+# (its win rate plus an exploration bonus for children visited less than their
+# siblings), adds one untried move below it and plays a batch of random games
+# from the new board. The result of every game is then added to the counts of the
+# boards on the way back up. The move played from the root is the one visited most.
+#
+# Boards are bitboard.BoardStates, so a playout is a few integer operations per
+# move. Playouts pick a uniformly random legal move, except that with probability
+# greedy they fill one of their own cells to capacity when they can. A playout
+# that reaches playout_moves moves without a winner is scored by who owns more gems.
+#
+# A game is won by the player whose move takes the last cell of the opponent. The
+# opening, where a player has not placed a gem yet, is not a win for the other one.
+
+import math
+import random
+import time
+from a1_partd import get_topology
+from bitboard import BoardState, shape_masks
+
+# Default number of iterations of get_move without a time budget
+DEFAULT_ITERATIONS = 400
+
+# Default number of playouts run from each new node
+DEFAULT_BATCH_SIZE = 8
+
+# Default exploration constant of the UCT formula
+DEFAULT_EXPLORATION = 1.4
+
+# Default number of moves after which a playout is scored by the gems on the board
+DEFAULT_PLAYOUT_MOVES = 60
+
+
+def _random_bit(mask, rng):
+    # Returns the index of a uniformly random set bit of a non-zero mask
+    for _ in range(rng.randrange(mask.bit_count())):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+def _near_capacity_mask(state, owner):
+    # Returns the cells of owner holding one gem less than their capacity
+    capacity = shape_masks(state.rows, state.cols).capacity
+    planes = state.planes
+    if not planes:
+        return 0
+    one = planes[0]
+    two = planes[1] if len(planes) > 1 else 0
+    high = 0
+    for plane in planes[2:]:
+        high |= plane
+    low = owner & ~high
+    return low & ((capacity.get(2, 0) & one & ~two) | (capacity.get(3, 0) & two & ~one) |
+                  (capacity.get(4, 0) & one & two))
+
+
+def _play(state, index, player):
+    # Plays the move at cell index on state in place. Returns player if it took the
+    # last cell of the opponent, 0 otherwise.
+    cols = state.cols
+    had_opponent = state.p2 if player == 1 else state.p1
+    state.place(index // cols, index % cols, player)
+    state.overflow()
+    if had_opponent and not (state.p2 if player == 1 else state.p1):
+        return player
+    return 0
+
+
+class MCTSTree:
+    """
+    A Monte Carlo search tree (see the module comment), used like GameTree.
+
+    Attributes:
+    player (int): The player to move at the root (1 for Player 1, -1 for Player 2).
+    root (Node): The root node of the tree.
+    iterations (int): The number of iterations get_move runs without a time budget.
+    batch_size (int): The number of playouts run from every new node.
+    exploration (float): The exploration constant of the UCT formula.
+    playout_moves (int): The moves after which a playout is scored by the gems.
+    greedy (float): The probability that a playout fills a cell to capacity when it can.
+    playouts (int): The number of playouts run by the last get_move.
+    completed_iterations (int): The number of iterations run by the last get_move.
+    """
+
+    class Node:
+        """
+        Represents a node of the search tree.
+
+        Attributes:
+        state (BoardState): The board at this node.
+        player (int): The player whose turn it is at this node.
+        move (int): The cell index of the move that led to this node, None at the root.
+        parent (Node): The parent node, None at the root.
+        children (list of Node): The expanded children of this node.
+        untried (list of int): The cell indices of the moves not expanded yet.
+        visits (int): The number of playouts through this node.
+        wins (float): The playouts through this node won by the player who moved into
+                      it (a draw counts one half).
+        winner (int): The player who won the game with the move into this node, or 0.
+        """
+
+        __slots__ = ('state', 'player', 'move', 'parent', 'children', 'untried', 'visits', 'wins',
+                     'winner')
+
+        def __init__(self, state, player, move=None, parent=None, winner=0, rng=None):
+            self.state = state
+            self.player = player
+            self.move = move
+            self.parent = parent
+            self.children = []
+            self.winner = winner
+            self.untried = []
+            if not winner:
+                mask = state.legal_mask(player)
+                while mask:
+                    low = mask & -mask
+                    self.untried.append(low.bit_length() - 1)
+                    mask ^= low
+                (rng or random).shuffle(self.untried)
+            self.visits = 0
+            self.wins = 0.0
+
+    def __init__(self, board, player, iterations=DEFAULT_ITERATIONS, batch_size=DEFAULT_BATCH_SIZE,
+                 exploration=DEFAULT_EXPLORATION, playout_moves=DEFAULT_PLAYOUT_MOVES, greedy=0.5,
+                 seed=None):
+        """
+        Initializes the tree with a root node.
+
+        Parameters:
+        board (list of lists): The current state of the board.
+        player (int): The ID of the player (1 for Player 1, -1 for Player 2).
+        iterations (int): The iterations get_move runs when it has no time budget.
+        batch_size (int): The number of playouts run from every new node.
+        exploration (float): The exploration constant of the UCT formula.
+        playout_moves (int): The moves after which a playout is scored by the gems.
+        greedy (float): The probability that a playout fills a cell to capacity when it can.
+        seed (int): The seed of the random number generator, None for a random one.
+        """
+        if iterations < 1 or batch_size < 1:
+            raise ValueError("MCTSTree needs at least one iteration and one playout per batch")
+        self.player = player
+        self.iterations = iterations
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.playout_moves = playout_moves
+        self.greedy = greedy
+        self.rng = random.Random(seed)
+        self.root = self.Node(BoardState.from_grid(board), player, rng=self.rng)
+        self.playouts = 0
+        self.completed_iterations = 0
+
+    def get_move(self, time_budget_ms=None):
+        """
+        Determines the best move for the current player with Monte Carlo tree search.
+
+        Statistics from earlier calls (and kept by reroot) are searched further, not
+        thrown away.
+
+        Parameters:
+        time_budget_ms (float): The time the search may take in milliseconds, or None to
+                                run the configured number of iterations. At least one
+                                iteration is always run.
+
+        Returns:
+        tuple: The most visited move (row, col), or None if the game is over.
+        """
+        root = self.root
+        if root.state.is_terminal() or (not root.untried and not root.children):
+            return None
+        deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000
+        self.playouts = 0
+        self.completed_iterations = 0
+        while True:
+            self._iterate()
+            self.completed_iterations += 1
+            if deadline is None:
+                if self.completed_iterations >= self.iterations:
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+
+        best = max(root.children, key=lambda child: (child.visits, child.wins))
+        return get_topology(root.state.rows, root.state.cols).cells[best.move]
+
+    def reroot(self, board):
+        """
+        Moves the root of the tree to board, if board is a grandchild of the root (the
+        board after a move of the player and a reply of the opponent), keeping the
+        statistics gathered below it.
+
+        Parameters:
+        board (list of lists): The board the player now has to move on.
+
+        Returns:
+        bool: True if the tree was moved to board, False if board is not an expanded
+              grandchild (the tree is then unchanged).
+        """
+        state = BoardState.from_grid(board)
+        for child in self.root.children:
+            for grandchild in child.children:
+                if grandchild.state == state:
+                    grandchild.parent = None
+                    self.root = grandchild
+                    return True
+        return False
+
+    def _iterate(self):
+        # One iteration: select, expand, run a batch of playouts and back them up
+        node = self.root
+        log = math.log
+        sqrt = math.sqrt
+        exploration = self.exploration
+        while not node.untried and node.children:
+            scale = exploration * sqrt(log(node.visits))
+            best_value = -1.0
+            for child in node.children:
+                value = child.wins / child.visits + scale / sqrt(child.visits)
+                if value > best_value:
+                    best_value = value
+                    best = child
+            node = best
+
+        if node.untried:
+            move = node.untried.pop()
+            state = node.state.copy()
+            winner = _play(state, move, node.player)
+            child = self.Node(state, -node.player, move, node, winner, self.rng)
+            node.children.append(child)
+            node = child
+
+        # wins for the player who moved into node
+        mover = -node.player
+        if node.winner:
+            wins = float(self.batch_size) if node.winner == mover else 0.0
+        elif not node.untried:
+            # the player to move has no legal move: score the board as it is
+            wins = self.batch_size * self._score(node.state, mover)
+        else:
+            wins = 0.0
+            for _ in range(self.batch_size):
+                wins += self._playout(node.state, node.player, mover)
+        self.playouts += self.batch_size
+
+        while node is not None:
+            node.visits += self.batch_size
+            node.wins += wins
+            wins = self.batch_size - wins
+            node = node.parent
+
+    def _playout(self, state, player, mover):
+        # Plays random moves from state with player to move, and returns 1, 0.5 or 0
+        # for a win, a draw or a loss of mover
+        state = state.copy()
+        rng = self.rng
+        greedy = self.greedy
+        for _ in range(self.playout_moves):
+            legal = state.legal_mask(player)
+            if not legal:
+                break
+            tactical = 0
+            if greedy and rng.random() < greedy:
+                tactical = _near_capacity_mask(state, state.p1 if player == 1 else state.p2)
+            winner = _play(state, _random_bit(tactical or legal, rng), player)
+            if winner:
+                return 1.0 if winner == mover else 0.0
+            player = -player
+        return self._score(state, mover)
+
+    @staticmethod
+    def _score(state, mover):
+        # Scores an unfinished game by the gems each player owns
+        gems = state.gems(mover) - state.gems(-mover)
+        return 1.0 if gems > 0 else 0.0 if gems < 0 else 0.5
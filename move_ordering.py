@@ -0,0 +1,154 @@
+# Move ordering for the alpha-beta search of GameTree.
+#
+# Alpha-beta cuts off the most when the best move of a node is searched first.
+# MoveOrdering guesses it from, in order of priority:
+#   1. the hash move  - the best move the transposition table or the previous
+#                       principal variation remembers for the board
+#   2. tactical moves - moves filling a cell to capacity, first those whose overflow
+#                       reaches an opponent cell (captures), then the others
+#   3. killer moves   - moves that caused a cut-off at the same depth elsewhere
+#   4. history        - moves that caused cut-offs anywhere, weighted by the plies
+#                       left below them
+# and keeps row-major order between moves it cannot tell apart. Ordering only
+# changes how fast the search is, never the scores it finds.
+#
+# The minimax searches of GameTree score a leaf for the player to move on it, so in
+# a tree of odd height every player is rewarded for what the opponent owns (the
+# negamax search does not). Tactical moves are then the worst guesses and are
+# tried last (see the greedy argument of order).
+
+from a1_partd import grid_topology
+
+# Killer moves remembered per depth
+KILLER_SLOTS = 2
+
+
+class SearchStats:
+    """
+    Counters of an alpha-beta search, used to measure move ordering.
+
+    Attributes:
+    interior (int): The number of boards whose children were searched.
+    children (int): The number of children searched.
+    cutoffs (int): The number of boards whose search was cut off.
+    first_cutoffs (int): The number of cut-offs caused by the first child searched.
+    """
+
+    def __init__(self):
+        self.interior = 0
+        self.children = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+    def cutoff_rate(self):
+        """
+        Returns the fraction of searched boards that were cut off.
+        """
+        return self.cutoffs / self.interior if self.interior else 0.0
+
+    def first_cutoff_rate(self):
+        """
+        Returns the fraction of cut-offs caused by the first child searched.
+        """
+        return self.first_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def branching_factor(self):
+        """
+        Returns the effective branching factor: the average number of children searched
+        per searched board.
+        """
+        return self.children / self.interior if self.interior else 0.0
+
+    def __repr__(self):
+        return (f"SearchStats(interior={self.interior}, children={self.children}, "
+                f"cutoffs={self.cutoffs}, first_cutoffs={self.first_cutoffs})")
+
+
+class MoveOrdering:
+    """
+    Orders the moves of a board for alpha-beta (see the module comment).
+
+    Every heuristic can be turned off, so their effect can be measured on its own.
+    Any object with the same order, record_cutoff and new_search methods can be
+    given to GameTree instead.
+
+    Attributes:
+    hash_move (bool): Whether the hash move is tried first.
+    tactical (bool): Whether moves filling a cell to capacity come next.
+    killers (dict): Maps a depth to its killer moves, most recent first, or None if off.
+    history (dict): Maps each player (1 or -1) to a dict of move scores, or None if off.
+    """
+
+    def __init__(self, hash_move=True, tactical=True, killers=True, history=True):
+        self.hash_move = hash_move
+        self.tactical = tactical
+        self.killers = {} if killers else None
+        self.history = {1: {}, -1: {}} if history else None
+
+    def new_search(self):
+        """
+        Forgets the killer moves and halves the history scores, before searching a new root.
+        """
+        if self.killers is not None:
+            self.killers.clear()
+        if self.history is not None:
+            for scores in self.history.values():
+                for move in scores:
+                    scores[move] >>= 1
+
+    def order(self, board, moves, player, depth, hash_move=None, greedy=True):
+        """
+        Returns the moves of player on board, best guess first.
+
+        Parameters:
+        board (list of lists or TrackedBoard): The board the moves are played on.
+        moves (list of tuples): The legal moves, in row-major order.
+        player (int): The player making the moves.
+        depth (int): The depth of the board in the tree.
+        hash_move (tuple): The move the table or the principal variation suggests, or None.
+        greedy (bool): Whether the search rewards the player to move for gaining gems.
+                       When it does not, tactical moves are tried last instead.
+
+        Returns:
+        list of tuples: The same moves, reordered.
+        """
+        if not self.hash_move:
+            hash_move = None
+        topology = grid_topology(board)
+        capacity = topology.capacity
+        neighbors = topology.neighbors
+        killers = self.killers.get(depth, ()) if self.killers is not None else ()
+        history = self.history[player] if self.history is not None else {}
+
+        ranked = []
+        for k, move in enumerate(moves):
+            row, col = move
+            if move == hash_move:
+                rank = 4
+            elif self.tactical and abs(board[row][col]) + 1 >= capacity[row][col]:
+                capture = any(board[i][j] * player < 0 for (i, j) in neighbors[row][col])
+                if greedy:
+                    rank = 3 if capture else 2
+                else:
+                    rank = -2 if capture else -1
+            elif move in killers:
+                rank = 1
+            else:
+                rank = 0
+            ranked.append((-rank, -history.get(move, 0), k, move))
+        ranked.sort()
+        return [move for (_, _, _, move) in ranked]
+
+    def record_cutoff(self, move, player, depth, plies):
+        """
+        Remembers that move caused a cut-off at depth with plies left to search.
+        """
+        if self.killers is not None:
+            killers = self.killers.setdefault(depth, [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[KILLER_SLOTS:]
+        if self.history is not None:
+            scores = self.history[player]
+            scores[move] = scores.get(move, 0) + plies * plies
@@ -0,0 +1,241 @@
+#   An opening book: the best moves of the first plies of every game, searched offline.
+#   To build it, run: python opening_book.py [--depth 4] [--height 5] [--output FILE]
+#
+# Every game starts from the board Board sets up in game.py: a gem of player 1 in
+# the top left corner and one of player 2 in the bottom right one. build_book
+# searches every position either bot can face in the first depth plies of a game,
+# when it plays its book moves and the opponent plays anything, and writes the
+# best move of each to a binary file:
+#
+#   header  - BOOK_HEADER: magic, rows, cols, depth, the Zobrist fingerprint and
+#             the number of records
+#   records - BOOK_RECORD: (position key, row, col), sorted by key
+#
+# The key of a position is its canonical key (symmetry.canonical_key): the
+# smallest Zobrist hash (a2_parta.zobrist_keys) of its symmetric images, mixed
+# with the key of the player to move. Symmetric positions share one record, its
+# move stored mapped onto the image the key is the hash of. OpeningBook maps the
+# file with mmap and finds a position with a binary search, so opening a book
+# reads nothing but the header. A book built with other Zobrist keys (the
+# fingerprint differs) is refused.
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from a2_parta import TranspositionTable, zobrist_keys
+from a2_partb import GameTree
+from move_ordering import MoveOrdering
+from symmetry import canonical_key
+
+# Magic, rows, cols, depth, padding, Zobrist fingerprint, number of records
+BOOK_HEADER = struct.Struct('<4sBBBxQI')
+BOOK_MAGIC = b'GBK2'
+
+# Position key, row and column of its best move
+BOOK_RECORD = struct.Struct('<QBB')
+
+# The book the bots open, next to this module
+OPENING_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+
+def start_board(rows=5, cols=6):
+    """
+    Returns the board every game starts from (see Board in game.py).
+    """
+    board = [[0] * cols for _ in range(rows)]
+    board[0][0] = 1
+    board[rows - 1][cols - 1] = -1
+    return board
+
+
+def position_key(board, player):
+    """
+    Returns the key of board with player to move, as stored in a book.
+
+    Parameters:
+    board (list of lists or TrackedBoard): The board.
+    player (int): The player to move (1 or -1).
+
+    Returns:
+    int: The 64-bit key, shared by the positions symmetric to it.
+    """
+    return canonical_key(board, player)[0]
+
+
+def book_move(book, board, player):
+    """
+    Returns the move of player on board in a book built by build_book, or None if the
+    position is not in it.
+    """
+    key, transform = canonical_key(board, player)
+    return zobrist_keys(len(board), len(board[0])).unmap_move(transform, book.get(key))
+
+
+def build_book(depth=4, height=5, rows=5, cols=6, progress=None):
+    """
+    Searches the best move of every position the bots can face in the first depth
+    plies of a game.
+
+    Positions are those reached when one bot plays its book moves and the other
+    player any move, for either bot. Each is searched like the bots search (the
+    negamax search of GameTree, with a transposition table and move ordering),
+    height plies deep.
+
+    Parameters:
+    depth (int): The number of plies the book covers.
+    height (int): The height of the search of every position.
+    rows (int): The number of rows of the board.
+    cols (int): The number of columns of the board.
+    progress (callable): Called with the number of positions searched so far, or None.
+
+    Returns:
+    dict: Maps the key of every position to its best move (row, col), mapped like the
+          key (see book_move). Symmetric positions are searched once.
+    """
+    book = {}
+    table = TranspositionTable()
+    ordering = MoveOrdering()
+    moves_of = GameTree([[1, 0], [0, -1]], 1, 0)
+    keys = zobrist_keys(rows, cols)
+
+    def visit(board, player, ply, bot):
+        # bot is the player whose book moves are followed
+        if ply == depth or moves_of.is_terminal(board):
+            return
+        if player == bot:
+            key, transform = canonical_key(board, player)
+            move = keys.unmap_move(transform, book.get(key))
+            if move is None:
+                move = GameTree(board, player, height, search='negamax', table=table,
+                                ordering=ordering, symmetry=True).get_move()
+                if move is None:
+                    return
+                book[key] = keys.map_move(transform, move)
+                if progress is not None:
+                    progress(len(book))
+            moves = [move]
+        else:
+            moves = moves_of.get_possible_moves(board, player)
+        for move in moves:
+            visit(moves_of.apply_moves(board, move, player), -player, ply + 1, bot)
+
+    for bot in (1, -1):
+        visit(start_board(rows, cols), 1, 0, bot)
+    return book
+
+
+def write_book(book, path, depth, rows=5, cols=6):
+    """
+    Writes a book built by build_book to path, sorted by key.
+    """
+    fingerprint = zobrist_keys(rows, cols).side[1]
+    with open(path, 'wb') as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, rows, cols, depth, fingerprint, len(book)))
+        for key in sorted(book):
+            row, col = book[key]
+            f.write(BOOK_RECORD.pack(key, row, col))
+
+
+class OpeningBook:
+    """
+    A book file written by write_book, mapped into memory.
+
+    Attributes:
+    rows (int): The number of rows of the boards of the book.
+    cols (int): The number of columns of the boards of the book.
+    depth (int): The number of plies the book covers.
+    """
+
+    def __init__(self, path):
+        """
+        Maps the book at path.
+
+        Raises:
+        ValueError: If the file is not a book, or was built with other Zobrist keys.
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < BOOK_HEADER.size:
+                raise ValueError(f"{path} is not an opening book")
+            magic, self.rows, self.cols, self.depth, fingerprint, self._count = \
+                BOOK_HEADER.unpack_from(self._map, 0)
+            if magic != BOOK_MAGIC or len(self._map) != BOOK_HEADER.size + self._count * BOOK_RECORD.size:
+                raise ValueError(f"{path} is not an opening book")
+            if fingerprint != zobrist_keys(self.rows, self.cols).side[1]:
+                raise ValueError(f"{path} was built with other Zobrist keys")
+        except ValueError:
+            self._map.close()
+            raise
+
+    def lookup(self, board, player):
+        """
+        Returns the book move of player on board, or None if the position is not in
+        the book.
+
+        Parameters:
+        board (list of lists): The board.
+        player (int): The player to move (1 or -1).
+
+        Returns:
+        tuple: The move (row, col), or None.
+        """
+        if len(board) != self.rows or len(board[0]) != self.cols:
+            return None
+        key, transform = canonical_key(board, player)
+        unpack_from = BOOK_RECORD.unpack_from
+        size = BOOK_RECORD.size
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            record_key, row, col = unpack_from(self._map, BOOK_HEADER.size + mid * size)
+            if record_key < key:
+                low = mid + 1
+            elif record_key > key:
+                high = mid
+            else:
+                return zobrist_keys(self.rows, self.cols).unmap_move(transform, (row, col))
+        return None
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        """
+        Unmaps the book.
+        """
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_book(path=OPENING_BOOK_PATH):
+    """
+    Returns the OpeningBook at path, or None if there is no usable book there.
+    """
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Builds the opening book of the bots.")
+    parser.add_argument('--depth', type=int, default=4, help="plies of every game the book covers")
+    parser.add_argument('--height', type=int, default=5, help="plies searched for every position")
+    parser.add_argument('--rows', type=int, default=5)
+    parser.add_argument('--cols', type=int, default=6)
+    parser.add_argument('--output', default=OPENING_BOOK_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    book = build_book(args.depth, args.height, args.rows, args.cols,
+                      progress=lambda n: print(f"\r{n} positions searched", end='', flush=True))
+    write_book(book, args.output, args.depth, args.rows, args.cols)
+    print(f"\nwrote {len(book)} positions to {args.output} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,158 @@
+# Parallel root-split search for GameTree.
+#
+# The moves of the root are searched by a pool of worker processes, one move per
+# task. Workers are started once per RootSplitPool and keep their own transposition
+# table and move ordering between tasks and searches. A task only carries the root
+# board packed with a1_partd.pack_grid, the move and the search settings.
+#
+# The workers share the best exact score found so far and the row-major index of
+# its move. A task reads them when it starts and searches its move with that score
+# as alpha, or one below it if its move comes first in row-major order (an equal
+# score then wins): a move that could still be the best comes back exact, and any
+# other move cannot be the best one. GameTree then picks the first best move in
+# row-major order, the same move as the serial search.
+# The shared score is tagged with the number of the search, so a task still running
+# after its search timed out cannot leak its score into the next one.
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from a1_partd import pack_grid, unpack_grid
+from a2_parta import TranspositionTable
+from a2_partb import GameTree, SearchTimeout
+from move_ordering import MoveOrdering
+
+# Slots of the transposition table of every worker
+WORKER_TABLE_SIZE = 1 << 16
+
+# Settings of the worker process, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(best, backend, table_size, ordering):
+    # Runs once in every worker process
+    _worker['best'] = best
+    _worker['backend'] = backend
+    _worker['table'] = TranspositionTable(table_size) if table_size else None
+    _worker['ordering'] = MoveOrdering() if ordering else None
+    _worker['root'] = None
+
+
+def _search_move(search_id, packed, cols, player, height, move, index, pv, deadline):
+    # Runs in a worker: scores one root move. Returns (move, score, alpha, line, nodes,
+    # reached_horizon), or None if the deadline (a time.time() value) passed first.
+    table = _worker['table']
+    ordering = _worker['ordering']
+    if _worker['root'] != (packed, player, height):
+        # a new search: age the table and the ordering once
+        _worker['root'] = (packed, player, height)
+        if table is not None:
+            table.new_search()
+        if ordering is not None:
+            ordering.new_search()
+
+    tree = GameTree(unpack_grid(packed, cols), player, height, backend=_worker['backend'],
+                    search='lazy', table=table, ordering=ordering)
+    if deadline is not None:
+        tree.deadline = time.perf_counter() + (deadline - time.time())
+    best = _worker['best']
+    with best.get_lock():
+        if best[0] != search_id:
+            alpha = float('-inf')
+        elif index < best[2]:
+            alpha = best[1] - 1
+        else:
+            alpha = best[1]
+    line = []
+    try:
+        score = tree.score_move(move, alpha, height, pv, line)
+    except SearchTimeout:
+        return None
+    if score > alpha:
+        with best.get_lock():
+            if best[0] == search_id and (score > best[1] or (score == best[1] and index < best[2])):
+                best[1] = score
+                best[2] = index
+    return move, score, alpha, [move] + line, tree.nodes, tree.reached_horizon
+
+
+class RootSplitPool:
+    """
+    A pool of worker processes searching the root moves of GameTrees in parallel.
+
+    The pool can be reused by any number of searches; close it (or use it as a context
+    manager) to stop the workers.
+
+    Attributes:
+    workers (int): The number of worker processes.
+    """
+
+    def __init__(self, workers=None, backend='list', table_size=WORKER_TABLE_SIZE, ordering=True):
+        """
+        Starts the worker processes.
+
+        Parameters:
+        workers (int): The number of worker processes, the number of CPUs if None.
+        backend (str): The overflow backend of the workers' searches.
+        table_size (int): The slots of each worker's transposition table, 0 for none.
+        ordering (bool): Whether the workers order moves with a MoveOrdering.
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        # the number of the current search, its best exact score and the index of its move
+        self._best = multiprocessing.Array('d', [0, float('-inf'), 0])
+        self._searches = 0
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self._best, backend, table_size, ordering))
+
+    def search(self, board, player, height, moves, index, pv=None, deadline=None):
+        """
+        Scores every move of player on board in the workers.
+
+        Parameters:
+        board (list of lists): The root board.
+        player (int): The player to move.
+        height (int): The depth of the leaves.
+        moves (list of tuples): The moves to score, in the order they are handed out.
+        index (dict): The row-major index of every move, which decides ties.
+        pv (list of tuples): The principal variation of a previous search, or None.
+        deadline (float): The time.time() at which the search is abandoned, or None.
+
+        Returns:
+        list of tuples: (move, score, alpha, line, nodes, reached_horizon) for every move,
+        in the order of moves. A score is exact if it is above its alpha.
+
+        Raises:
+        SearchTimeout: If the deadline passed before every move was scored.
+        """
+        packed = pack_grid(board)
+        self._searches += 1
+        with self._best.get_lock():
+            self._best[0] = self._searches
+            self._best[1] = float('-inf')
+            self._best[2] = len(moves)
+        futures = []
+        for move in moves:
+            child_pv = tuple(pv[1:]) if pv and move == pv[0] else None
+            futures.append(self._executor.submit(_search_move, self._searches, packed, len(board[0]),
+                                                 player, height, move, index[move], child_pv, deadline))
+        results = []
+        for future in futures:
+            result = future.result()
+            if result is None:
+                for pending in futures:
+                    pending.cancel()
+                raise SearchTimeout
+            results.append(result)
+        return results
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
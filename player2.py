@@ -1,14 +1,46 @@
+from a2_parta import TranspositionTable
 from a2_partb import GameTree
+from mcts import MCTSTree
+from move_ordering import MoveOrdering
+from opening_book import OPENING_BOOK_PATH, load_book
 
 class PlayerTwo:
 
-    def __init__(self, name = "P2 Bot"):
+    def __init__(self, name = "P2 Bot", time_budget_ms = None, engine = 'gametree',
+                 book_path = OPENING_BOOK_PATH):
+        if engine not in ('gametree', 'mcts'):
+            raise ValueError(f"unknown engine {engine!r}")
         self.name = name
+        # 'gametree' searches with GameTree, 'mcts' with Monte Carlo tree search
+        self.engine = engine
+        # None searches a fixed 4 plies (or MCTS iterations), a number of milliseconds
+        # deepens (or iterates) until it runs out
+        self.time_budget_ms = time_budget_ms
+        # Shared by every tree this bot builds, so positions seen last turn are reused.
+        # No MoveCache: without one the search makes and unmakes moves on a single board
+        self.table = TranspositionTable()
+        self.ordering = MoveOrdering()
+        # The tree of the last move, moved on to the next board when it is a grandchild
+        self.tree = None
+        # Moves of the first plies, searched offline (None if there is no book file)
+        self.book = load_book(book_path) if book_path is not None else None
 
     def get_name(self):
         return self.name
 
     def get_play(self, board):
-        tree = GameTree(board, -1)
-        (row,col) = tree.get_move()
+        if self.book is not None:
+            move = self.book.lookup(board, -1)
+            if move is not None:
+                row, col = move
+                if board[row][col] <= 0:
+                    self.tree = None
+                    return move
+        if self.tree is None or not self.tree.reroot(board):
+            if self.engine == 'mcts':
+                self.tree = MCTSTree(board, -1)
+            else:
+                self.tree = GameTree(board, -1, search='negamax',
+                                     table=self.table, ordering=self.ordering, symmetry=True)
+        (row,col) = self.tree.get_move(self.time_budget_ms)
         return (row,col)
\ No newline at end of file
@@ -0,0 +1,119 @@
+# Symmetries of the board.
+#
+# A rows x cols board looks the same mirrored left to right, mirrored top to
+# bottom and turned half way round (a square board also mirrored along its
+# diagonals and turned a quarter), since capacities only depend on the number of
+# neighbours. Swapping the colours of every cell and of the player to move does
+# not change a position either: the start board of game.py, turned half way round
+# with its colours swapped, is the start board again.
+#
+# Settled positions that map onto each other this way have the same scores and
+# mapped best moves, so the searches key their transposition tables by the
+# canonical key of a position (ZobristKeys.canonical, maintained incrementally by
+# TrackedBoard.canonical_key) and store the moves mapped into its frame. At the
+# root, moves that a symmetry of the board maps onto each other lead to symmetric
+# positions, and only the first of them in row-major order is searched
+# (unique_moves).
+
+from a1_partd import get_overflow_list
+from a2_parta import zobrist_keys
+from tracked_board import TrackedBoard
+
+
+def transform_grid(grid, perm, colour):
+    """
+    Returns the image of grid under a transform.
+
+    Parameters:
+    grid (list of lists): The board.
+    perm (tuple): Where every cell goes, by flat index (see Topology.transforms).
+    colour (int): -1 to swap the colours of the cells, 1 to keep them.
+
+    Returns:
+    list of lists: A new board.
+    """
+    rows = len(grid)
+    cols = len(grid[0])
+    flat = [0] * (rows * cols)
+    index = 0
+    for row in grid:
+        for value in row:
+            flat[perm[index]] = colour * value
+            index += 1
+    return [flat[i * cols:(i + 1) * cols] for i in range(rows)]
+
+
+def canonical_key(board, player):
+    """
+    Returns the key shared by every position symmetric to board with player to move,
+    and the transform giving it (see ZobristKeys.canonical). A board that is not
+    settled gets its plain key and the identity transform.
+
+    Parameters:
+    board (list of lists or TrackedBoard): The board.
+    player (int): The player to move (1 or -1).
+
+    Returns:
+    tuple: The 64-bit key and the index of the transform in ZobristKeys.transforms.
+    """
+    if isinstance(board, TrackedBoard):
+        return board.canonical_key(player)
+    keys = zobrist_keys(len(board), len(board[0]))
+    if get_overflow_list(board) is not None:
+        return keys.hash_grid(board) ^ keys.side[player], 0
+    return keys.canonical(keys.hash_symmetric(board), player)
+
+
+def canonical_form(board, player):
+    """
+    Returns the representative of the positions symmetric to board with player to
+    move: the image with the canonical key.
+
+    Parameters:
+    board (list of lists or TrackedBoard): The board.
+    player (int): The player to move (1 or -1).
+
+    Returns:
+    tuple: The representative board (a new list of lists), its player to move and the
+           index of the transform mapping board onto it.
+    """
+    _, t = canonical_key(board, player)
+    perm, colour = zobrist_keys(len(board), len(board[0])).transforms[t]
+    return transform_grid(board, perm, colour), player * colour, t
+
+
+def unique_moves(board, moves):
+    """
+    Drops the moves that a symmetry of board maps onto an earlier move.
+
+    Only the symmetries keeping the colours (the player to move stays the same) that
+    map a settled board onto itself are used. The moves dropped lead to positions
+    symmetric to the one of the move kept, so they score the same.
+
+    Parameters:
+    board (list of lists or TrackedBoard): The board.
+    moves (list of tuples): The moves (row, col), in row-major order.
+
+    Returns:
+    list of tuples: The moves kept, in order.
+    """
+    grid = board.grid if isinstance(board, TrackedBoard) else board
+    if not moves or get_overflow_list(grid) is not None:
+        return moves
+    cols = len(grid[0])
+    flat = [value for row in grid for value in row]
+    keys = zobrist_keys(len(grid), cols)
+    stabilizer = [perm for perm, colour in keys.transforms[1:]
+                  if colour == 1 and all(flat[perm[k]] == value for k, value in enumerate(flat))]
+    if not stabilizer:
+        return moves
+    kept = []
+    seen = set()
+    for (row, col) in moves:
+        index = row * cols + col
+        if index in seen:
+            continue
+        kept.append((row, col))
+        seen.add(index)
+        seen.update(perm[index] for perm in stabilizer)
+    return kept
@@ -0,0 +1,288 @@
+#   Endgame tablebase: the exact result of every position of a small board.
+#   To build one, run: python tablebase.py ROWS COLS [--output FILE]
+#
+# solve enumerates every position reachable from the start board (the gem of
+# player 1 in the top left corner, the one of player 2 in the bottom right one)
+# through the overflow rules, then solves them backwards from the finished games
+# (retrograde analysis):
+#   - a player with no cell left has lost (the move before took their last cell)
+#   - a position is won in d + 1 plies if a move leads to a position the opponent
+#     loses in d, taking the shortest such win
+#   - a position is lost in d + 1 plies if every move leads to a position the
+#     opponent wins, d being the longest of those wins
+#   - positions never decided this way can be played forever, and are draws
+#
+# A settled board has |cell| < capacity in every cell, so a position is stored by
+# its index: the cells as a mixed-radix number, times 2, plus 1 if player 2 is to
+# move. The table is an array of one byte codes, one per index (see Tablebase), and
+# the file is a short header followed by that array.
+#
+# A 3x3 board has 708750 indices (81k of them reachable) and is solved in
+# seconds. A 3x4 board already has over 120 million (the reachable positions are
+# a fraction of them, but they are enumerated one at a time in Python), and a 4x4
+# board about 150 billion.
+
+import argparse
+import struct
+import time
+from array import array
+from a1_partd import get_topology, overflow
+
+# Results of a position, for the player to move
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# Magic, rows, cols, padding, number of codes
+# (a code is one byte, so wins and losses are at most 125 plies away)
+TABLEBASE_HEADER = struct.Struct('<4sBBxxI')
+TABLEBASE_MAGIC = b'GTB1'
+
+# The score of a won position before the distance is taken off, above any score of
+# a2_partb.negamax_score
+TABLEBASE_WIN = 1000
+
+
+class Tablebase:
+    """
+    The solved positions of one board shape.
+
+    The code of a position is 0 if it is not in the table (not reachable from the
+    start board), 1 for a draw, 2 + 2 * d for a win in d plies and 3 + 2 * d for a
+    loss in d plies, for the player to move.
+
+    Attributes:
+    rows (int): The number of rows of the board.
+    cols (int): The number of columns of the board.
+    codes (array): The code of every position index.
+    """
+
+    def __init__(self, rows, cols, codes=None):
+        self.rows = rows
+        self.cols = cols
+        topology = get_topology(rows, cols)
+        # the place value of every cell, and its offset (capacity - 1)
+        self._offsets = [capacity - 1 for capacity in topology.flat_capacity]
+        self._radixes = []
+        size = 2
+        for capacity in topology.flat_capacity:
+            self._radixes.append(size)
+            size *= 2 * capacity - 1
+        self.size = size
+        self.codes = codes if codes is not None else array('B', bytes(size))
+
+    def index(self, board, player):
+        """
+        Returns the index of board with player to move, or None if a cell is at or
+        above its capacity (the board is not settled).
+        """
+        index = 0 if player == 1 else 1
+        k = 0
+        offsets = self._offsets
+        radixes = self._radixes
+        for row in board:
+            for value in row:
+                offset = offsets[k]
+                if not -offset <= value <= offset:
+                    return None
+                index += (value + offset) * radixes[k]
+                k += 1
+        return index
+
+    def board(self, index):
+        """
+        Returns the (board, player to move) of an index.
+        """
+        player = 1 if index % 2 == 0 else -1
+        values = []
+        for k, offset in enumerate(self._offsets):
+            base = 2 * offset + 1
+            values.append((index // self._radixes[k]) % base - offset)
+        return [values[i * self.cols:(i + 1) * self.cols] for i in range(self.rows)], player
+
+    def probe(self, board, player):
+        """
+        Returns the (result, distance in plies) of board with player to move, where
+        result is WIN, DRAW or LOSS for player, or None if the position is not in the
+        table. The distance of a draw is 0. A board where only the opponent has cells
+        left is lost in 0 plies, settled or not.
+        """
+        if len(board) != self.rows or len(board[0]) != self.cols:
+            return None
+        own = other = False
+        for row in board:
+            for value in row:
+                if value * player > 0:
+                    own = True
+                elif value:
+                    other = True
+        if other and not own:
+            return LOSS, 0
+        index = self.index(board, player)
+        if index is None:
+            return None
+        code = self.codes[index]
+        if code == 0:
+            return None
+        if code == 1:
+            return DRAW, 0
+        return (WIN if code % 2 == 0 else LOSS), (code - 2) // 2
+
+    def score(self, board, player):
+        """
+        Returns the score of board for player to move: TABLEBASE_WIN minus the plies to
+        a win, its negation for a loss and 0 for a draw, or None if the position is not
+        in the table.
+        """
+        entry = self.probe(board, player)
+        if entry is None:
+            return None
+        result, distance = entry
+        return result * (TABLEBASE_WIN - distance)
+
+    def __len__(self):
+        """
+        Returns the number of positions in the table.
+        """
+        return self.size - self.codes.count(0)
+
+    def save(self, path):
+        """
+        Writes the table to path.
+        """
+        with open(path, 'wb') as f:
+            f.write(TABLEBASE_HEADER.pack(TABLEBASE_MAGIC, self.rows, self.cols, self.size))
+            self.codes.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a table written by save.
+
+        Raises:
+        ValueError: If the file is not a tablebase.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(TABLEBASE_HEADER.size)
+            if len(header) != TABLEBASE_HEADER.size:
+                raise ValueError(f"{path} is not a tablebase")
+            magic, rows, cols, size = TABLEBASE_HEADER.unpack(header)
+            if magic != TABLEBASE_MAGIC:
+                raise ValueError(f"{path} is not a tablebase")
+            table = cls(rows, cols)
+            if table.size != size:
+                raise ValueError(f"{path} is not a tablebase")
+            codes = array('B')
+            try:
+                codes.fromfile(f, size)
+            except EOFError:
+                raise ValueError(f"{path} is truncated") from None
+            table.codes = codes
+        return table
+
+
+def solve(rows, cols):
+    """
+    Solves every position reachable from the start board (see the module comment).
+
+    Parameters:
+    rows (int): The number of rows of the board.
+    cols (int): The number of columns of the board.
+
+    Returns:
+    Tablebase: The solved table.
+
+    Raises:
+    ValueError: If a game is too long for the codes of the table.
+    """
+    table = Tablebase(rows, cols)
+    cells = get_topology(rows, cols).cells
+    start = [[0] * cols for _ in range(rows)]
+    start[0][0] = 1
+    start[rows - 1][cols - 1] = -1
+
+    # every reachable position, its moves (None for a move that wins at once) and
+    # the positions leading to it
+    children = {}
+    parents = {}
+    frontier = [table.index(start, 1)]
+    children[frontier[0]] = None
+    while frontier:
+        next_frontier = []
+        for index in frontier:
+            board, player = table.board(index)
+            if not any(value * player > 0 for row in board for value in row):
+                children[index] = []  # player has no cell left: lost
+                continue
+            moves = []
+            for (i, j) in cells:
+                if board[i][j] * player < 0:
+                    continue
+                child = [row[:] for row in board]
+                child[i][j] += player
+                overflow(child, None)
+                if not any(value * player < 0 for row in child for value in row):
+                    moves.append(None)  # the move takes the last cell of the opponent
+                    continue
+                child_index = table.index(child, -player)
+                moves.append(child_index)
+                parents.setdefault(child_index, []).append(index)
+                if child_index not in children:
+                    children[child_index] = None
+                    next_frontier.append(child_index)
+            children[index] = moves
+        frontier = next_frontier
+
+    # retrograde analysis, one distance at a time
+    codes = table.codes
+    undecided = {}
+    decided = []
+    for index, moves in children.items():
+        if None in moves:
+            codes[index] = 2 + 2  # a win in one ply
+            decided.append(index)
+        elif not moves:
+            codes[index] = 3  # already lost
+            decided.append(index)
+        else:
+            undecided[index] = len(moves)
+    while decided:
+        next_decided = []
+        for index in decided:
+            code = codes[index]
+            for parent in parents.get(index, ()):
+                if parent not in undecided:
+                    continue
+                if code % 2 == 1:
+                    # the opponent loses after this move: a win one ply longer
+                    codes[parent] = code + 1
+                    del undecided[parent]
+                    next_decided.append(parent)
+                else:
+                    undecided[parent] -= 1
+                    if undecided[parent] == 0:
+                        # every move wins for the opponent, the longest defence is this one
+                        if code + 3 > 253:
+                            raise ValueError(f"a {rows}x{cols} game is too long for the table")
+                        codes[parent] = code + 3
+                        del undecided[parent]
+                        next_decided.append(parent)
+        decided = next_decided
+    for index in undecided:
+        codes[index] = 1
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves every position of a small board.")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('cols', type=int)
+    parser.add_argument('--output', help="the file to write, tablebase_ROWSxCOLS.bin by default")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    tablebase = solve(args.rows, args.cols)
+    path = args.output or f"tablebase_{args.rows}x{args.cols}.bin"
+    tablebase.save(path)
+    print(f"solved {len(tablebase)} positions of a {args.rows}x{args.cols} board in "
+          f"{time.perf_counter() - start_time:.1f}s, wrote {path}")
@@ -0,0 +1,235 @@
+#
+#   These are the unit tests for the overflow functions of a1_partd
+#   To use this, run: python test_a1_partd.py
+
+import random
+import unittest
+from a1_partc import Queue
+from a1_partd import (overflow, run_overflow, overflow_waves, get_overflow_list,
+                      is_all_same_sign, copy_grid, apply_delta, rebuild_snapshots, is_dense_wave,
+                      neighbor_count, get_topology, TOPOLOGY_CACHE_SIZE)
+
+
+def reference_overflow(grid, a_queue, grid_count=0):
+    # The original full-rescan overflow, kept as the oracle for the engine
+    overflow_list = get_overflow_list(grid)
+
+    if overflow_list and not is_all_same_sign(grid):
+        overflowing_sign = grid[overflow_list[0][0]][overflow_list[0][1]] // abs(grid[overflow_list[0][0]][overflow_list[0][1]])
+
+        for (x, y) in overflow_list:
+            grid[x][y] = 0
+
+        for (x, y) in overflow_list:
+            for (i, j) in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
+                if (i in range(len(grid)) and j in range(len(grid[0]))):
+                    grid[i][j] = (abs(grid[i][j]) + 1) * overflowing_sign
+
+        a_queue.enqueue(copy_grid(grid))
+        grid_count += 1
+
+        if get_overflow_list(grid):
+            grid_count += reference_overflow(grid, a_queue)
+
+    return grid_count
+
+
+def queue_to_list(a_queue):
+    result = []
+    while not a_queue.is_empty():
+        result.append(a_queue.dequeue())
+    return result
+
+
+def queue_to_list_of(overflow_function, grid):
+    a_queue = Queue()
+    overflow_function(grid, a_queue)
+    return queue_to_list(a_queue)
+
+
+def random_grid(rng, rows, cols, high=4):
+    return [[rng.randint(-high, high) for _ in range(cols)] for _ in range(rows)]
+
+
+def cascade_grid(rows, cols):
+    # every cell one gem below capacity, a single opponent gem in the far corner
+    grid = []
+    for i in range(rows):
+        row = []
+        for j in range(cols):
+            if (i == 0 or i == rows - 1) and (j == 0 or j == cols - 1):
+                row.append(1)
+            elif i == 0 or i == rows - 1 or j == 0 or j == cols - 1:
+                row.append(2)
+            else:
+                row.append(3)
+        grid.append(row)
+    grid[rows - 1][cols - 1] = -1
+    grid[0][0] = 2
+    return grid
+
+
+class A1DTestCase(unittest.TestCase):
+    """These are the test cases for the overflow engine"""
+
+    def assert_same_waves(self, grid):
+        expected_grid = copy_grid(grid)
+        expected_queue = Queue()
+        expected_count = reference_overflow(expected_grid, expected_queue)
+
+        actual_queue = Queue()
+        actual_count = overflow(grid, actual_queue)
+
+        self.assertEqual(actual_count, expected_count)
+        self.assertEqual(grid, expected_grid)
+        self.assertEqual(queue_to_list(actual_queue), queue_to_list(expected_queue))
+
+    def test_overflow_matches_reference_on_random_grids(self):
+        rng = random.Random(456)
+        for _ in range(400):
+            rows = rng.randint(1, 7)
+            cols = rng.randint(1, 7)
+            self.assert_same_waves(random_grid(rng, rows, cols))
+
+    def test_overflow_matches_reference_on_long_cascades(self):
+        for rows, cols in [(5, 6), (8, 8), (12, 9)]:
+            self.assert_same_waves(cascade_grid(rows, cols))
+
+    def test_overflow_keeps_grid_count(self):
+        grid = cascade_grid(5, 6)
+        waves = reference_overflow(copy_grid(grid), Queue())
+        self.assertEqual(overflow(grid, Queue(), 3), waves + 3)
+
+    def test_no_overflow(self):
+        grid = [[0, 1, 0], [-1, 2, 0], [0, 0, 1]]
+        a_queue = Queue()
+        self.assertEqual(overflow(grid, a_queue), 0)
+        self.assertTrue(a_queue.is_empty())
+
+        # a board of only one sign never overflows, even above capacity
+        grid = [[3, 0, 0], [0, 5, 0], [0, 0, 2]]
+        self.assertEqual(overflow(grid, a_queue), 0)
+        self.assertEqual(grid, [[3, 0, 0], [0, 5, 0], [0, 0, 2]])
+
+    def test_run_overflow_result(self):
+        grid = cascade_grid(5, 6)
+        expected_queue = Queue()
+        waves = reference_overflow(copy_grid(grid), expected_queue)
+
+        result = run_overflow(grid, Queue())
+        self.assertEqual(result.waves, waves)
+        self.assertEqual(result.sign, 1)
+        self.assertTrue(result.settled)
+        self.assertGreaterEqual(result.cells_touched, waves)
+
+        result = run_overflow([[0, 1], [-1, 0]], Queue())
+        self.assertEqual((result.waves, result.cells_touched, result.sign, result.settled),
+                         (0, 0, 0, True))
+
+    def test_run_overflow_wave_budget(self):
+        grid = cascade_grid(6, 6)
+        states = queue_to_list_of(reference_overflow, copy_grid(grid))
+
+        a_queue = Queue()
+        result = run_overflow(grid, a_queue, max_waves=3)
+        self.assertEqual(result.waves, 3)
+        self.assertFalse(result.settled)
+        self.assertEqual(grid, states[2])
+
+        # the cut-off cascade can be resumed where it stopped
+        result = run_overflow(grid, a_queue)
+        self.assertTrue(result.settled)
+        self.assertEqual(result.waves, len(states) - 3)
+        self.assertEqual(queue_to_list(a_queue), states)
+
+    def test_overflow_without_recording(self):
+        rng = random.Random(99)
+        grids = [random_grid(rng, 5, 6) for _ in range(100)] + [cascade_grid(7, 5)]
+        for grid in grids:
+            expected_grid = copy_grid(grid)
+            waves = reference_overflow(expected_grid, Queue())
+            self.assertEqual(overflow(grid, None), waves)
+            self.assertEqual(grid, expected_grid)
+
+    def test_overflow_delta_recording(self):
+        rng = random.Random(5)
+        grids = [random_grid(rng, 5, 6) for _ in range(100)] + [cascade_grid(8, 6)]
+        copies = 0
+        for grid in grids:
+            snapshots = queue_to_list_of(reference_overflow, copy_grid(grid))
+
+            a_queue = Queue()
+            settled = copy_grid(grid)
+            self.assertEqual(overflow(settled, a_queue, deltas=True), len(snapshots))
+            deltas = queue_to_list(a_queue)
+            self.assertEqual(rebuild_snapshots(grid, deltas), snapshots)
+
+            # a delta lists the cells its wave touched, which covers every changed cell;
+            # a dense wave is recorded as a full copy instead
+            for delta, snapshot in zip(deltas, snapshots):
+                changed = {(i, j) for i in range(len(grid)) for j in range(len(grid[0]))
+                           if grid[i][j] != snapshot[i][j]}
+                if isinstance(delta[0], list):
+                    self.assertEqual(delta, snapshot)
+                    copies += 1
+                else:
+                    self.assertLessEqual(changed, {(i, j) for (i, j, _) in delta})
+                    self.assertFalse(is_dense_wave(len(grid), len(grid[0]), len(delta)))
+                apply_delta(grid, delta)
+            self.assertEqual(grid, settled)
+        self.assertGreater(copies, 0)
+
+    def test_overflow_waves_is_lazy(self):
+        grid = cascade_grid(6, 6)
+        snapshots = queue_to_list_of(reference_overflow, copy_grid(grid))
+
+        waves = overflow_waves(grid)
+        previous = copy_grid(grid)
+        for snapshot in snapshots:
+            # each step applies exactly one more wave to the grid and yields its changes
+            apply_delta(previous, next(waves))
+            self.assertEqual(grid, snapshot)
+            self.assertEqual(previous, snapshot)
+
+        with self.assertRaises(StopIteration) as stop:
+            next(waves)
+        self.assertEqual(stop.exception.value.waves, len(snapshots))
+        self.assertTrue(stop.exception.value.settled)
+
+    def test_overflow_waves_budget(self):
+        waves = overflow_waves(cascade_grid(6, 6), max_waves=2)
+        self.assertEqual(len([next(waves), next(waves)]), 2)
+        with self.assertRaises(StopIteration) as stop:
+            next(waves)
+        self.assertFalse(stop.exception.value.settled)
+
+    def test_topology_tables(self):
+        for rows, cols in [(1, 1), (1, 5), (4, 1), (5, 6), (3, 7)]:
+            topology = get_topology(rows, cols)
+            self.assertEqual(len(topology.cells), rows * cols)
+            for index, (i, j) in enumerate(topology.cells):
+                neighbors = [(x, y) for (x, y) in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]
+                             if x in range(rows) and y in range(cols)]
+                self.assertEqual(topology.capacity[i][j], neighbor_count(i, j, rows, cols))
+                self.assertEqual(topology.flat_capacity[index], topology.capacity[i][j])
+                self.assertEqual(sorted(topology.neighbors[i][j]), sorted(neighbors))
+                self.assertEqual(sorted(topology.flat_neighbors[index]),
+                                 sorted(x * cols + y for (x, y) in neighbors))
+
+    def test_topology_cache(self):
+        self.assertIs(get_topology(5, 6), get_topology(5, 6))
+        for size in range(1, TOPOLOGY_CACHE_SIZE + 2):
+            get_topology(size, 20)
+        self.assertEqual(get_topology.cache_info().currsize, TOPOLOGY_CACHE_SIZE)
+
+    def test_long_cascade_has_no_recursion_limit(self):
+        # more waves than the default recursion limit allows
+        grid = cascade_grid(2, 1200)
+        result = run_overflow(grid, Queue())
+        self.assertGreater(result.waves, 1000)
+        self.assertTrue(result.settled)
+        self.assertTrue(is_all_same_sign(grid))
+
+
+if __name__ == '__main__':
+    unittest.main()
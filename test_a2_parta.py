@@ -4,7 +4,11 @@
 #   To use this, run: python test_a2_parta.py
 
 import unittest
-from a2_parta import HashTable
+import random
+from a2_parta import HashTable, MoveCache, TranspositionTable, zobrist_keys, EXACT, LOWER, UPPER
+from a2_partb import GameTree
+from tracked_board import TrackedBoard
+from test_a1_partd import random_grid
 
 class A2ATestCase(unittest.TestCase):
     """These are the test cases for functions and classes of a2"""
@@ -310,6 +314,120 @@ class A2ATestCase(unittest.TestCase):
                 self.assertEqual(table.search(keys[i]),values[i])
 
 
+    def test_zobrist_keys(self):
+        keys = zobrist_keys(3, 4)
+        self.assertIs(keys, zobrist_keys(3, 4))
+        self.assertEqual(keys.hash_grid([[0] * 4 for _ in range(3)]), 0)
+        self.assertEqual(keys.key(5, 0), 0)
+        # every (cell, value) pair gets its own key, also past the precomputed range
+        seen = set()
+        for index in range(12):
+            for value in list(range(-20, 0)) + list(range(1, 21)):
+                seen.add(keys.key(index, value))
+        self.assertEqual(len(seen), 12 * 40)
+        self.assertNotEqual(keys.side[1], keys.side[-1])
+
+        board = [[1, 0, -2, 0], [0, 3, 0, 0], [0, 0, 0, -1]]
+        expected = keys.key(0, 1) ^ keys.key(2, -2) ^ keys.key(5, 3) ^ keys.key(11, -1)
+        self.assertEqual(keys.hash_grid(board), expected)
+
+    def test_TranspositionTable(self):
+        table = TranspositionTable(100)
+        self.assertEqual(table.capacity(), 64)
+        self.assertEqual(table.search(3), None)
+        self.assertTrue(table.insert(3, 2, EXACT, 40, (0, 1)))
+        self.assertEqual(table.search(3)[1:5], (2, EXACT, 40, (0, 1)))
+        self.assertEqual(len(table), 1)
+
+        # 67 shares the slot of 3: a shallower result of the same search is dropped
+        self.assertFalse(table.insert(67, 1, LOWER, 10, (1, 1)))
+        self.assertEqual(table.search(67), None)
+        # an equally deep one, or the same position, replaces it
+        self.assertTrue(table.insert(67, 2, LOWER, 10, (1, 1)))
+        self.assertTrue(table.insert(67, 0, UPPER, 5, None))
+        self.assertEqual(table.search(67)[1:5], (0, UPPER, 5, None))
+        self.assertEqual(table.search(3), None)
+        # so does anything once the entry is from an earlier search
+        self.assertTrue(table.insert(3, 4, EXACT, 1, (0, 0)))
+        table.new_search()
+        self.assertTrue(table.insert(67, 1, EXACT, 2, (0, 0)))
+        self.assertEqual(len(table), 1)
+
+        self.assertEqual((table.hits, table.misses), (2, 3))
+        self.assertEqual(table.hit_rate(), 0.4)
+        table.clear()
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.search(67), None)
+
+    def test_TranspositionTable_gametree(self):
+        rng = random.Random(13)
+        for rows, cols in [(3, 3), (3, 4), (4, 5)]:
+            table = TranspositionTable(1 << 10)
+            for _ in range(10):
+                board = random_grid(rng, rows, cols)
+                for player in (1, -1):
+                    expected = GameTree(board, player, 3).get_move()
+                    tree = GameTree(board, player, 3, search='lazy', table=table)
+                    self.assertEqual(tree.get_move(), expected)
+            self.assertGreater(table.hits, 0)
+        with self.assertRaises(ValueError):
+            GameTree([[1, 0], [0, -1]], 1, 1, table=table)
+
+    def test_MoveCache_lru(self):
+        cache = MoveCache(2)
+        board = [[0, 1], [-1, 0]]
+        key = MoveCache.position_key(board)
+        self.assertEqual(key, MoveCache.position_key([row[:] for row in board]))
+        self.assertNotEqual(key, MoveCache.position_key([[1, 0], [-1, 0]]))
+        self.assertNotEqual(key, MoveCache.position_key([[0, 1, -1, 0]]))
+
+        self.assertEqual(cache.search(key, (0, 0), 1), None)
+        cache.insert(key, (0, 0), 1, "a")
+        cache.insert(key, (0, 0), -1, "b")
+        self.assertEqual(len(cache), 2)
+        # touching (0, 0), 1 makes (0, 0), -1 the least recently used entry
+        self.assertEqual(cache.search(key, (0, 0), 1), "a")
+        cache.insert(key, (1, 1), 1, "c")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.capacity(), 2)
+        self.assertEqual(cache.search(key, (0, 0), -1), None)
+        self.assertEqual(cache.search(key, (1, 1), 1), "c")
+        self.assertEqual(cache.search(key, (0, 0), 1), "a")
+
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+        self.assertEqual(cache.hit_rate(), 0.6)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hit_rate(), 0.0)
+
+    def test_MoveCache_gametree(self):
+        rng = random.Random(11)
+        cache = MoveCache()
+        for _ in range(6):
+            board = random_grid(rng, 3, 4)
+            for player in (1, -1):
+                expected = GameTree(board, player, 2)
+                tree = GameTree(board, player, 2, cache=cache)
+                self.assertEqual(tree.get_move(), expected.get_move())
+                # a second tree on the same board is served entirely from the cache
+                hits = cache.hits
+                self.assertEqual(GameTree(board, player, 2, cache=cache).get_move(), expected.get_move())
+                self.assertGreater(cache.hits, hits)
+
+                moves = expected.get_possible_moves(board, player)
+                for move in moves:
+                    result = expected.apply_moves(board, move, player)
+                    self.assertEqual(tree.apply_moves(board, move, player), result)
+                    cached = tree.apply_moves(TrackedBoard(board), move, player)
+                    self.assertEqual(cached, result)
+                    self.assertEqual(cached.cells, TrackedBoard(result).cells)
+                    self.assertEqual(cached.gems, TrackedBoard(result).gems)
+                # the results handed out are copies, changing one leaves the cache intact
+                if moves:
+                    tree.apply_moves(board, moves[0], player)[0][0] = 99
+                    self.assertEqual(tree.apply_moves(board, moves[0], player),
+                                     expected.apply_moves(board, moves[0], player))
+        self.assertGreater(cache.hit_rate(), 0.5)
 
 
 if __name__ == '__main__':
@@ -4,8 +4,13 @@
 #   To use this, run: python test_a2_partc.py
 
 
+import random
+import time
 import unittest
-from a2_partb import evaluate_board, GameTree
+from a2_parta import TranspositionTable
+from a2_partb import evaluate_board, negamax_score, GameTree
+from move_ordering import MoveOrdering
+from test_a1_partd import random_grid
 
 class A2BTestCase(unittest.TestCase):
     """These are the test cases for functions and classes of a2"""
@@ -133,6 +138,190 @@ class A2BTestCase(unittest.TestCase):
         self.assertNotEqual((row,col), (4,0))
         self.assertNotEqual((row,col), (4,5))
 
+    def test_lazy_search(self):
+        # the lazy search picks the winning move and avoids the corners like the full
+        # tree, storing no children and building fewer boards
+        boards = [[[0, 2, -2, 0, 0, 0], [0, 0, -3, -1, 0, 0], [0, 0, 0, 0, 0, 0],
+                   [0, 0, 0, 0, 2, 0], [0, 0, 0, 2, 0, 0]],
+                  [[0, 0, 0, 0, 0, 0], [-1, 0, 0, 0, 0, -1], [-2, 3, 3, 3, 3, -2],
+                   [-1, 0, 0, 0, 0, -1], [0, 0, -2, -1, 0, 0]]]
+        for board in boards:
+            full = GameTree(board, 1, 3)
+            lazy = GameTree(board, 1, 3, search='lazy')
+            self.assertEqual(lazy.get_move(), full.get_move())
+            self.assertEqual(lazy.root.children, ())
+            self.assertLess(lazy.nodes, full.nodes)
+
+        rng = random.Random(12)
+        for rows, cols, height in [(2, 2, 4), (3, 3, 3), (3, 4, 3), (4, 5, 2)]:
+            for _ in range(15):
+                board = random_grid(rng, rows, cols)
+                for player in (1, -1):
+                    expected = GameTree(board, player, height).get_move()
+                    self.assertEqual(GameTree(board, player, height, search='lazy').get_move(), expected)
+
+        # nothing to search: a zero height tree or a finished game
+        self.assertEqual(GameTree([[1, 0], [0, -1]], 1, 0, search='lazy').get_move(), None)
+        self.assertEqual(GameTree([[1, 1], [2, 1]], -1, 2, search='lazy').get_move(), None)
+        with self.assertRaises(ValueError):
+            GameTree([[1, 0], [0, -1]], 1, 1, search='greedy')
+
+    def test_time_budget(self):
+        rng = random.Random(14)
+        for rows, cols in [(3, 3), (3, 4), (5, 6)]:
+            for _ in range(4):
+                board = random_grid(rng, rows, cols)
+                for player in (1, -1):
+                    tree = GameTree(board, player, search='lazy')
+                    start = time.perf_counter()
+                    move = tree.get_move(time_budget_ms=30)
+                    self.assertLess(time.perf_counter() - start, 1.0)
+                    # the search ran on the root board and took every move back, even on timeout
+                    self.assertEqual(tree.root.board, board)
+                    self.assertFalse(tree.root.board.undo_log)
+                    self.assertEqual(tree.root.board.zobrist, tree.root.board.keys.hash_grid(board))
+                    if tree.is_terminal(board):
+                        self.assertEqual(move, None)
+                        continue
+                    # the move is the one a fixed-height search of the last completed depth picks
+                    self.assertGreaterEqual(tree.completed_height, 1)
+                    expected = GameTree(board, player, tree.completed_height, search='lazy').get_move()
+                    self.assertEqual(move, expected)
+
+        # depth 1 is always searched, however small the budget
+        board = [[0, 0, 0], [0, 1, 0], [0, 0, -1]]
+        tree = GameTree(board, 1, search='lazy')
+        self.assertEqual(tree.get_move(time_budget_ms=0), GameTree(board, 1, 1).get_move())
+        self.assertEqual(tree.completed_height, 1)
+
+    def test_nodes(self):
+        board = [[0, 2, -2, 0], [1, 0, -3, -1], [0, 0, 0, 2]]
+        tree = GameTree(board, 1, 2)
+        self.assertFalse(hasattr(tree.root, '__dict__'))
+        self.assertIsNone(tree.root.packed)
+        for child in tree.root.children:
+            expected = tree.apply_moves(board, child.move, 1)
+            self.assertEqual(child.board, expected)
+            self.assertEqual(len(child.packed), 12)
+            for grandchild in child.children:
+                self.assertEqual(grandchild.board, tree.apply_moves(expected, grandchild.move, -1))
+                self.assertEqual(grandchild.children, ())
+                self.assertEqual(grandchild.score, evaluate_board(grandchild.board, 1))
+        self.assertEqual(len(tree.store), tree.nodes + 1)
+        self.assertEqual(tree.store.grids.typecode, 'b')
+        tree.clear_tree()
+        self.assertIsNone(tree.root)
+        self.assertIsNone(tree.store)
+
+        # a cell that does not fit in a byte widens the store instead of wrapping
+        board = [[300, 0, 1], [0, 0, 0], [-1, 0, 0]]
+        for backend in ('list', 'numpy'):
+            tree = GameTree(board, -1, 2, backend=backend)
+            self.assertEqual(tree.store.grids.typecode, 'h')
+            self.assertEqual([child.board for child in tree.root.children],
+                             [tree.apply_moves(board, move, -1) for move in tree.get_possible_moves(board, -1)])
+            self.assertEqual(tree.get_move(), GameTree(board, -1, 2, search='lazy').get_move())
+
+    def test_reroot(self):
+        def count(node):
+            return 1 + sum(count(child) for child in node.children)
+
+        rng = random.Random(17)
+        for search in ('full', 'lazy'):
+            for _ in range(6):
+                board = random_grid(rng, 3, 4, 2)
+                tree = GameTree(board, 1, 3, search=search)
+                move = tree.get_move()
+                if move is None:
+                    continue
+                child = tree.apply_moves(board, move, 1)
+                replies = tree.get_possible_moves(child, -1)
+                if not replies or tree.is_terminal(child):
+                    continue
+                reply = rng.choice(replies)
+                grandchild = tree.apply_moves(child, reply, -1)
+                if tree.is_terminal(grandchild):
+                    continue
+
+                self.assertTrue(tree.reroot(grandchild))
+                self.assertEqual(tree.root.board, grandchild)
+                fresh = GameTree(grandchild, 1, 3, search=search)
+                self.assertEqual(tree.get_move(), fresh.get_move())
+                if search == 'full':
+                    # the promoted subtree is extended to the same tree, with less work
+                    self.assertEqual(count(tree.root), count(fresh.root))
+                    self.assertLess(tree.nodes, fresh.nodes)
+                # a board that is not a grandchild leaves the tree alone
+                self.assertFalse(tree.reroot(board))
+                self.assertEqual(tree.root.board, grandchild)
+
+        # with a time budget the rest of the principal variation is searched first
+        board = [[1, 0, 0, 0], [0, 0, 2, 0], [0, -1, 0, -1]]
+        tree = GameTree(board, 1, search='lazy')
+        tree.get_move(time_budget_ms=20)
+        if len(tree.pv) > 2:
+            grandchild = tree.apply_moves(tree.apply_moves(board, tree.pv[0], 1), tree.pv[1], -1)
+            expected = tree.pv[2:]
+            self.assertTrue(tree.reroot(grandchild))
+            self.assertEqual(tree.pv, expected)
+            move = tree.get_move(time_budget_ms=20)
+            self.assertEqual(move, GameTree(grandchild, 1, tree.completed_height, search='lazy').get_move())
+
+    def test_negamax(self):
+        def reference(tree, board, player, plies):
+            # plain negamax without pruning
+            if plies == 0 or tree.is_terminal(board):
+                return negamax_score(board, player)
+            moves = tree.get_possible_moves(board, player)
+            if not moves:
+                return negamax_score(board, player)
+            return max(-reference(tree, tree.apply_moves(board, move, player), -player, plies - 1)
+                       for move in moves)
+
+        board = [[1, 2, 0], [-1, 0, 0], [0, 0, -3]]
+        self.assertEqual(negamax_score(board, 1), -negamax_score(board, -1))
+
+        rng = random.Random(18)
+        for rows, cols in [(3, 3), (3, 4)]:
+            for _ in range(4):
+                board = random_grid(rng, rows, cols, 2)
+                for player in (1, -1):
+                    for height in (1, 2, 3):
+                        tree = GameTree(board, player, height, search='negamax')
+                        move, line = tree.get_move_and_line()
+                        if move is None:
+                            continue
+                        child = tree.apply_moves(board, move, player)
+                        best = -reference(tree, child, -player, height - 1)
+                        self.assertEqual(best, reference(tree, board, player, height))
+                        # the line is legal and leads to the board the score comes from
+                        self.assertEqual(line[0], move)
+                        current, mover = board, player
+                        for reply in line:
+                            self.assertIn(reply, tree.get_possible_moves(current, mover))
+                            current, mover = tree.apply_moves(current, reply, mover), -mover
+                        sign = 1 if mover == player else -1
+                        self.assertEqual(sign * negamax_score(current, mover), best)
+
+                        # the table and the ordering only change the work done
+                        fast = GameTree(board, player, height, search='negamax', ordering=MoveOrdering(),
+                                        table=TranspositionTable(1 << 10))
+                        fast_move = fast.get_move()
+                        self.assertEqual(-reference(tree, tree.apply_moves(board, fast_move, player), -player,
+                                                    height - 1), best)
+
+        # an obvious win is taken
+        board = [[0, 2, -2, 0, 0, 0],
+                 [0, 0, -3, -1, 0, 0],
+                 [0, 0, 0, 0, 0, 0],
+                 [0, 0, 0, 0, 2, 0],
+                 [0, 0, 0, 2, 0, 0]]
+        for height in (1, 2, 3, 4):
+            tree = GameTree(board, 1, height, search='negamax')
+            self.assertEqual(tree.get_move(), (0, 1))
+        tree = GameTree([[-cell for cell in row] for row in board], -1, search='negamax')
+        self.assertEqual(tree.get_move(time_budget_ms=50), (0, 1))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+#
+#   These are the unit tests for the bitboard BoardState
+#   To use this, run: python test_bitboard.py
+
+import random
+import unittest
+from a1_partc import Queue
+from a1_partd import overflow, get_overflow_list, is_all_same_sign, copy_grid
+from a2_partb import GameTree, evaluate_board
+from bitboard import BoardState
+from test_a1_partd import random_grid, cascade_grid
+
+
+class BitboardTestCase(unittest.TestCase):
+    """These are the test cases comparing BoardState with the list of lists board"""
+
+    def setUp(self):
+        rng = random.Random(31)
+        self.grids = [random_grid(rng, rng.randint(1, 6), rng.randint(1, 7), high=rng.choice([3, 9]))
+                      for _ in range(300)]
+        self.grids += [cascade_grid(5, 6), cascade_grid(2, 9), [[0] * 6 for _ in range(5)]]
+        self.tree = GameTree([[1, 0], [0, -1]], 1, 0)
+
+    def test_round_trip(self):
+        for grid in self.grids:
+            state = BoardState.from_grid(grid)
+            self.assertEqual(state.to_grid(), grid)
+            self.assertEqual(state, BoardState.from_grid(copy_grid(grid)))
+
+    def test_queries(self):
+        for grid in self.grids:
+            state = BoardState.from_grid(grid)
+            for player in (1, -1):
+                self.assertEqual(state.get_possible_moves(player),
+                                 self.tree.get_possible_moves(grid, player))
+                self.assertEqual(state.evaluate(player), evaluate_board(grid, player))
+            self.assertEqual(state.is_terminal(), self.tree.is_terminal(grid))
+            self.assertEqual(state.is_all_same_sign(), is_all_same_sign(grid))
+
+            overflowing = get_overflow_list(grid) or []
+            mask = state.at_capacity_mask()
+            self.assertEqual([divmod(k, state.cols) for k in range(state.rows * state.cols)
+                              if (mask >> k) & 1], overflowing)
+
+    def test_overflow(self):
+        for grid in self.grids:
+            state = BoardState.from_grid(grid)
+            waves = overflow(grid, Queue())
+            self.assertEqual(state.overflow(), waves)
+            self.assertEqual(state.to_grid(), grid)
+
+    def test_apply_move(self):
+        rng = random.Random(8)
+        for grid in self.grids[:100]:
+            state = BoardState.from_grid(grid)
+            for player in (1, -1):
+                moves = self.tree.get_possible_moves(grid, player)
+                if moves:
+                    move = rng.choice(moves)
+                    expected = self.tree.apply_moves(grid, move, player)
+                    self.assertEqual(state.apply_move(move, player).to_grid(), expected)
+            # apply_move leaves the original board alone
+            self.assertEqual(state.to_grid(), grid)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#
+#   These are the unit tests for the Monte Carlo tree search
+#   To use this, run: python test_mcts.py
+
+import random
+import unittest
+from a1_partd import get_topology
+from a2_partb import GameTree
+from bitboard import BoardState
+from mcts import MCTSTree, _near_capacity_mask, _play
+from player1 import PlayerOne
+from test_a1_partd import random_grid
+
+
+class MCTSTestCase(unittest.TestCase):
+    """These are the test cases for MCTSTree"""
+
+    def test_helpers(self):
+        rng = random.Random(21)
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        for _ in range(50):
+            grid = random_grid(rng, 4, 5, 2)
+            state = BoardState.from_grid(grid)
+            topology = get_topology(4, 5)
+            for player, owner in ((1, state.p1), (-1, state.p2)):
+                expected = 0
+                for index, (i, j) in enumerate(topology.cells):
+                    if grid[i][j] * player > 0 and abs(grid[i][j]) == topology.capacity[i][j] - 1:
+                        expected |= 1 << index
+                self.assertEqual(_near_capacity_mask(state, owner), expected)
+
+                # playing in place matches apply_moves
+                move = rng.choice(tree.get_possible_moves(grid, player))
+                after = state.copy()
+                winner = _play(after, move[0] * 5 + move[1], player)
+                expected_grid = tree.apply_moves(grid, move, player)
+                self.assertEqual(after.to_grid(), expected_grid)
+                took_last = any(c * player < 0 for row in grid for c in row) and \
+                    not any(c * player < 0 for row in expected_grid for c in row)
+                self.assertEqual(winner, player if took_last else 0)
+
+    def test_get_move(self):
+        board = [[0, 2, -2, 0, 0, 0],
+                 [0, 0, -3, -1, 0, 0],
+                 [0, 0, 0, 0, 0, 0],
+                 [0, 0, 0, 0, 2, 0],
+                 [0, 0, 0, 2, 0, 0]]
+        tree = MCTSTree(board, 1, iterations=300, seed=3)
+        self.assertEqual(tree.get_move(), (0, 1))
+        self.assertEqual(tree.completed_iterations, 300)
+        self.assertEqual(tree.playouts, 300 * tree.batch_size)
+        self.assertEqual(tree.root.visits, tree.playouts)
+        self.assertEqual(sum(child.visits for child in tree.root.children), tree.root.visits)
+
+        flipped = [[-cell for cell in row] for row in board]
+        self.assertEqual(MCTSTree(flipped, -1, iterations=300, seed=3).get_move(), (0, 1))
+
+        # a time budget depends on the load of the machine: it only promises a legal move
+        tree = MCTSTree(flipped, -1, seed=3)
+        move = tree.get_move(time_budget_ms=200)
+        self.assertIn(move, GameTree(flipped, -1, 0).get_possible_moves(flipped, -1))
+        self.assertGreaterEqual(tree.completed_iterations, 1)
+
+        # the same seed searches the same way
+        moves = [MCTSTree(random_grid(random.Random(5), 5, 6), 1, iterations=50, seed=9).get_move()
+                 for _ in range(2)]
+        self.assertEqual(moves[0], moves[1])
+
+        # a finished game has no move
+        self.assertIsNone(MCTSTree([[1, 1], [2, 1]], -1).get_move())
+        with self.assertRaises(ValueError):
+            MCTSTree(board, 1, iterations=0)
+
+    def test_reroot(self):
+        board = [[0] * 4 for _ in range(3)]
+        tree = MCTSTree(board, 1, iterations=200, seed=4)
+        move = tree.get_move()
+        child = next(c for c in tree.root.children if c.move == move[0] * 4 + move[1])
+        grandchild = max(child.children, key=lambda c: c.visits)
+        visits = grandchild.visits
+        reply = divmod(grandchild.move, 4)
+        game = GameTree(board, 1, 0)
+        after = game.apply_moves(game.apply_moves(board, move, 1), reply, -1)
+
+        self.assertTrue(tree.reroot(after))
+        self.assertIs(tree.root, grandchild)
+        self.assertIsNone(tree.root.parent)
+        tree.get_move()
+        self.assertEqual(tree.root.visits, visits + tree.playouts)
+        self.assertFalse(tree.reroot(board))
+
+    def test_players(self):
+        board = [[0, 2, -2, 0, 0, 0],
+                 [0, 0, -3, -1, 0, 0],
+                 [0, 0, 0, 0, 0, 0],
+                 [0, 0, 0, 0, 2, 0],
+                 [0, 0, 0, 2, 0, 0]]
+        # a fixed number of iterations, since a time budget depends on the load of the machine
+        bot = PlayerOne(engine='mcts')
+        self.assertEqual(bot.get_play(board), (0, 1))
+        self.assertIsInstance(bot.tree, MCTSTree)
+        with self.assertRaises(ValueError):
+            PlayerOne(engine='random')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#
+#   These are the unit tests for the move ordering of the alpha-beta search
+#   To use this, run: python test_move_ordering.py
+
+import random
+import unittest
+from a2_parta import TranspositionTable
+from a2_partb import GameTree
+from move_ordering import MoveOrdering, SearchStats
+from test_a1_partd import random_grid
+
+
+class MoveOrderingTestCase(unittest.TestCase):
+    """These are the test cases for MoveOrdering and SearchStats"""
+
+    def test_order(self):
+        board = [[1, 0, 0],
+                 [0, 3, -1],
+                 [0, 0, 0]]
+        tree = GameTree(board, 1, 0)
+        moves = tree.get_possible_moves(board, 1)
+        ordering = MoveOrdering()
+
+        # (0, 0) fills a corner but reaches no opponent cell, (1, 1) fills the centre
+        # next to (1, 2), the rest keep row-major order
+        ordered = ordering.order(board, moves, 1, 0)
+        self.assertEqual(ordered[:2], [(1, 1), (0, 0)])
+        self.assertEqual(ordered[2:], [m for m in moves if m not in [(1, 1), (0, 0)]])
+        self.assertEqual(ordering.order(board, moves, 1, 0, (2, 2))[:3], [(2, 2), (1, 1), (0, 0)])
+        # when gaining gems is not rewarded they go last
+        self.assertEqual(ordering.order(board, moves, 1, 0, greedy=False)[-2:], [(0, 0), (1, 1)])
+
+        # killers come after tactical moves, history breaks the remaining ties
+        ordering.record_cutoff((2, 1), 1, 3, 1)
+        ordering.record_cutoff((2, 0), 1, 2, 2)
+        self.assertEqual(ordering.order(board, moves, 1, 3)[:4], [(1, 1), (0, 0), (2, 1), (2, 0)])
+        self.assertEqual(ordering.order(board, moves, 1, 2)[:4], [(1, 1), (0, 0), (2, 0), (2, 1)])
+        # the history of a player does not reorder the moves of the other one
+        other = tree.get_possible_moves(board, -1)
+        self.assertEqual(ordering.order(board, other, -1, 5), other)
+
+        # new_search forgets the killers and ages the history
+        ordering.new_search()
+        self.assertEqual(ordering.killers, {})
+        self.assertEqual(ordering.history[1], {(2, 1): 0, (2, 0): 2})
+
+        plain = MoveOrdering(hash_move=False, tactical=False, killers=False, history=False)
+        plain.record_cutoff((2, 1), 1, 0, 4)
+        self.assertEqual(plain.order(board, moves, 1, 0, (2, 2)), moves)
+
+    def test_killer_slots(self):
+        ordering = MoveOrdering()
+        for move in [(0, 0), (0, 1), (0, 0), (1, 1)]:
+            ordering.record_cutoff(move, -1, 1, 1)
+        self.assertEqual(ordering.killers[1], [(1, 1), (0, 0)])
+
+    def test_same_moves(self):
+        rng = random.Random(15)
+        orderings = [MoveOrdering(), MoveOrdering(tactical=False), MoveOrdering(killers=False, history=False)]
+        for rows, cols in [(3, 3), (3, 4), (4, 5)]:
+            for _ in range(8):
+                board = random_grid(rng, rows, cols)
+                for player in (1, -1):
+                    expected = GameTree(board, player, 3).get_move()
+                    for ordering in orderings:
+                        tree = GameTree(board, player, 3, search='lazy', ordering=ordering,
+                                        table=TranspositionTable(1 << 10))
+                        self.assertEqual(tree.get_move(), expected)
+        with self.assertRaises(ValueError):
+            GameTree([[1, 0], [0, -1]], 1, 1, ordering=MoveOrdering())
+
+    def test_stats(self):
+        board = [[1, -2, -1, 1, 1, -1],
+                 [0, 1, -1, 1, -1, 0],
+                 [0, 1, -1, 2, 1, -1],
+                 [0, 1, -1, 0, -1, 1],
+                 [1, 0, 1, -1, 0, -1]]
+        plain = GameTree(board, 1, 4, search='lazy')
+        ordered = GameTree(board, 1, 4, search='lazy', ordering=MoveOrdering())
+        self.assertEqual(ordered.get_move(), plain.get_move())
+        self.assertLess(ordered.nodes, plain.nodes)
+        self.assertLess(ordered.stats.branching_factor(), plain.stats.branching_factor())
+        self.assertGreater(ordered.stats.first_cutoff_rate(), plain.stats.first_cutoff_rate())
+        self.assertEqual(plain.stats.children + len(plain.get_possible_moves(board, 1)), plain.nodes)
+
+        stats = SearchStats()
+        self.assertEqual((stats.cutoff_rate(), stats.first_cutoff_rate(), stats.branching_factor()),
+                         (0.0, 0.0, 0.0))
+        stats.interior, stats.children, stats.cutoffs, stats.first_cutoffs = 4, 10, 2, 1
+        self.assertEqual((stats.cutoff_rate(), stats.first_cutoff_rate(), stats.branching_factor()),
+                         (0.5, 0.5, 2.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#
+#   These are the unit tests for the opening book
+#   To use this, run: python test_opening_book.py
+
+import os
+import tempfile
+import unittest
+from a2_partb import GameTree
+from opening_book import OpeningBook, build_book, write_book, load_book, book_move, position_key, start_board
+from player2 import PlayerTwo
+
+
+class OpeningBookTestCase(unittest.TestCase):
+    """These are the test cases for building and reading opening books"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'book.bin')
+        cls.book = build_book(depth=3, height=2, rows=3, cols=4)
+        write_book(cls.book, cls.path, 3, rows=3, cols=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_build(self):
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        board = start_board(3, 4)
+        # player 1 at the start and after every reply to its book move, player 2
+        # after every first move
+        first = book_move(self.book, board, 1)
+        self.assertEqual(first, GameTree(board, 1, 2, search='negamax').get_move())
+        after = tree.apply_moves(board, first, 1)
+        replies = tree.get_possible_moves(after, -1)
+        openings = tree.get_possible_moves(board, 1)
+        for move in replies:
+            self.assertIn(position_key(tree.apply_moves(after, move, -1), 1), self.book)
+        for move in openings:
+            self.assertIn(position_key(tree.apply_moves(board, move, 1), -1), self.book)
+        self.assertLessEqual(len(self.book), 1 + len(replies) + len(openings))
+
+    def test_lookup(self):
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        board = start_board(3, 4)
+        with OpeningBook(self.path) as book:
+            self.assertEqual((book.rows, book.cols, book.depth, len(book)), (3, 4, 3, len(self.book)))
+            self.assertEqual(book.lookup(board, 1), book_move(self.book, board, 1))
+            for move in tree.get_possible_moves(board, 1):
+                child = tree.apply_moves(board, move, 1)
+                self.assertEqual(book.lookup(child, -1), book_move(self.book, child, -1))
+                # the same board with the other player to move, or another shape, is not in it
+                self.assertIsNone(book.lookup(child, 1))
+                # a mirrored board shares the record, its move mirrored
+                row, col = book.lookup(child, -1)
+                self.assertEqual(book.lookup([cells[::-1] for cells in child], -1), (row, 3 - col))
+            self.assertIsNone(book.lookup(start_board(5, 6), 1))
+
+    def test_bad_files(self):
+        path = os.path.join(self.directory.name, 'bad.bin')
+        with open(path, 'wb') as f:
+            f.write(b'not a book at all, really')
+        with self.assertRaises(ValueError):
+            OpeningBook(path)
+        self.assertIsNone(load_book(path))
+        self.assertIsNone(load_book(os.path.join(self.directory.name, 'missing.bin')))
+
+    def test_player(self):
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        board = tree.apply_moves(start_board(3, 4), (1, 1), 1)
+        bot = PlayerTwo(book_path=self.path)
+        self.assertEqual(bot.get_play(board), book_move(self.book, board, -1))
+        self.assertIsNone(bot.tree)
+        self.assertIsNone(PlayerTwo(book_path=None).book)
+
+
+if __name__ == '__main__':
+    unittest.main()
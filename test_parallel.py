@@ -0,0 +1,55 @@
+#
+#   These are the unit tests for the parallel root-split search
+#   To use this, run: python test_parallel.py
+
+import random
+import unittest
+from a2_partb import GameTree
+from parallel import RootSplitPool
+from test_a1_partd import random_grid
+
+
+class ParallelTestCase(unittest.TestCase):
+    """These are the test cases for RootSplitPool and the parallel search mode"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = RootSplitPool(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_same_move_as_serial(self):
+        rng = random.Random(16)
+        for rows, cols, height in [(3, 3, 3), (3, 4, 3), (4, 5, 2), (5, 6, 2)]:
+            for _ in range(4):
+                board = random_grid(rng, rows, cols)
+                for player in (1, -1):
+                    expected = GameTree(board, player, height).get_move()
+                    tree = GameTree(board, player, height, search='parallel', pool=self.pool)
+                    self.assertEqual(tree.get_move(), expected)
+
+    def test_time_budget(self):
+        board = [[1, 0, 0, 0, 0, 0],
+                 [0, 1, 0, -1, 0, 0],
+                 [0, 0, 2, 0, -2, 0],
+                 [0, 1, 0, 0, 0, 0],
+                 [0, 0, 0, 0, 0, -1]]
+        tree = GameTree(board, 1, search='parallel', pool=self.pool)
+        move = tree.get_move(time_budget_ms=100)
+        self.assertGreaterEqual(tree.completed_height, 1)
+        self.assertEqual(move, GameTree(board, 1, tree.completed_height, search='lazy').get_move())
+        # the pool is still usable after a search that timed out
+        self.assertEqual(GameTree(board, -1, 2, search='parallel', pool=self.pool).get_move(),
+                         GameTree(board, -1, 2).get_move())
+
+    def test_needs_pool(self):
+        with self.assertRaises(ValueError):
+            GameTree([[1, 0], [0, -1]], 1, 1, search='parallel')
+        with self.assertRaises(ValueError):
+            GameTree([[1, 0], [0, -1]], 1, 1, search='lazy', pool=self.pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
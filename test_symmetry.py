@@ -0,0 +1,150 @@
+#
+#   These are the unit tests for the symmetries of the board
+#   To use this, run: python test_symmetry.py
+
+import random
+import unittest
+from a1_partd import get_topology
+from a2_parta import TranspositionTable, zobrist_keys
+from a2_partb import GameTree
+from move_ordering import MoveOrdering
+from opening_book import start_board
+from symmetry import canonical_form, canonical_key, transform_grid, unique_moves
+from tracked_board import TrackedBoard
+
+
+def settled_grid(rng, rows, cols):
+    # a random board with every cell below its capacity
+    capacity = get_topology(rows, cols).capacity
+    return [[rng.randint(-capacity[i][j] + 1, capacity[i][j] - 1) for j in range(cols)]
+            for i in range(rows)]
+
+
+class SymmetryTestCase(unittest.TestCase):
+    """These are the test cases for the symmetry module and the searches using it"""
+
+    def test_transforms(self):
+        for (rows, cols), count in (((5, 6), 4), ((4, 4), 8), ((1, 4), 2), ((1, 1), 1)):
+            topology = get_topology(rows, cols)
+            self.assertEqual(len(topology.transforms), count)
+            self.assertEqual(topology.transforms[0], tuple(range(rows * cols)))
+            for perm in topology.transforms:
+                self.assertEqual(sorted(perm), list(range(rows * cols)))
+                for k, neighbors in enumerate(topology.flat_neighbors):
+                    self.assertEqual(topology.flat_capacity[perm[k]], topology.flat_capacity[k])
+                    self.assertEqual(sorted(perm[n] for n in neighbors),
+                                     sorted(topology.flat_neighbors[perm[k]]))
+            self.assertEqual(len(zobrist_keys(rows, cols).transforms), 2 * count)
+
+    def test_moves_commute(self):
+        # playing the image of a move on the image of a settled board gives the image
+        # of the result
+        rng = random.Random(24)
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        for rows, cols in ((5, 6), (4, 4)):
+            keys = zobrist_keys(rows, cols)
+            for _ in range(40):
+                grid = settled_grid(rng, rows, cols)
+                player = rng.choice((1, -1))
+                move = rng.choice(tree.get_possible_moves(grid, player))
+                after = tree.apply_moves(grid, move, player)
+                for t, (perm, colour) in enumerate(keys.transforms):
+                    image = transform_grid(grid, perm, colour)
+                    self.assertEqual(tree.apply_moves(image, keys.map_move(t, move), player * colour),
+                                     transform_grid(after, perm, colour))
+                    self.assertEqual(keys.unmap_move(t, keys.map_move(t, move)), move)
+
+    def test_canonical(self):
+        rng = random.Random(7)
+        for rows, cols in ((5, 6), (3, 3)):
+            keys = zobrist_keys(rows, cols)
+            for _ in range(30):
+                grid = settled_grid(rng, rows, cols)
+                player = rng.choice((1, -1))
+                key, t = canonical_key(grid, player)
+                form = canonical_form(grid, player)
+                self.assertEqual(form[2], t)
+                self.assertEqual(canonical_key(form[0], form[1])[0], key)
+                self.assertEqual(keys.hash_grid(form[0]) ^ keys.side[form[1]], key)
+                # every image of the position shares the key and the representative
+                for perm, colour in keys.transforms:
+                    image = transform_grid(grid, perm, colour)
+                    self.assertEqual(canonical_key(image, player * colour)[0], key)
+                    self.assertEqual(canonical_form(image, player * colour)[:2], form[:2])
+                self.assertEqual(TrackedBoard(grid).canonical_key(player), (key, t))
+
+        # a board that is not settled is not mapped
+        board = [[2, 0, 0], [0, 0, 0], [0, 0, -1]]
+        keys = zobrist_keys(3, 3)
+        self.assertEqual(canonical_key(board, 1), (keys.hash_grid(board) ^ keys.side[1], 0))
+        self.assertEqual(TrackedBoard(board).canonical_key(1), canonical_key(board, 1))
+
+    def test_tracked_board(self):
+        rng = random.Random(3)
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        board = TrackedBoard(settled_grid(rng, 5, 6))
+        before = board.canonical_key(1)
+        player = 1
+        for _ in range(6):
+            move = rng.choice(tree.get_possible_moves(board, player))
+            board.make_move(move, player)
+            player = -player
+            self.assertEqual(board.canonical_key(player), canonical_key(board.get_board(), player))
+            self.assertEqual(board.copy().canonical_key(player), board.canonical_key(player))
+        for _ in range(6):
+            board.unmake_move()
+        self.assertIsNotNone(board.symmetric)
+        self.assertEqual(board.canonical_key(1), before)
+
+    def test_unique_moves(self):
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        empty = [[0] * 6 for _ in range(5)]
+        moves = tree.get_possible_moves(empty, 1)
+        kept = unique_moves(empty, moves)
+        self.assertEqual(kept, [(i, j) for i in range(3) for j in range(3)])
+        # the start board is only symmetric with the colours swapped
+        start = start_board()
+        moves = tree.get_possible_moves(start, 1)
+        self.assertEqual(unique_moves(start, moves), moves)
+        square = [[0, 1, 0], [1, -1, 1], [0, 1, 0]]
+        self.assertEqual(unique_moves(TrackedBoard(square), tree.get_possible_moves(square, 1)),
+                         [(0, 0), (0, 1)])
+
+    def test_search(self):
+        boards = [([[0] * 6 for _ in range(5)], 1),
+                  ([[1, 0, 0, 0, 0, 1], [0, 0, -2, -2, 0, 0], [0, 0, 0, 0, 0, 0],
+                    [0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0]], 1),
+                  ([[0, 1, 0], [1, -1, 1], [0, 1, 0]], -1)]
+        for board, player in boards:
+            # the lazy search picks the same move, searching fewer boards
+            trees = [GameTree(board, player, 3, search='lazy', table=TranspositionTable(),
+                              symmetry=symmetry) for symmetry in (False, True)]
+            full = GameTree(board, player, 3, symmetry=True)
+            self.assertEqual(trees[0].get_move(), trees[1].get_move())
+            self.assertEqual(full.get_move(), trees[0].last_move)
+            self.assertLess(trees[1].nodes, trees[0].nodes)
+            self.assertLess(full.nodes, GameTree(board, player, 3).nodes)
+            # the negamax search finds a move of the same score
+            trees = [GameTree(board, player, 4, search='negamax', table=TranspositionTable(),
+                              ordering=MoveOrdering(), symmetry=symmetry) for symmetry in (False, True)]
+            scores = [tree._search_root(4)[1] for tree in trees]
+            self.assertEqual(scores[0], scores[1])
+            self.assertLess(trees[1].nodes, trees[0].nodes)
+
+    def test_shared_table(self):
+        # a mirrored board is answered from the entries of the first search
+        board = [[1, 0, 0, 0, 0, 0], [0, -2, 0, 0, 0, 0], [0, 0, 0, 2, 0, 0],
+                 [0, 0, 0, 0, 0, 0], [0, 0, 0, 0, -1, 0]]
+        keys = zobrist_keys(5, 6)
+        table = TranspositionTable()
+        first = GameTree(board, 1, 4, search='negamax', table=table, symmetry=True)
+        score = first._search_root(4)[1]
+        for perm, colour in keys.transforms[1:]:
+            image = transform_grid(board, perm, colour)
+            tree = GameTree(image, colour, 4, search='negamax', table=table, symmetry=True)
+            self.assertEqual(tree._search_root(4)[1], score)
+            self.assertLess(tree.nodes, first.nodes)
+
+
+if __name__ == '__main__':
+    unittest.main()
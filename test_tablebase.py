@@ -0,0 +1,98 @@
+#
+#   These are the unit tests for the endgame tablebase
+#   To use this, run: python test_tablebase.py
+
+import os
+import tempfile
+import unittest
+from a2_partb import GameTree
+from tablebase import Tablebase, solve, WIN, LOSS, TABLEBASE_WIN
+
+
+class TablebaseTestCase(unittest.TestCase):
+    """These are the test cases for solve and Tablebase"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = solve(2, 4)
+
+    def results(self, board, player):
+        # the (move, result for the opponent) of every move of player, where taking the
+        # last cell of the opponent leaves them lost in 0 plies
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        results = []
+        for move in tree.get_possible_moves(board, player):
+            child = tree.apply_moves(board, move, player)
+            if not any(value * player < 0 for row in child for value in row):
+                results.append((move, (LOSS, 0)))
+            else:
+                results.append((move, self.table.probe(child, -player)))
+        return results
+
+    def test_solve(self):
+        table = self.table
+        # the start board is lost for player 1
+        self.assertEqual(table.probe([[1, 0, 0, 0], [0, 0, 0, -1]], 1)[0], LOSS)
+        self.assertEqual(table.probe([[0, 0, 0, 0], [0, 0, -3, -1]], 1), (LOSS, 0))
+        for index, code in enumerate(table.codes):
+            if not code:
+                continue
+            board, player = table.board(index)
+            self.assertEqual(table.index(board, player), index)
+            result, distance = table.probe(board, player)
+            children = [entry for _, entry in self.results(board, player)]
+            # every position reached from a tabled one is tabled too
+            self.assertNotIn(None, children)
+            if result == WIN:
+                # the shortest win
+                self.assertEqual(distance, min(d + 1 for (r, d) in children if r == LOSS))
+            elif result == LOSS:
+                # every move loses, the longest defence is taken
+                self.assertTrue(all(r == WIN for (r, d) in children))
+                self.assertEqual(distance, max(d + 1 for (r, d) in children))
+            else:
+                self.assertTrue(all(r != LOSS for (r, d) in children))
+
+        # a board that is not settled, or of another shape, is not in it
+        self.assertIsNone(table.probe([[2, 0, 0, 0], [0, 0, 0, -1]], 1))
+        self.assertIsNone(table.probe([[1, 0, 0], [0, 0, -1]], 1))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'table.bin')
+            self.table.save(path)
+            loaded = Tablebase.load(path)
+            self.assertEqual((loaded.rows, loaded.cols), (2, 4))
+            self.assertEqual(loaded.codes, self.table.codes)
+            self.assertEqual(len(loaded), len(self.table))
+            with open(path, 'r+b') as f:
+                f.truncate(100)
+            with self.assertRaises(ValueError):
+                Tablebase.load(path)
+
+    def test_probed_search(self):
+        table = self.table
+        for index, code in enumerate(table.codes):
+            if not code:
+                continue
+            board, player = table.board(index)
+            result, distance = table.probe(board, player)
+            tree = GameTree(board, player, 2, search='negamax', tablebase=table)
+            move = tree.get_move()
+            entry = dict(self.results(board, player))[move]
+            # the search plays perfectly: the fastest win, or the slowest loss
+            if result == WIN:
+                self.assertEqual(entry, (LOSS, distance - 1))
+            elif result == LOSS:
+                self.assertEqual(entry, (WIN, distance - 1))
+            self.assertEqual(tree.tablebase.score(board, player),
+                             result * (TABLEBASE_WIN - distance))
+
+        # the table is only probed on its own shape, and only by the negamax search
+        self.assertIsNone(GameTree([[1, 0, 0], [0, 0, -1]], 1, 2, search='negamax', tablebase=table).tablebase)
+        with self.assertRaises(ValueError):
+            GameTree([[1, 0, 0, 0], [0, 0, 0, -1]], 1, 2, search='lazy', tablebase=table)
+
+
+if __name__ == '__main__':
+    unittest.main()
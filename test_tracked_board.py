@@ -0,0 +1,119 @@
+#
+#   These are the unit tests for the counters of TrackedBoard
+#   To use this, run: python test_tracked_board.py
+
+import random
+import unittest
+from a1_partd import is_all_same_sign
+from a2_partb import GameTree, evaluate_board
+from tracked_board import TrackedBoard
+from test_a1_partd import random_grid
+
+
+def counted(grid):
+    cells = {1: 0, -1: 0}
+    gems = {1: 0, -1: 0}
+    for row in grid:
+        for cell in row:
+            if cell:
+                player = 1 if cell > 0 else -1
+                cells[player] += 1
+                gems[player] += abs(cell)
+    return cells, gems
+
+
+class TrackedBoardTestCase(unittest.TestCase):
+    """These are the test cases for TrackedBoard"""
+
+    def assert_consistent(self, board, grid):
+        self.assertEqual(board.grid, grid)
+        self.assertEqual((board.cells, board.gems), counted(grid))
+        for player in (1, -1):
+            self.assertEqual(board.evaluate(player), evaluate_board(grid, player))
+        self.assertEqual(board.is_all_same_sign(), is_all_same_sign(grid))
+        # the incrementally updated hash matches one computed from scratch
+        self.assertEqual(board.zobrist, board.keys.hash_grid(grid))
+
+    def test_random_games(self):
+        rng = random.Random(12)
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        for _ in range(40):
+            rows, cols = rng.randint(2, 6), rng.randint(2, 6)
+            grid = [[0] * cols for _ in range(rows)]
+            grid[0][0] = 1
+            grid[rows - 1][cols - 1] = -1
+            board = TrackedBoard(grid)
+            player = 1
+            for _ in range(40):
+                moves = tree.get_possible_moves(grid, player)
+                if not moves:
+                    break
+                move = rng.choice(moves)
+                grid = tree.apply_moves(grid, move, player)
+                board.apply_move(move, player)
+                self.assert_consistent(board, grid)
+                self.assertEqual(board.is_terminal(), tree.is_terminal(grid))
+                player = -player
+
+    def test_unsettled_boards(self):
+        # boards with full cells left behind must still overflow like the list engine
+        rng = random.Random(3)
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        for _ in range(200):
+            grid = random_grid(rng, 4, 5)
+            board = TrackedBoard(grid)
+            for player in (1, -1):
+                move = rng.choice(tree.get_possible_moves(grid, player) or [(0, 0)])
+                child = tree.apply_moves(board, move, player)
+                self.assert_consistent(child, tree.apply_moves(grid, move, player))
+            self.assert_consistent(board, grid)
+
+    def test_make_unmake(self):
+        rng = random.Random(20)
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        for _ in range(100):
+            grid = random_grid(rng, 4, 5)
+            board = TrackedBoard(grid)
+            # a line of moves made on one board, each matching apply_move on a copy
+            grids = [grid]
+            states = [(board.cells.copy(), board.gems.copy(), board.zobrist, board.quiet)]
+            player = 1
+            for _ in range(4):
+                moves = tree.get_possible_moves(board, player)
+                if not moves:
+                    break
+                move = rng.choice(moves)
+                expected = board.copy()
+                expected.apply_move(move, player)
+                board.make_move(move, player)
+                self.assert_consistent(board, expected.grid)
+                self.assertEqual(board.quiet, expected.quiet)
+                grids.append(expected.grid)
+                states.append((board.cells.copy(), board.gems.copy(), board.zobrist, board.quiet))
+                player = -player
+            # and taken back in reverse order
+            while len(grids) > 1:
+                board.unmake_move()
+                grids.pop()
+                states.pop()
+                self.assertEqual(board.grid, grids[-1])
+                self.assertEqual((board.cells, board.gems, board.zobrist, board.quiet), states[-1])
+            self.assertFalse(board.undo_log)
+            self.assertEqual(board.grid, grid)
+
+    def test_edits_and_winner(self):
+        board = TrackedBoard([[1, 0, 0], [0, 0, -1]])
+        self.assertEqual(board.winner(), 0)
+        board.apply_delta([(1, 2, 0), (1, 1, 2)])
+        self.assert_consistent(board, [[1, 0, 0], [0, 2, 0]])
+        self.assertEqual(board.winner(), 1)
+        board.set([[0, -1, 0], [0, -2, 0]])
+        self.assert_consistent(board, [[0, -1, 0], [0, -2, 0]])
+        self.assertEqual(board.winner(), -1)
+        self.assertFalse(board.place(1, 1, 1))
+        self.assertTrue(board.place(1, 1, -1))
+        self.assert_consistent(board, [[0, -1, 0], [0, -3, 0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
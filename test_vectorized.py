@@ -0,0 +1,141 @@
+#
+#   These are the unit tests for the NumPy kernels of vectorized.py
+#   To use this, run: python test_vectorized.py
+
+import random
+import unittest
+from a1_partc import Queue
+from a1_partd import overflow, overflow_waves, copy_grid, neighbor_count
+from a2_partb import GameTree, evaluate_board, evaluate_boards
+from tracked_board import TrackedBoard
+import vectorized
+from test_a1_partd import queue_to_list, random_grid, cascade_grid
+
+
+@unittest.skipUnless(vectorized.HAVE_NUMPY, "numpy is not installed")
+class VectorizedTestCase(unittest.TestCase):
+    """These are the test cases comparing the NumPy kernels with the list-based reference"""
+
+    def assert_same_overflow(self, grid):
+        expected_grid = copy_grid(grid)
+        expected_queue = Queue()
+        expected_count = overflow(expected_grid, expected_queue)
+
+        actual_queue = Queue()
+        actual_count = vectorized.overflow_grid(grid, actual_queue)
+
+        self.assertEqual(actual_count, expected_count)
+        self.assertEqual(grid, expected_grid)
+        self.assertEqual(queue_to_list(actual_queue), queue_to_list(expected_queue))
+
+    def test_capacity_array(self):
+        for rows, cols in [(1, 1), (1, 4), (3, 1), (5, 6), (7, 3)]:
+            capacity = vectorized.capacity_array(rows, cols)
+            for i in range(rows):
+                for j in range(cols):
+                    self.assertEqual(capacity[i, j], neighbor_count(i, j, rows, cols))
+
+    def test_overflow_matches_list_engine(self):
+        rng = random.Random(2024)
+        for _ in range(300):
+            self.assert_same_overflow(random_grid(rng, rng.randint(1, 7), rng.randint(1, 7)))
+        for rows, cols in [(5, 6), (9, 11)]:
+            self.assert_same_overflow(cascade_grid(rows, cols))
+
+    def test_delta_recording_matches_list_engine(self):
+        rng = random.Random(11)
+        for grid in [random_grid(rng, 5, 6) for _ in range(100)] + [cascade_grid(6, 7)]:
+            expected_queue = Queue()
+            overflow(copy_grid(grid), expected_queue, deltas=True)
+            actual_queue = Queue()
+            vectorized.overflow_grid(copy_grid(grid), actual_queue, deltas=True)
+            self.assertEqual(queue_to_list(actual_queue), queue_to_list(expected_queue))
+
+            expected_grid = copy_grid(grid)
+            expected = list(overflow_waves(expected_grid))
+            self.assertEqual(list(vectorized.overflow_waves(grid)), expected)
+            self.assertEqual(grid, expected_grid)
+
+    def test_expand_children(self):
+        rng = random.Random(17)
+        tree = GameTree([[1, 0], [0, -1]], 1, 0)
+        grids = [random_grid(rng, rng.randint(1, 6), rng.randint(1, 6)) for _ in range(200)]
+        for grid in grids + [cascade_grid(5, 6)]:
+            for player in (1, -1):
+                moves = tree.get_possible_moves(grid, player)
+                expected = [tree.apply_moves(grid, move, player) for move in moves]
+                self.assertEqual(vectorized.expand_children(grid, moves, player).tolist(), expected)
+
+    def test_batch_overflow_waves(self):
+        rng = random.Random(23)
+        grids = [random_grid(rng, 4, 5) for _ in range(50)] + [cascade_grid(4, 5)]
+        boards = vectorized.np.array(grids, dtype=vectorized.BOARD_DTYPE)
+        waves = vectorized.batch_overflow(boards)
+        for grid, board, count in zip(grids, boards.tolist(), waves.tolist()):
+            self.assertEqual(overflow(grid, None), count)
+            self.assertEqual(board, grid)
+
+    def test_gametree_batched_children_are_tracked(self):
+        board = random_grid(random.Random(4), 4, 5)
+        tree = GameTree(board, 1, 0, backend='numpy')
+        moves = tree.get_possible_moves(board, 1)
+        expected = GameTree(board, 1, 0).expand_children(tree.root.board, moves, 1)
+        actual = tree.expand_children(tree.root.board, moves, 1)
+        for child, reference in zip(actual, expected):
+            self.assertEqual(child, reference)
+            self.assertEqual((child.cells, child.gems, child.quiet),
+                             (reference.cells, reference.gems, reference.quiet))
+
+    def test_gametree_backends_agree(self):
+        rng = random.Random(7)
+        for _ in range(5):
+            board = random_grid(rng, 4, 4, high=1)
+            board[0][0] = 1
+            board[3][3] = -1
+            for player in (1, -1):
+                expected = GameTree(board, player, 2).get_move()
+                actual = GameTree(board, player, 2, backend='numpy').get_move()
+                self.assertEqual(actual, expected)
+
+    def test_batch_evaluate(self):
+        rng = random.Random(25)
+        grids = [random_grid(rng, 4, 5) for _ in range(100)]
+        # the winning, losing and empty boards
+        grids += [[[0] * 5 for _ in range(4)], [[2] * 5 for _ in range(4)], [[-1] * 5 for _ in range(4)],
+                  [[0, 0, 0, 0, 1]] + [[0] * 5 for _ in range(3)]]
+        boards = vectorized.np.array(grids, dtype=vectorized.BOARD_DTYPE)
+        for player in (1, -1):
+            expected = [evaluate_board(grid, player) for grid in grids]
+            self.assertEqual(vectorized.batch_evaluate(boards, player), expected)
+            self.assertEqual(evaluate_boards(grids, player), expected)
+            self.assertEqual(evaluate_boards(boards, player), expected)
+            self.assertEqual(evaluate_boards([TrackedBoard(grid) for grid in grids], player), expected)
+        players = [rng.choice((1, -1)) for _ in grids]
+        self.assertEqual(vectorized.batch_evaluate(boards, players),
+                         [evaluate_board(grid, player) for grid, player in zip(grids, players)])
+        self.assertEqual(evaluate_boards([], 1), [])
+
+    def test_gametree_batched_leaves(self):
+        # the full tree of the numpy backend holds the same leaves with the same scores
+        def leaves(node):
+            if not node.children:
+                return [(node.packed, node.score)]
+            return [leaf for child in node.children for leaf in leaves(child)]
+
+        rng = random.Random(12)
+        for _ in range(3):
+            board = random_grid(rng, 4, 5, high=2)
+            for height in (1, 2):
+                expected = GameTree(board, 1, height)
+                actual = GameTree(board, 1, height, backend='numpy')
+                self.assertEqual(leaves(actual.root), leaves(expected.root))
+                self.assertEqual(actual.nodes, expected.nodes)
+                self.assertEqual(actual.get_move(), expected.get_move())
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            GameTree([[1, 0], [0, -1]], 1, 1, backend='gpu')
+
+
+if __name__ == '__main__':
+    unittest.main()
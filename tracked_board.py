@@ -0,0 +1,357 @@
+# A board that keeps its per-player counters up to date.
+#
+# Every change to a cell goes through TrackedBoard, which adjusts the number of
+# cells and gems each player owns as it happens. Evaluation, terminal detection
+# and win checks then read the counters in O(1) instead of walking the grid.
+# The Zobrist hash of the board is kept up to date the same way. The symmetric
+# hash (the hashes of every image of the board, see symmetry) is only needed by
+# the boards a search looks up in its table, so it is computed when asked for and
+# kept until the board changes; after make_move it is derived from the one of the
+# board before the move and the cells in the undo log.
+#
+# make_move and unmake_move let a depth-first search run on one board: every cell
+# change of a move (the placement and each overflow wave) is appended to an undo
+# log as (row, col, old value), and unmake_move replays the log backwards.
+
+from a1_partd import run_overflow, copy_grid, get_overflow_list, grid_topology
+from a2_parta import zobrist_keys
+import vectorized
+
+
+class TrackedBoard:
+    """
+    A list of lists board with incrementally maintained cell and gem counts.
+
+    The board can be read like the list of lists it wraps (board[i][j], len(board),
+    iteration over rows), but it must only be changed through its methods.
+
+    Attributes:
+    grid (list of lists): The cells of the board.
+    rows (int): The number of rows of the board.
+    cols (int): The number of columns of the board.
+    cells (dict): Maps each player (1 or -1) to the number of cells they own.
+    gems (dict): Maps each player (1 or -1) to the total number of gems they own.
+    quiet (bool): True if no cell is at or above its capacity. A move on a quiet board
+                  can then only start an overflow at the cell it was played on.
+    keys (ZobristKeys): The Zobrist keys of the board shape.
+    zobrist (int): The Zobrist hash of the cells.
+    symmetric (int): The symmetric hash of the cells (see ZobristKeys.hash_symmetric), or
+                     None until canonical_key needs it again.
+    undo_log (list): The (row, col, old value) changes of the moves made with make_move
+                     and not unmade yet, oldest first, or None before the first one.
+    """
+
+    def __init__(self, grid):
+        """
+        Creates a tracked copy of grid.
+
+        Parameters:
+        grid (list of lists): The board to copy.
+        """
+        self.grid = copy_grid(grid)
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self.keys = zobrist_keys(self.rows, self.cols)
+        self.cells = {1: 0, -1: 0}
+        self.gems = {1: 0, -1: 0}
+        self.quiet = False
+        self.zobrist = 0
+        self.symmetric = None
+        self.undo_log = None
+        self._frames = None
+        self._derivable = 0
+        self.recount()
+
+    @classmethod
+    def from_counts(cls, grid, cells, gems, quiet, zobrist=None, symmetric=None):
+        """
+        Wraps grid (without copying it) with counters the caller already computed.
+        The hash is computed from the grid when it is not given.
+        """
+        board = cls.__new__(cls)
+        board.grid = grid
+        board.rows = len(grid)
+        board.cols = len(grid[0])
+        board.keys = zobrist_keys(board.rows, board.cols)
+        board.cells = cells
+        board.gems = gems
+        board.quiet = quiet
+        board.zobrist = board.keys.hash_grid(grid) if zobrist is None else zobrist
+        board.symmetric = symmetric
+        board.undo_log = None
+        board._frames = None
+        board._derivable = 0
+        return board
+
+    def recount(self):
+        """
+        Recomputes every counter (and the quiet flag and the hash) from the grid.
+        """
+        cells = {1: 0, -1: 0}
+        gems = {1: 0, -1: 0}
+        for row in self.grid:
+            for value in row:
+                if value > 0:
+                    cells[1] += 1
+                    gems[1] += value
+                elif value < 0:
+                    cells[-1] += 1
+                    gems[-1] -= value
+        self.cells = cells
+        self.gems = gems
+        self.quiet = get_overflow_list(self.grid) is None
+        self.zobrist = self.keys.hash_grid(self.grid)
+        self.symmetric = None
+
+    def __getitem__(self, row):
+        return self.grid[row]
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.grid)
+
+    def __eq__(self, other):
+        if isinstance(other, TrackedBoard):
+            return self.grid == other.grid
+        return self.grid == other
+
+    __hash__ = None
+
+    def copy(self):
+        """
+        Returns an independent copy of the board and its counters.
+        """
+        return TrackedBoard.from_counts(copy_grid(self.grid), self.cells.copy(), self.gems.copy(),
+                                        self.quiet, self.zobrist, self.symmetric)
+
+    def get_board(self):
+        """
+        Returns a list of lists copy of the board.
+        """
+        return copy_grid(self.grid)
+
+    def _forget(self, value):
+        # Removes a cell holding value from the counters
+        if value > 0:
+            self.cells[1] -= 1
+            self.gems[1] -= value
+        elif value < 0:
+            self.cells[-1] -= 1
+            self.gems[-1] += value
+
+    def _count(self, value):
+        # Adds a cell holding value to the counters
+        if value > 0:
+            self.cells[1] += 1
+            self.gems[1] += value
+        elif value < 0:
+            self.cells[-1] += 1
+            self.gems[-1] -= value
+
+    def set_cell(self, row, col, value):
+        """
+        Sets cell (row, col) to value and updates the counters.
+        """
+        old = self.grid[row][col]
+        self._forget(old)
+        self.grid[row][col] = value
+        self._count(value)
+        index = row * self.cols + col
+        self.zobrist ^= self.keys.key(index, old) ^ self.keys.key(index, value)
+        self.symmetric = None
+        self._derivable = 0
+        if abs(value) >= grid_topology(self.grid).capacity[row][col]:
+            self.quiet = False
+
+    def set(self, grid):
+        """
+        Replaces every cell with the ones of grid (the rows are updated in place).
+        """
+        for i in range(self.rows):
+            self.grid[i][:] = grid[i]
+        self.recount()
+
+    def apply_delta(self, delta):
+        """
+        Applies a list of (row, col, new_value) changes, such as one overflow wave.
+        """
+        for (i, j, value) in delta:
+            self.set_cell(i, j, value)
+
+    def place(self, row, col, player):
+        """
+        Adds a gem of player to cell (row, col) if it is empty or theirs.
+
+        Returns:
+        bool: True if the gem was placed, False if the cell belongs to the opponent.
+        """
+        value = self.grid[row][col]
+        if value == 0 or (value > 0 and player == 1) or (value < 0 and player == -1):
+            self.set_cell(row, col, value + player)
+            return True
+        return False
+
+    def overflow(self, a_queue=None, backend='list', overflow_list=None, journal=None):
+        """
+        Runs the overflow process in place and updates the counters.
+
+        Parameters:
+        a_queue (Queue): An optional queue receiving a copy of the board after every wave.
+        backend (str): 'list' for a1_partd's overflow, 'numpy' for the vectorized one.
+        overflow_list (list of tuples): The overflowing cells in row-major order, if known.
+        journal (list): An optional list receiving a (row, col, old value) entry for every
+                        cell each wave changes (list backend only).
+
+        Returns:
+        int: The number of waves applied.
+        """
+        if backend == 'numpy':
+            waves = vectorized.overflow_grid(self.grid, a_queue)
+            if waves:
+                self.recount()
+            return waves
+
+        if journal is None:
+            journal = []
+        start = len(journal)
+        waves = run_overflow(self.grid, a_queue, journal=journal, overflow_list=overflow_list,
+                             signs=(self.cells[1], self.cells[-1])).waves
+        # The first entry of a cell holds its value from before the overflow
+        seen = set()
+        keys = self.keys
+        cols = self.cols
+        for k in range(start, len(journal)):
+            i, j, old = journal[k]
+            if (i, j) not in seen:
+                seen.add((i, j))
+                new = self.grid[i][j]
+                self._forget(old)
+                self._count(new)
+                self.zobrist ^= keys.key(i * cols + j, old) ^ keys.key(i * cols + j, new)
+        self.symmetric = None
+        self._derivable = 0
+        # The overflow only stops early, leaving full cells behind, once one player is gone
+        self.quiet = not self.is_all_same_sign()
+        return waves
+
+    def apply_move(self, move, player, backend='list'):
+        """
+        Places a gem of player at move and overflows the board, in place.
+        """
+        row, col = move
+        was_quiet = self.quiet
+        self.place(row, col, player)
+        if self.quiet:
+            return  # the gem did not fill its cell, nothing overflows
+        if was_quiet and backend == 'list':
+            # the cell just played on is the only one that can be overflowing
+            self.overflow(None, backend, [(row, col)])
+        else:
+            self.overflow(None, backend)
+
+    def make_move(self, move, player):
+        """
+        Applies a move like apply_move (with the list backend), recording every cell
+        change in undo_log so that unmake_move can revert it.
+        """
+        if self.undo_log is None:
+            self.undo_log = []
+            self._frames = []
+        log = self.undo_log
+        self._frames.append((len(log), self.cells[1], self.cells[-1], self.gems[1], self.gems[-1],
+                             self.zobrist, self.symmetric, self.quiet))
+        row, col = move
+        log.append((row, col, self.grid[row][col]))
+        was_quiet = self.quiet
+        self.place(row, col, player)
+        if not self.quiet:
+            self.overflow(None, 'list', [(row, col)] if was_quiet else None, log)
+        # the cells changed since the frame are the ones logged after its mark
+        self._derivable = len(self._frames)
+
+    def unmake_move(self):
+        """
+        Reverts the last move made with make_move and not unmade yet.
+        """
+        mark, p1_cells, p2_cells, p1_gems, p2_gems, zobrist, symmetric, quiet = self._frames.pop()
+        log = self.undo_log
+        grid = self.grid
+        while len(log) > mark:
+            i, j, old = log.pop()
+            grid[i][j] = old
+        self.cells[1], self.cells[-1] = p1_cells, p2_cells
+        self.gems[1], self.gems[-1] = p1_gems, p2_gems
+        self.zobrist = zobrist
+        self.symmetric = symmetric
+        self.quiet = quiet
+        self._derivable = len(self._frames)
+
+    def canonical_key(self, player):
+        """
+        Returns the key shared by every position symmetric to this board with player to
+        move (see ZobristKeys.canonical), and the transform mapping this board onto the
+        one it is the key of.
+
+        Symmetric boards only play the same way when they are settled (the sign of an
+        overflow comes from the first overflowing cell in row-major order), so a board
+        that is not quiet gets its plain key and the identity transform.
+        """
+        if not self.quiet:
+            return self.zobrist ^ self.keys.side[player], 0
+        if self.symmetric is None:
+            frame = self._frames[-1] if self._derivable else None
+            if frame is not None and self._derivable == len(self._frames) and frame[6] is not None:
+                self.symmetric = self._derive_symmetric(frame[0], frame[6])
+            else:
+                self.symmetric = self.keys.hash_symmetric(self.grid)
+        return self.keys.canonical(self.symmetric, player)
+
+    def _derive_symmetric(self, mark, symmetric):
+        # The symmetric hash of the board from the one it had when the undo log was mark
+        # entries long; the first entry of a cell after mark holds its value from then
+        keys = self.keys
+        grid = self.grid
+        cols = self.cols
+        log = self.undo_log
+        seen = set()
+        for k in range(mark, len(log)):
+            i, j, old = log[k]
+            if (i, j) not in seen:
+                seen.add((i, j))
+                symmetric ^= keys.symmetric_key(i * cols + j, old) ^ keys.symmetric_key(i * cols + j, grid[i][j])
+        return symmetric
+
+    def is_terminal(self):
+        """
+        Returns True if every cell belongs to the same player.
+        """
+        size = self.rows * self.cols
+        return self.cells[1] == size or self.cells[-1] == size
+
+    def is_all_same_sign(self):
+        """
+        Returns True if the non-empty cells do not belong to both players.
+        """
+        return self.cells[1] == 0 or self.cells[-1] == 0
+
+    def winner(self):
+        """
+        Returns 1 or -1 if only that player has gems left on the board, 0 otherwise.
+        """
+        if self.cells[1] and self.cells[-1]:
+            return 0
+        return -1 if self.cells[1] == 0 else 1
+
+    def evaluate(self, player):
+        """
+        Returns the same score as a2_partb.evaluate_board, in O(1).
+        """
+        gem = self.gems[player]
+        total = self.gems[1] + self.gems[-1]
+        if gem == total:
+            return 100
+        if gem == 0:
+            return -100
+        return (gem * 100) // total
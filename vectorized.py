@@ -0,0 +1,292 @@
+# NumPy kernels for the overflow engine.
+#
+# NumPy is optional: a1_partd holds the list-based reference implementation and
+# everything here must produce exactly the same boards. The functions only
+# need NumPy when they are called, so importing this module is always safe.
+
+from functools import lru_cache
+from a1_partd import get_topology, is_dense_wave, TOPOLOGY_CACHE_SIZE
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+HAVE_NUMPY = np is not None
+
+# Gem counts per cell stay tiny, int16 leaves plenty of headroom on big boards
+BOARD_DTYPE = 'int16'
+
+
+def require_numpy():
+    """
+    Raises ImportError when NumPy is not installed.
+    """
+    if np is None:
+        raise ImportError("the numpy overflow backend requires numpy to be installed")
+
+
+@lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def capacity_array(rows, cols):
+    """
+    Returns the (read-only) overflow capacity of every cell of a rows x cols board.
+
+    The values come from the shared a1_partd topology of the shape.
+    """
+    require_numpy()
+    capacity = np.array(get_topology(rows, cols).capacity, dtype=np.int8)
+    capacity.setflags(write=False)
+    return capacity
+
+
+def to_array(grid):
+    """
+    Converts a list of lists board into a NumPy array.
+    """
+    require_numpy()
+    return np.array(grid, dtype=BOARD_DTYPE)
+
+
+def to_grid(board):
+    """
+    Converts a NumPy board back into a list of lists of ints.
+    """
+    return board.tolist()
+
+
+def array_waves(board):
+    """
+    Generator running the overflow process on a NumPy board in place, one wave per step.
+
+    Each wave is computed for the whole board at once: a mask of the cells at or
+    above capacity is cleared, and the number of overflowing neighbors of every
+    cell is added with four shifted-slice adds.
+
+    board: A 2D NumPy integer array.
+
+    It yields a boolean mask of the cells touched by each wave, after the wave was applied.
+    """
+    capacity = capacity_array(*board.shape)
+    overflowing = np.abs(board) >= capacity
+    if not overflowing.any() or not (board > 0).any() or not (board < 0).any():
+        return
+
+    # The sign of the first overflowing cell in row-major order wins the cascade
+    overflowing_sign = int(np.sign(board.flat[np.flatnonzero(overflowing)[0]]))
+    incoming = np.empty(board.shape, dtype=board.dtype)
+
+    while True:
+        board[overflowing] = 0
+
+        incoming.fill(0)
+        incoming[1:, :] += overflowing[:-1, :]
+        incoming[:-1, :] += overflowing[1:, :]
+        incoming[:, 1:] += overflowing[:, :-1]
+        incoming[:, :-1] += overflowing[:, 1:]
+
+        hit = incoming > 0
+        board[hit] = (np.abs(board[hit]) + incoming[hit]) * overflowing_sign
+        yield overflowing | hit
+
+        overflowing = np.abs(board) >= capacity
+        if not overflowing.any() or not (board > 0).any() or not (board < 0).any():
+            return
+
+
+def _delta(board, touched):
+    # The (row, col, new_value) changes of one wave, in row-major order
+    rows, cols = np.nonzero(touched)
+    return list(zip(rows.tolist(), cols.tolist(), board[rows, cols].tolist()))
+
+
+def overflow_array(board, a_queue=None, grid_count=0, deltas=False):
+    """
+    Runs the overflow process on a NumPy board in place (see array_waves).
+
+    board: A 2D NumPy integer array.
+    a_queue: An optional queue receiving a list of lists copy of the board after every wave.
+    grid_count: A counter to track the number of grid states processed.
+    deltas: If True, waves changing few cells are queued as lists of (row, col, new_value)
+            changes instead (see a1_partd.run_overflow).
+
+    It returns the total number of grid states processed during the overflow process.
+    """
+    for touched in array_waves(board):
+        if a_queue is not None:
+            if deltas and not is_dense_wave(*board.shape, int(touched.sum())):
+                a_queue.enqueue(_delta(board, touched))
+            else:
+                a_queue.enqueue(to_grid(board))
+        grid_count += 1
+    return grid_count
+
+
+def overflow_grid(grid, a_queue=None, grid_count=0, deltas=False):
+    """
+    Drop-in replacement for a1_partd.overflow backed by NumPy.
+
+    The list of lists grid is converted to an array, overflowed and written back in place.
+    """
+    board = to_array(grid)
+    grid_count = overflow_array(board, a_queue, grid_count, deltas)
+    for i, row in enumerate(board.tolist()):
+        grid[i][:] = row
+    return grid_count
+
+
+def overflow_waves(grid):
+    """
+    NumPy counterpart of a1_partd.overflow_waves.
+
+    Each step applies the next wave to the list of lists grid and yields the same
+    (row, col, new_value) changes as the list-based generator.
+    """
+    board = to_array(grid)
+    for touched in array_waves(board):
+        delta = _delta(board, touched)
+        for (i, j, value) in delta:
+            grid[i][j] = value
+        yield delta
+
+
+def batch_overflow(boards):
+    """
+    Runs the overflow process on a stack of boards at once, in place.
+
+    Every board follows the same rules as a1_partd.overflow on its own: it overflows
+    with the sign of its first overflowing cell and stops when nothing overflows or
+    only one player is left. Each wave is applied to all the boards still active with
+    the same whole-array masks and shifted-slice adds as array_waves.
+
+    boards: A 3D NumPy integer array of shape (count, rows, cols).
+
+    It returns an array with the number of waves applied to each board.
+    """
+    count = boards.shape[0]
+    capacity = capacity_array(*boards.shape[1:])
+    waves = np.zeros(count, dtype=np.int32)
+    if count == 0:
+        return waves
+
+    overflowing = np.abs(boards) >= capacity
+    active = (overflowing.any(axis=(1, 2)) & (boards > 0).any(axis=(1, 2))
+              & (boards < 0).any(axis=(1, 2)))
+
+    # The sign of the first overflowing cell in row-major order wins each cascade
+    first = overflowing.reshape(count, -1).argmax(axis=1)
+    signs = np.sign(boards.reshape(count, -1)[np.arange(count), first]).astype(boards.dtype)
+    signs = signs[:, None, None]
+    incoming = np.empty(boards.shape, dtype=boards.dtype)
+
+    while active.any():
+        overflowing &= active[:, None, None]
+        boards[overflowing] = 0
+
+        incoming.fill(0)
+        incoming[:, 1:, :] += overflowing[:, :-1, :]
+        incoming[:, :-1, :] += overflowing[:, 1:, :]
+        incoming[:, :, 1:] += overflowing[:, :, :-1]
+        incoming[:, :, :-1] += overflowing[:, :, 1:]
+
+        hit = incoming > 0
+        np.copyto(boards, (np.abs(boards) + incoming) * signs, where=hit)
+        waves += active
+
+        overflowing = np.abs(boards) >= capacity
+        active &= (overflowing.any(axis=(1, 2)) & (boards > 0).any(axis=(1, 2))
+                   & (boards < 0).any(axis=(1, 2)))
+    return waves
+
+
+def batch_counts(boards):
+    """
+    Counts the cells and gems of both players on every board of a stack at once.
+
+    boards: A 3D NumPy integer array of shape (count, rows, cols).
+
+    It returns four lists: the cells of player 1, the cells of player 2, the gems of
+    player 1 and the gems of player 2 of every board.
+    """
+    positive = boards > 0
+    negative = boards < 0
+    return (positive.sum(axis=(1, 2)).tolist(), negative.sum(axis=(1, 2)).tolist(),
+            np.where(positive, boards, 0).sum(axis=(1, 2)).tolist(),
+            (-np.where(negative, boards, 0)).sum(axis=(1, 2)).tolist())
+
+
+def expand_children(grid, moves, player):
+    """
+    Applies every move of player to grid at once, like GameTree.apply_moves does one by one.
+
+    The children are stacked into a single (moves x rows x cols) array, each gets its gem,
+    and batch_overflow settles them all together.
+
+    grid: A 2D grid (list of lists or NumPy array) of the parent board.
+    moves: A list of (row, col) moves.
+    player: The player making the moves (1 or -1).
+
+    It returns the (len(moves), rows, cols) array of the settled children.
+    """
+    parent = to_array(grid)
+    count = len(moves)
+    boards = np.repeat(parent[None, :, :], count, axis=0)
+    if count == 0:
+        return boards
+    index = np.arange(count)
+    rows, cols = np.array(moves, dtype=np.intp).T
+    cells = boards[index, rows, cols]
+    playable = (cells == 0) | (np.sign(cells) == player)
+    boards[index[playable], rows[playable], cols[playable]] += player
+    batch_overflow(boards)
+    return boards
+
+
+def batch_evaluate(boards, player):
+    """
+    Scores every board of a stack at once, exactly like a2_partb.evaluate_board.
+
+    The score is 100 when player owns every gem on the board (an empty board
+    included), -100 when they own none, and (gems of player * 100) // (all gems)
+    otherwise. evaluate_board's draw score is never reached, since a board without
+    gems already scores 100.
+
+    boards: A 3D NumPy integer array of shape (count, rows, cols).
+    player: The player the boards are scored for (1 or -1), or a sequence of one
+            player per board.
+
+    It returns a list with the int score of every board.
+    """
+    require_numpy()
+    flat = boards.reshape(boards.shape[0], -1).astype(np.int64)
+    players = np.asarray(player, dtype=np.int64).reshape(-1, 1)
+    gems = np.abs(flat)
+    total = gems.sum(axis=1)
+    own = np.where(flat * players > 0, gems, 0).sum(axis=1)
+    scores = (own * 100) // np.maximum(total, 1)
+    scores = np.where(own == 0, -100, scores)
+    scores = np.where(own == total, 100, scores)
+    return scores.tolist()
+
+
+# NumPy types of the array typecodes pack_boards can pack cells as
+PACK_DTYPES = {'b': 'int8', 'h': 'int16'}
+
+
+def pack_boards(boards, typecode='h'):
+    """
+    Packs every board of a stack like a1_partd.pack_grid(grid, typecode), one board
+    after the other.
+
+    boards: A 3D NumPy integer array of shape (count, rows, cols).
+    typecode: The array typecode of a cell, 'b' for signed 8-bit or 'h' for signed
+              16-bit values.
+
+    It returns the packed bytes. Like pack_grid, it raises OverflowError if a cell does
+    not fit in the typecode, instead of wrapping it.
+    """
+    require_numpy()
+    dtype = np.dtype(PACK_DTYPES[typecode])
+    info = np.iinfo(dtype)
+    if boards.size and (boards.min() < info.min or boards.max() > info.max):
+        raise OverflowError(f"a cell does not fit in typecode {typecode!r}")
+    return boards.astype(dtype).tobytes()